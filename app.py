@@ -1,38 +1,137 @@
+import multiprocessing
 import os
+import re
 import sys
 import threading
 import time
-import tempfile
-import shutil
-import zipfile
-import subprocess
-import requests
+import weakref
 import yt_dlp
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import ctypes
-from queue import Queue
+from collections import OrderedDict
 from packaging import version
 from PIL import Image, ImageTk
-import glob
 
+from engine import (
+    CancelScope,
+    DownloadEngine,
+    DownloadScheduler,
+    DownloadTask,
+    MiB,
+    OUTPUT_PROFILES,
+    PLAYLIST_PAGE_SIZE,
+    PLAYLIST_PREVIEW_OPTS,
+    format_bytes,
+    get_app_data_dir,
+    get_http_session,
+    iter_playlist_entries,
+    split_url_list,
+    tracking_io,
+)
+from archive import DownloadArchive
+from formats import choose_formats
+from isolation import ProcessRunner
+from journal import DownloadJournal
+from telemetry import TelemetryStore
+from thumbnails import Prefetcher, ThumbnailCache
+
+try:  # Optional: drag and drop of URL files onto the batch window
+    from tkinterdnd2 import DND_FILES, DND_TEXT, TkinterDnD
+except ImportError:
+    DND_FILES = DND_TEXT = TkinterDnD = None
+
+CHECKED, UNCHECKED = "☑", "☐"
+ROW_THUMB_SIZE = (64, 36)  # Playlist selection row thumbnails
+
+# Transfer card choices ("Auto" falls back to the quality preset)
+FRAGMENT_CHOICES = ("1", "2", "4", "8", "16")
+CHUNK_CHOICES = {"1 MB": MiB, "5 MB": 5 * MiB, "10 MB": 10 * MiB, "50 MB": 50 * MiB}
+BUFFER_CHOICES = {"64 KB": 64 * 1024, "256 KB": 256 * 1024, "1 MB": MiB}
+RATE_CHOICES = {
+    "500 KB/s": 500 * 1024,
+    "1 MB/s": MiB,
+    "2 MB/s": 2 * MiB,
+    "5 MB/s": 5 * MiB,
+    "10 MB/s": 10 * MiB,
+}
+NIGHT_HOURS = (0, 7)  # Local hours when the total limit is lifted
+
+# Quality card output choices -> engine OUTPUT_PROFILES keys
+OUTPUT_CHOICES = {"Stream copy": "copy", "MP4 / MP3": "compatible"}
+
+PREVIEW_DEBOUNCE_MS = 600  # Quiet time after typing/pasting before auto-preview
+PLAYLIST_PREVIEW_CACHE = 8  # Enumerated playlists kept for instant re-preview
+URL_PATTERN = re.compile(r"^https?://\S+\.\S+$")
+
+
+class ProgressAggregator:
+    """
+    Latest-value progress slots, repainted by a single main-thread ticker.
+
+    Worker threads only replace their task's slot (a plain dict store, atomic
+    under the GIL), so however often yt-dlp calls back, each card is
+    repainted at most once per tick and only when its state changed. Once a
+    task has ended, late publishes from hooks still running are ignored.
+    """
+
+    def __init__(self, root, render, interval_ms=100):
+        self.root = root
+        self.render = render
+        self.interval_ms = interval_ms
+        self._slots = {}  # task -> latest state
+        self._drawn = {}  # task -> state object last rendered
+        self._ended = weakref.WeakSet()  # tasks whose cards show a final state
+
+    def publish(self, task, **state):
+        if task not in self._ended:
+            self._slots[task] = state
+
+    def discard(self, task, ended=False):
+        """
+        Forget a task so a stale slot can't repaint its card. An ended task
+        (completed, failed, cancelled) takes no new states until revive().
+        """
+        if ended:
+            self._ended.add(task)
+        self._slots.pop(task, None)
+        self._drawn.pop(task, None)
+
+    def revive(self, task):
+        """Accept states for an ended task again, e.g. when it is retried"""
+        self._ended.discard(task)
+
+    def start(self):
+        self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        for task, state in list(self._slots.items()):
+            if task in self._ended:
+                # Published just as the task ended
+                self._slots.pop(task, None)
+            elif self._drawn.get(task) is not state:
+                self._drawn[task] = state
+                self.render(task, state)
+        self.root.after(self.interval_ms, self._tick)
 
-class DownloadTask:
-    def __init__(self, url, quality, path, ui):
-        self.url = url
-        self.quality = quality
-        self.path = path
-        self.ui = ui  # UI dict for this task
-        self.thread = None
+
+class PreviewJob:
+    """Cancellation handle of one preview extraction, shaped like a task's"""
+
+    def __init__(self):
         self.cancel_flag = False
-        self.pause_flag = False
-        self.video_title = ""  # Store video title for cleanup
-        self.partial_files = []  # Track partial download files
+        self.io = CancelScope()
+
+    def cancel(self):
+        """Stop the extraction's requests where they are"""
+        self.cancel_flag = True
+        self.io.interrupt()
 
 
 class VideoDownloader:
     VERSION = "2.1.4"
     GITHUB_REPO = "yourusername/repository-name"
+    PROGRESS_INTERVAL_MS = 100  # Card repaint rate (10 Hz)
 
     def __init__(self, root):
         self.root = root
@@ -44,9 +143,17 @@ class VideoDownloader:
                 pass
 
         self.tasks = []
-        self.download_queue = Queue()
         self.playlist_videos = []  # Store playlist video information
+        self.playlist_selected = bytearray()  # 1 per playlist_videos entry if checked
         self.selected_playlist_videos = []  # Store selected videos from playlist
+        self.playlist_page_listener = None  # Open selection window, if any
+        self.preview_generation = 0  # Only the newest preview may update the UI
+        self._previewed_url = None
+        self._preview_debounce = None
+        self._preview_job = None  # PreviewJob of the preview in flight
+        # url -> (stored_at, title, uploader, videos) of enumerated playlists
+        self._playlist_previews = OrderedDict()
+        self._playlist_previews_lock = threading.Lock()
         self.available_qualities = (
             []
         )  # Store available quality options for current video/playlist
@@ -59,14 +166,64 @@ class VideoDownloader:
         # Variables
         self.download_path = tk.StringVar(value=os.path.expanduser("~/Downloads"))
         self.url_var = tk.StringVar()
+        self.url_var.trace_add("write", self.on_url_changed)
         self.quality_var = tk.StringVar(value="best")
-        self.is_playlist = tk.BooleanVar(value=False)
         self.playlist_detected = False
+        self.playlist_url = None  # URL the current playlist_videos came from
+        self.preview_info = None  # Info dict of the previewed single video
+        self._ffmpeg_error_shown = False
+        self.max_workers_var = tk.IntVar(value=3)
+        self.per_site_var = tk.IntVar(value=0)  # 0 = no per-site cap
+        self.queue_order_var = tk.StringVar(value="FIFO")
+        self.skip_archived_var = tk.BooleanVar(value=True)
+        self.isolate_var = tk.BooleanVar(value=False)
+        self.output_var = tk.StringVar(value="Stream copy")
+        self.fragments_var = tk.StringVar(value="Auto")
+        self.chunk_size_var = tk.StringVar(value="Auto")
+        self.buffer_size_var = tk.StringVar(value="Auto")
+        self.adaptive_fragments_var = tk.BooleanVar(value=False)
+        self.global_limit_var = tk.StringVar(value="Unlimited")
+        self.task_limit_var = tk.StringVar(value="Unlimited")
+        self.night_unthrottled_var = tk.BooleanVar(value=False)
+
+        # Download core; its events arrive on worker threads
+        self.engine = DownloadEngine(max_workers=self.max_workers_var.get())
+        self.extraction_cache = self.engine.extraction_cache
+
+        # Durable record of every task, used to resume after a crash
+        self.journal = DownloadJournal(
+            os.path.join(get_app_data_dir(), "journal.sqlite")
+        )
+        self.engine.add_listener(self.journal.record)
+
+        # Completed video IDs, checked before anything is queued
+        self.archive = DownloadArchive(
+            os.path.join(get_app_data_dir(), "download_archive.txt"),
+            extraction_cache=self.engine.extraction_cache,
+        )
+        self.engine.add_listener(self.archive.record)
+
+        self.thumbnail_cache = ThumbnailCache(
+            os.path.join(get_app_data_dir(), "thumbnails")
+        )
+
+        # Timings per task for the 📊 card panels and the stats export
+        self.telemetry = TelemetryStore()
+        self.engine.add_listener(self.telemetry.record)
+        # UI last, so journal and archive are up to date when cards repaint
+        self.engine.add_listener(self.on_engine_event)
 
         # used by legacy single-download UI (kept but not required)
         self.progress_content = None
 
         self.setup_ui()
+
+        self.progress = ProgressAggregator(
+            self.root, self.render_progress, self.PROGRESS_INTERVAL_MS
+        )
+        self.progress.start()
+        self.update_archive_label()
+        self.root.after(500, self.offer_resume)
         # optional: self.check_for_updates()
 
     def get_icon_path(self):
@@ -275,18 +432,18 @@ class VideoDownloader:
 
         playlist_frame = tk.Frame(url_card_inner, bg=self.colors["card"])
         playlist_frame.pack(fill=tk.X)
-        tk.Checkbutton(
+        tk.Button(
             playlist_frame,
-            text="Download entire playlist",
-            variable=self.is_playlist,
+            text="📑 Batch",
+            command=self.show_batch_window,
             font=("Segoe UI", 9),
-            bg=self.colors["card"],
-            fg=self.colors["text_secondary"],
-            activebackground=self.colors["card"],
-            selectcolor=self.colors["card"],
+            bg="#E0E0E0",
             relief=tk.FLAT,
             bd=0,
-        ).pack(anchor=tk.W)
+            cursor="hand2",
+            padx=10,
+            pady=2,
+        ).pack(side=tk.RIGHT)
 
         # quality card
         quality_card = tk.Frame(
@@ -316,6 +473,37 @@ class VideoDownloader:
 
         self.setup_default_qualities()
 
+        output_frame = tk.Frame(quality_inner, bg=self.colors["card"])
+        output_frame.pack(fill=tk.X, pady=(8, 0))
+        tk.Label(
+            output_frame,
+            text="Output",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+        ).pack(side=tk.LEFT)
+        ttk.Combobox(
+            output_frame,
+            textvariable=self.output_var,
+            values=tuple(OUTPUT_CHOICES),
+            state="readonly",
+            width=12,
+        ).pack(side=tk.LEFT, padx=(8, 0))
+        self.output_var.trace_add("write", self.on_output_changed)
+
+        # Streams the selected quality would download, once a video is previewed
+        self.format_hint = tk.Label(
+            quality_inner,
+            text="",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+            justify=tk.LEFT,
+            anchor="w",
+        )
+        self.format_hint.pack(fill=tk.X, pady=(8, 0))
+        self.quality_var.trace_add("write", lambda *_: self.update_format_hint())
+
         # path card
         path_card = tk.Frame(
             self.sidebar_inner, bg=self.colors["card"], relief=tk.FLAT, bd=0
@@ -364,6 +552,206 @@ class VideoDownloader:
         )
         browse_btn.pack(side=tk.LEFT, padx=(10, 0), ipady=8, ipadx=15)
 
+        # download queue card
+        queue_card = tk.Frame(
+            self.sidebar_inner, bg=self.colors["card"], relief=tk.FLAT, bd=0
+        )
+        queue_card.pack(fill=tk.X, pady=(0, 15))
+        queue_card.configure(
+            highlightbackground=self.colors["border"], highlightthickness=1
+        )
+        queue_inner = tk.Frame(queue_card, bg=self.colors["card"])
+        queue_inner.pack(fill=tk.X, padx=15, pady=15)
+
+        tk.Label(
+            queue_inner,
+            text="⚙ Download Queue",
+            font=("Segoe UI", 11, "bold"),
+            bg=self.colors["card"],
+            fg=self.colors["text_primary"],
+        ).pack(anchor=tk.W, pady=(0, 8))
+
+        workers_frame = tk.Frame(queue_inner, bg=self.colors["card"])
+        workers_frame.pack(fill=tk.X, pady=(0, 6))
+        tk.Label(
+            workers_frame,
+            text="Parallel downloads",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+        ).pack(side=tk.LEFT)
+        tk.Spinbox(
+            workers_frame,
+            from_=1,
+            to=16,
+            width=4,
+            textvariable=self.max_workers_var,
+            font=("Segoe UI", 9),
+            relief=tk.FLAT,
+        ).pack(side=tk.RIGHT)
+
+        per_site_frame = tk.Frame(queue_inner, bg=self.colors["card"])
+        per_site_frame.pack(fill=tk.X, pady=(0, 6))
+        tk.Label(
+            per_site_frame,
+            text="Per site, e.g. YouTube (0 = no limit)",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+        ).pack(side=tk.LEFT)
+        tk.Spinbox(
+            per_site_frame,
+            from_=0,
+            to=16,
+            width=4,
+            textvariable=self.per_site_var,
+            font=("Segoe UI", 9),
+            relief=tk.FLAT,
+        ).pack(side=tk.RIGHT)
+
+        order_frame = tk.Frame(queue_inner, bg=self.colors["card"])
+        order_frame.pack(fill=tk.X)
+        tk.Label(
+            order_frame,
+            text="Order",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+        ).pack(side=tk.LEFT)
+        ttk.Combobox(
+            order_frame,
+            textvariable=self.queue_order_var,
+            values=("FIFO", "Priority"),
+            state="readonly",
+            width=9,
+        ).pack(side=tk.RIGHT)
+
+        tk.Checkbutton(
+            queue_inner,
+            text="Skip already downloaded",
+            variable=self.skip_archived_var,
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+            activebackground=self.colors["card"],
+            selectcolor=self.colors["card"],
+            relief=tk.FLAT,
+            bd=0,
+        ).pack(anchor=tk.W, pady=(6, 0))
+
+        tk.Checkbutton(
+            queue_inner,
+            text="Run each download in its own process",
+            variable=self.isolate_var,
+            command=self.on_queue_settings_changed,
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+            activebackground=self.colors["card"],
+            selectcolor=self.colors["card"],
+            relief=tk.FLAT,
+            bd=0,
+        ).pack(anchor=tk.W)
+
+        archive_frame = tk.Frame(queue_inner, bg=self.colors["card"])
+        archive_frame.pack(fill=tk.X, pady=(6, 0))
+        self.archive_label = tk.Label(
+            archive_frame,
+            text="",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+        )
+        self.archive_label.pack(side=tk.LEFT)
+        for text, command in (
+            ("Export", self.export_archive),
+            ("Import", self.import_archive),
+        ):
+            tk.Button(
+                archive_frame,
+                text=text,
+                command=command,
+                font=("Segoe UI", 8),
+                bg="#F5F5F5",
+                fg=self.colors["text_primary"],
+                relief=tk.FLAT,
+                bd=0,
+                cursor="hand2",
+                activebackground="#E0E0E0",
+            ).pack(side=tk.RIGHT, padx=(4, 0), ipadx=6)
+
+        # transfer card
+        transfer_card = tk.Frame(
+            self.sidebar_inner, bg=self.colors["card"], relief=tk.FLAT, bd=0
+        )
+        transfer_card.pack(fill=tk.X, pady=(0, 15))
+        transfer_card.configure(
+            highlightbackground=self.colors["border"], highlightthickness=1
+        )
+        transfer_inner = tk.Frame(transfer_card, bg=self.colors["card"])
+        transfer_inner.pack(fill=tk.X, padx=15, pady=15)
+
+        tk.Label(
+            transfer_inner,
+            text="⚡ Transfer",
+            font=("Segoe UI", 11, "bold"),
+            bg=self.colors["card"],
+            fg=self.colors["text_primary"],
+        ).pack(anchor=tk.W, pady=(0, 8))
+
+        for label, var, values in (
+            ("Parallel fragments", self.fragments_var, ("Auto",) + FRAGMENT_CHOICES),
+            ("Chunk size", self.chunk_size_var, ("Auto", "Off") + tuple(CHUNK_CHOICES)),
+            ("Buffer size", self.buffer_size_var, ("Auto",) + tuple(BUFFER_CHOICES)),
+            ("Total limit", self.global_limit_var, ("Unlimited",) + tuple(RATE_CHOICES)),
+            ("Per download", self.task_limit_var, ("Unlimited",) + tuple(RATE_CHOICES)),
+        ):
+            row = tk.Frame(transfer_inner, bg=self.colors["card"])
+            row.pack(fill=tk.X, pady=(0, 6))
+            tk.Label(
+                row,
+                text=label,
+                font=("Segoe UI", 9),
+                bg=self.colors["card"],
+                fg=self.colors["text_secondary"],
+            ).pack(side=tk.LEFT)
+            ttk.Combobox(
+                row, textvariable=var, values=values, state="readonly", width=9
+            ).pack(side=tk.RIGHT)
+            var.trace_add("write", self.on_transfer_settings_changed)
+
+        tk.Checkbutton(
+            transfer_inner,
+            text="Adaptive fragments",
+            variable=self.adaptive_fragments_var,
+            command=self.on_transfer_settings_changed,
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+            activebackground=self.colors["card"],
+            selectcolor=self.colors["card"],
+            relief=tk.FLAT,
+            bd=0,
+        ).pack(anchor=tk.W)
+
+        tk.Checkbutton(
+            transfer_inner,
+            text=f"No total limit {NIGHT_HOURS[0]:02d}:00-{NIGHT_HOURS[1]:02d}:00",
+            variable=self.night_unthrottled_var,
+            command=self.on_transfer_settings_changed,
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+            activebackground=self.colors["card"],
+            selectcolor=self.colors["card"],
+            relief=tk.FLAT,
+            bd=0,
+        ).pack(anchor=tk.W)
+
+        self.max_workers_var.trace_add("write", self.on_queue_settings_changed)
+        self.per_site_var.trace_add("write", self.on_queue_settings_changed)
+        self.queue_order_var.trace_add("write", self.on_queue_settings_changed)
+
         # progress parent card (title + inner where per-download cards will be placed)
         self.progress_content = tk.Frame(
             content_frame, bg=self.colors["card"], relief=tk.FLAT, bd=0
@@ -385,6 +773,18 @@ class VideoDownloader:
             anchor="w",
         ).pack(side=tk.LEFT, fill=tk.X)
 
+        tk.Button(
+            header_frame,
+            text="📊 Export Stats",
+            command=self.export_telemetry,
+            font=("Segoe UI", 9),
+            bg="#E0E0E0",
+            relief=tk.FLAT,
+            bd=0,
+            cursor="hand2",
+            padx=8,
+        ).pack(side=tk.RIGHT)
+
         # Create scrollable area for downloads
         scroll_frame = tk.Frame(self.progress_content, bg=self.colors["card"])
         scroll_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=(5, 15))
@@ -490,114 +890,143 @@ class VideoDownloader:
         scrollable_frame.columnconfigure(0, weight=1)
         scrollable_frame.rowconfigure(0, weight=1)
 
+    def on_url_changed(self, *_):
+        """Auto-preview once typing or pasting has paused for a moment"""
+        if self._preview_debounce:
+            self.root.after_cancel(self._preview_debounce)
+            self._preview_debounce = None
+        url = self.url_var.get().strip()
+        if url == self._previewed_url or not URL_PATTERN.match(url):
+            return
+        self._preview_debounce = self.root.after(
+            PREVIEW_DEBOUNCE_MS, self.fetch_preview_threaded
+        )
+
     def fetch_preview_threaded(self):
+        if self._preview_debounce:
+            self.root.after_cancel(self._preview_debounce)
+            self._preview_debounce = None
         url = self.url_var.get().strip()
         if not url:
             messagebox.showerror("Error", "Enter a URL to fetch preview")
             return
+        # Each preview supersedes the one in flight; see post_preview
+        self.preview_generation += 1
+        self._previewed_url = url
+        if self._preview_job is not None:
+            self._preview_job.cancel()  # Frees its network and thread right away
+        self._preview_job = PreviewJob()
         # Run fetch in background thread to avoid blocking UI
-        t = threading.Thread(target=self.load_preview, args=(url,), daemon=True)
+        t = threading.Thread(
+            target=self.load_preview,
+            args=(url, self.preview_generation, self._preview_job),
+            daemon=True,
+        )
         t.start()
 
-    def load_preview(self, url):
-        """Fetch title, thumbnail, channel, duration using yt-dlp and requests in background."""
+    def post_preview(self, generation, fn, *args):
+        """Run fn on the Tk thread, unless a newer preview has started since"""
+
+        def run():
+            if generation == self.preview_generation:
+                fn(*args)
+
+        self.root.after(0, run)
+
+    def load_preview(self, url, generation, job):
+        """
+        Fetch title, thumbnail, channel, duration using yt-dlp in background.
+
+        Stale generations never touch the UI; their extraction is interrupted
+        through job, or stops at the next checkpoint.
+        """
         # Show loading state
-        self.root.after(
-            0, lambda: self.sidebar_title.config(text="🔄 Loading preview...")
+        self.post_preview(
+            generation,
+            lambda: self.sidebar_title.config(text="🔄 Loading preview..."),
         )
-        self.root.after(
-            0,
+        self.post_preview(
+            generation,
             lambda: self.thumbnail_label.config(
                 text="⏳ Loading thumbnail", image="", compound="center"
             ),
         )
-        self.root.after(
-            0, lambda: self.sidebar_meta.config(text="Analyzing video formats...")
+        self.post_preview(
+            generation,
+            lambda: self.sidebar_meta.config(text="Analyzing video formats..."),
         )
 
         # Reset quality options to default while loading
-        self.root.after(0, lambda: self.setup_default_qualities())
+        self.post_preview(generation, lambda: self.setup_default_qualities())
+
+        with self._playlist_previews_lock:
+            cached = self._playlist_previews.get(url)
+            if cached is not None:
+                if time.time() - cached[0] < self.extraction_cache.ttl:
+                    self._playlist_previews.move_to_end(url)
+                else:
+                    del self._playlist_previews[url]
+                    cached = None
+        if cached is not None:
+            print(f"⚡ Using cached playlist: {url}")  # Debug output
+            _, title, uploader, videos = cached
+            self.post_preview(
+                generation, self.show_playlist_start, url, title, uploader
+            )
+            self.post_preview(
+                generation, self.add_playlist_page, videos, uploader, True
+            )
+            return
 
         try:
-            # More robust yt-dlp options for better format extraction
-            ydl_opts = {
-                "quiet": True,  # Reduce console spam
-                "no_warnings": False,
-                "nocheckcertificate": True,
-                "extract_flat": False,
-                "ignoreerrors": True,
-                "listformats": False,  # Don't list formats, just extract
-                "youtube_include_dash_manifest": True,
-                "writeinfojson": False,
-            }
-
-            print(f"🔍 Analyzing URL: {url}")  # Debug output
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-
-            if not info:
-                raise Exception("Could not extract video information")
-
-            print(
-                f"✅ Successfully analyzed. Type: {'📋 Playlist' if 'entries' in info else '🎬 Video'}"
-            )  # Debug
+            info = self.extraction_cache.get(url)
+            if info is not None:
+                print(f"⚡ Using cached metadata for: {url}")  # Debug output
+            else:
+                print(f"🔍 Analyzing URL: {url}")  # Debug output
+
+                # Unprocessed first pass: playlists come back with a lazy
+                # entries generator and videos still need format resolution
+                with tracking_io(job), yt_dlp.YoutubeDL(PLAYLIST_PREVIEW_OPTS) as ydl:
+                    DownloadEngine.track_io(ydl, job)
+                    info = ydl.extract_info(url, download=False, process=False)
+                    if not info:
+                        raise Exception("Could not extract video information")
+
+                    if info.get("_type") in ("playlist", "multi_video"):
+                        # Entries are fetched page by page while we iterate,
+                        # so keep the YoutubeDL instance open until done
+                        self.stream_playlist_entries(info, url, generation)
+                        return
+
+                    if generation != self.preview_generation:
+                        print(f"⏹ Preview superseded: {url}")  # Debug output
+                        return
+                    info = ydl.process_ie_result(info, download=False)
+
+                if not info:
+                    raise Exception("Could not extract video information")
+                self.extraction_cache.put(info, url)
+
+            if "entries" in info:
+                self.stream_playlist_entries(info, url, generation)
+                return
+            if generation != self.preview_generation:
+                print(f"⏹ Preview superseded: {url}")  # Debug output
+                return
+
+            print("✅ Successfully analyzed. Type: 🎬 Video")  # Debug
 
             # Extract available formats for quality detection
             formats = info.get("formats", [])
             if formats:
                 print(f"🎯 Found {len(formats)} available formats")
-                self.setup_dynamic_qualities(formats)
-
-            # Check if it's a playlist
-            is_playlist = "entries" in info and info["entries"]
-            self.playlist_detected = is_playlist
-
-            if is_playlist:
-                # It's a playlist
-                playlist_title = info.get("title", "Unknown Playlist")
-                entries = [
-                    entry for entry in info.get("entries", []) if entry
-                ]  # Filter out None entries
-                self.playlist_videos = []
-
-                print(f"📋 Processing playlist: {len(entries)} videos")
-
-                for entry in entries:
-                    video_info = {
-                        "title": entry.get("title", "Unknown"),
-                        "url": entry.get("webpage_url")
-                        or entry.get("url", "")
-                        or f"https://www.youtube.com/watch?v={entry.get('id', '')}",
-                        "duration": entry.get("duration", 0),
-                        "selected": True,  # Default to selected
-                    }
-                    self.playlist_videos.append(video_info)
-
-                # Update UI for playlist
-                self.root.after(
-                    0, lambda: self.sidebar_title.config(text=f"📋 {playlist_title}")
-                )
-                self.root.after(
-                    0,
-                    lambda: self.sidebar_meta.config(
-                        text=f"Videos: {len(self.playlist_videos)}\n📺 {info.get('uploader', 'Unknown')}"
-                    ),
-                )
-                self.root.after(
-                    0, lambda: self.playlist_select_btn.pack(side=tk.LEFT, padx=(8, 0))
-                )
-                self.root.after(
-                    0,
-                    lambda: self.thumbnail_label.config(
-                        text="📋 Playlist\nPreview", image="", compound="center"
-                    ),
-                )
-                return
-            else:
-                # Single video
-                print(f"🎬 Processing video: {info.get('title', 'Unknown')}")
-                self.root.after(0, lambda: self.playlist_select_btn.pack_forget())
+                self.post_preview(generation, self.setup_dynamic_qualities, formats)
+            self.post_preview(generation, self.set_preview_info, info)
+
+            # Single video
+            print(f"🎬 Processing video: {info.get('title', 'Unknown')}")
+            self.post_preview(generation, self.show_single_video)
 
             title = info.get("title", "Unknown")
             duration = info.get("duration")
@@ -616,40 +1045,25 @@ class VideoDownloader:
 
             # schedule metadata update
             meta_text = f"Duration: {duration_text}\nChannel: {channel}"
-            self.root.after(0, lambda: self.sidebar_title.config(text=title))
-            self.root.after(0, lambda: self.sidebar_meta.config(text=meta_text))
+            self.post_preview(generation, lambda: self.sidebar_title.config(text=title))
+            self.post_preview(
+                generation, lambda: self.sidebar_meta.config(text=meta_text)
+            )
 
             # load thumbnail image (Pillow required)
+            if generation != self.preview_generation:
+                return  # Don't spend a thumbnail fetch on a superseded URL
             if thumbnail_url and Image and ImageTk:
                 try:
                     print(f"Loading thumbnail from: {thumbnail_url}")  # Debug
-                    r = requests.get(
-                        thumbnail_url,
-                        timeout=15,
-                        headers={
-                            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                        },
-                    )
-                    r.raise_for_status()
-                    from io import BytesIO
-
-                    img = Image.open(BytesIO(r.content))
-                    # keep aspect, limit to sidebar width
-                    img.thumbnail(
-                        (280, 180), Image.LANCZOS
-                    )  # Use LANCZOS instead of deprecated ANTIALIAS
-                    self.thumbnail_img = ImageTk.PhotoImage(img)
-                    self.root.after(
-                        0,
-                        lambda: self.thumbnail_label.config(
-                            image=self.thumbnail_img, text=""
-                        ),
-                    )
+                    # keep aspect, limit to sidebar width; cached decoded + on disk
+                    img = self.thumbnail_cache.get(thumbnail_url, (280, 180))
+                    self.post_preview(generation, self.show_sidebar_thumbnail, img)
                     print("Thumbnail loaded successfully")  # Debug
                 except Exception as thumb_error:
                     print(f"Thumbnail error: {thumb_error}")  # Debug
-                    self.root.after(
-                        0,
+                    self.post_preview(
+                        generation,
                         lambda: self.thumbnail_label.config(
                             text="Thumbnail not available", image=""
                         ),
@@ -657,120 +1071,254 @@ class VideoDownloader:
             else:
                 # no pillow or no thumbnail
                 print("No thumbnail URL or Pillow not available")  # Debug
-                self.root.after(
-                    0,
+                self.post_preview(
+                    generation,
                     lambda: self.thumbnail_label.config(
                         text="Thumbnail not available", image=""
                     ),
                 )
         except Exception as e:
+            if job.cancel_flag:
+                print(f"⏹ Preview superseded: {url}")  # Debug output
+                return
             # show failure with detailed error info
             print(f"Preview error: {str(e)}")  # Debug output
             import traceback
 
             traceback.print_exc()  # Print full traceback for debugging
 
-            self.playlist_detected = False
             error_msg = str(e)
             if len(error_msg) > 50:
                 error_msg = error_msg[:50] + "..."
 
-            self.root.after(0, lambda: self.sidebar_title.config(text="Preview failed"))
-            self.root.after(
-                0, lambda: self.sidebar_meta.config(text=f"Error: {error_msg}")
+            self.post_preview(
+                generation, lambda: self.sidebar_title.config(text="Preview failed")
             )
-            self.root.after(0, lambda: self.playlist_select_btn.pack_forget())
-            self.root.after(
-                0,
+            self.post_preview(
+                generation, lambda: self.sidebar_meta.config(text=f"Error: {error_msg}")
+            )
+            self.post_preview(generation, self.show_single_video)
+            self.post_preview(generation, self.set_preview_info, None)
+            self.post_preview(
+                generation,
                 lambda: self.thumbnail_label.config(
                     text="Preview not available", image=""
                 ),
             )
 
-    def _on_frame_configure(self, canvas):
-        canvas.configure(scrollregion=canvas.bbox("all"))
-        canvas.yview_moveto(1.0)
+    def set_preview_info(self, info):
+        self.preview_info = info
+        self.update_format_hint()
 
-    def browse_folder(self):
-        folder = filedialog.askdirectory(initialdir=self.download_path.get())
-        if folder:
-            self.download_path.set(folder)
+    def update_format_hint(self):
+        """Show what the selected quality would download (main thread)"""
+        choice = choose_formats(
+            self.preview_info,
+            self.quality_var.get(),
+            OUTPUT_PROFILES[self.engine.output_profile]["audio_codec"],
+        )
+        if choice is None:
+            self.format_hint.config(text="")
+            return
+        size = f"≈ {format_bytes(choice.size)}" if choice.size else "Size unknown"
+        transcode = "  (re-encoded)" if choice.transcode else ""
+        self.format_hint.config(
+            text=f"🎯 {size} · {choice.label}{transcode}\n{choice.reasons()}"
+        )
 
-    def ensure_ffmpeg(self):
+    def on_output_changed(self, *_):
+        """Applies to tasks as they start"""
+        self.engine.output_profile = OUTPUT_CHOICES[self.output_var.get()]
+        self.update_format_hint()
+
+    def show_single_video(self):
+        """Leave playlist mode (main thread)"""
+        self.playlist_detected = False
+        self.playlist_select_btn.pack_forget()
+
+    def on_queue_settings_changed(self, *_):
+        """Apply worker count / ordering / isolation changes to the running engine"""
         try:
-            subprocess.run(
-                ["ffmpeg", "-version"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                check=True,
-            )
-            return None
-        except Exception:
-            pass
+            workers = int(self.max_workers_var.get())
+            per_site = int(self.per_site_var.get())
+        except (tk.TclError, ValueError):
+            return  # Spinbox is mid-edit
+        self.engine.scheduler.resize(min(max(workers, 1), 16))
+        # 0 leaves the worker pool as the only cap
+        self.engine.host_limiter.max_per_site = min(max(per_site, 0), 16) or None
+        ordering = (
+            DownloadScheduler.PRIORITY
+            if self.queue_order_var.get() == "Priority"
+            else DownloadScheduler.FIFO
+        )
+        self.engine.scheduler.set_ordering(ordering)
+        # Applies to tasks as they start; running ones keep their mode
+        if not self.isolate_var.get():
+            self.engine.process_runner = None
+        elif self.engine.process_runner is None:
+            self.engine.process_runner = ProcessRunner(self.engine)
+
+    def stream_playlist_entries(self, info, url, generation):
+        """
+        Enumerate flat playlist entries and push them to the UI in pages.
 
-        local_appdata = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
-        ffmpeg_root = os.path.join(local_appdata, "VideoDownloader", "ffmpeg")
-        ffmpeg_bin = ffmpeg_root
-        ffmpeg_exe = os.path.join(ffmpeg_bin, "ffmpeg.exe")
-        ffprobe_exe = os.path.join(ffmpeg_bin, "ffprobe.exe")
+        Entries only carry id/title/duration here; formats are resolved
+        later by run_task for the videos that are actually selected.
+        Enumeration stops as soon as a newer preview supersedes this one.
+        """
+        playlist_title = info.get("title") or "Unknown Playlist"
+        uploader = info.get("uploader") or info.get("channel") or "Unknown"
 
-        if os.path.isfile(ffmpeg_exe) and os.path.isfile(ffprobe_exe):
-            return ffmpeg_bin
+        self.post_preview(
+            generation, self.show_playlist_start, url, playlist_title, uploader
+        )
 
-        os.makedirs(ffmpeg_bin, exist_ok=True)
-        try:
-            self.root.after(0, lambda: None)  # safe no-op scheduled on main thread
-        except Exception:
-            pass
+        print(f"📋 Enumerating playlist: {playlist_title}")
 
-        ffmpeg_zip_url = "https://github.com/yt-dlp/FFmpeg-Builds/releases/latest/download/ffmpeg-master-latest-win64-gpl.zip"
-        tmp_dir = tempfile.mkdtemp()
-        zip_path = os.path.join(tmp_dir, "ffmpeg.zip")
+        videos = []
+        page = []
+        for video in iter_playlist_entries(info):
+            if generation != self.preview_generation:
+                # Stops the lazy entries generator from fetching more pages
+                print(f"⏹ Playlist preview superseded: {playlist_title}")
+                return
+            page.append(video)
+            if len(page) >= PLAYLIST_PAGE_SIZE:
+                videos.extend(page)
+                self.post_preview(generation, self.add_playlist_page, page, uploader)
+                page = []
+
+        videos.extend(page)
+        self.post_preview(generation, self.add_playlist_page, page, uploader, True)
+        print(f"📋 Playlist enumerated: {len(videos)} videos")
+
+        with self._playlist_previews_lock:
+            self._playlist_previews[url] = (
+                time.time(),
+                playlist_title,
+                uploader,
+                videos,
+            )
+            self._playlist_previews.move_to_end(url)
+            while len(self._playlist_previews) > PLAYLIST_PREVIEW_CACHE:
+                self._playlist_previews.popitem(last=False)
+
+    def show_playlist_start(self, url, playlist_title, uploader):
+        """Reset the sidebar for a playlist whose pages follow (main thread)"""
+        self.playlist_detected = True
+        self.playlist_url = url
+        self.playlist_videos = []
+        self.playlist_selected = bytearray()
+        self.sidebar_title.config(text=f"📋 {playlist_title}")
+        self.sidebar_meta.config(text=f"Videos: 0 (loading...)\n📺 {uploader}")
+        self.playlist_select_btn.pack(side=tk.LEFT, padx=(8, 0))
+        self.thumbnail_label.config(
+            text="📋 Playlist\nPreview", image="", compound="center"
+        )
+        self.set_preview_info(None)  # Entries are resolved per download
+
+    def add_playlist_page(self, page, uploader, finished=False):
+        """Append one page of playlist entries (main thread)"""
+        if not self.playlist_videos and page and page[0].get("thumbnail"):
+            # Show the first video's thumbnail in place of the placeholder
+            threading.Thread(
+                target=self.load_playlist_thumbnail, args=(page[0],), daemon=True
+            ).start()
+        self.playlist_videos.extend(page)
+        self.playlist_selected.extend(b"\x01" * len(page))  # Default to selected
+        suffix = "" if finished else " (loading...)"
+        self.sidebar_meta.config(
+            text=f"Videos: {len(self.playlist_videos)}{suffix}\n📺 {uploader}"
+        )
+        if self.playlist_page_listener:
+            self.playlist_page_listener(page)
+
+    def on_transfer_settings_changed(self, *_):
+        """Push the Transfer card to the engine; applies to tasks as they start"""
+        chunk = self.chunk_size_var.get()
+        self.engine.transfer = {
+            "fragments": None
+            if self.fragments_var.get() == "Auto"
+            else int(self.fragments_var.get()),
+            "chunk_size": {"Auto": None, "Off": 0}.get(chunk, CHUNK_CHOICES.get(chunk)),
+            "buffer_size": BUFFER_CHOICES.get(self.buffer_size_var.get()),
+        }
+        self.engine.adaptive_fragments = self.adaptive_fragments_var.get()
+
+        governor = self.engine.governor
+        governor.global_limit = RATE_CHOICES.get(self.global_limit_var.get())
+        governor.schedule = (
+            [(NIGHT_HOURS[0], NIGHT_HOURS[1], None)]
+            if self.night_unthrottled_var.get()
+            else []
+        )
+        task_limit = RATE_CHOICES.get(self.task_limit_var.get())
+        for task in self.tasks:
+            if task.state in ("queued", "running"):
+                task.rate_limit = task_limit
+
+    def update_archive_label(self):
+        self.archive_label.config(text=f"📚 Archive: {len(self.archive)} videos")
+
+    def import_archive(self):
+        """Merge a yt-dlp download_archive file into the local index"""
+        path = filedialog.askopenfilename(
+            title="Import download archive",
+            filetypes=[("Download archive", "*.txt"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            added = self.archive.import_file(path)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Import Failed", str(e))
+            return
+        self.update_archive_label()
+        messagebox.showinfo("Archive Imported", f"Added {added} new videos to the archive.")
+
+    def export_archive(self):
+        """Write the local index in yt-dlp download_archive format"""
+        path = filedialog.asksaveasfilename(
+            title="Export download archive",
+            defaultextension=".txt",
+            initialfile="download_archive.txt",
+        )
+        if not path:
+            return
+        try:
+            count = self.archive.export_file(path)
+        except OSError as e:
+            messagebox.showerror("Export Failed", str(e))
+            return
+        messagebox.showinfo("Archive Exported", f"Wrote {count} videos to {path}.")
 
+    def load_playlist_thumbnail(self, video):
         try:
-            with requests.get(ffmpeg_zip_url, stream=True, timeout=20) as r:
-                r.raise_for_status()
-                with open(zip_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=1024 * 128):
-                        if chunk:
-                            f.write(chunk)
-
-            with zipfile.ZipFile(zip_path, "r") as zf:
-                zf.extractall(tmp_dir)
-
-            found_ffmpeg = None
-            found_ffprobe = None
-            for root_dir, dirs, files in os.walk(tmp_dir):
-                if "ffmpeg.exe" in files:
-                    found_ffmpeg = os.path.join(root_dir, "ffmpeg.exe")
-                if "ffprobe.exe" in files:
-                    found_ffprobe = os.path.join(root_dir, "ffprobe.exe")
-                if found_ffmpeg and found_ffprobe:
-                    break
-
-            if not found_ffmpeg or not found_ffprobe:
-                raise RuntimeError("FFmpeg binaries not found in downloaded archive.")
-
-            shutil.copy2(found_ffmpeg, ffmpeg_exe)
-            shutil.copy2(found_ffprobe, ffprobe_exe)
+            img = self.thumbnail_cache.get(video["thumbnail"], (280, 180))
+        except Exception as e:
+            print(f"Playlist thumbnail error: {e}")  # Debug
+            return
 
-            try:
-                self.root.after(0, lambda: None)
-            except Exception:
-                pass
+        def show():
+            # Skip if another URL was previewed in the meantime
+            if self.playlist_videos and self.playlist_videos[0] is video:
+                self.show_sidebar_thumbnail(img)
 
-            return ffmpeg_bin
-        except Exception as e:
-            messagebox.showerror(
-                "FFmpeg Required",
-                f"FFmpeg is required but could not be downloaded automatically.\n\nPlease install FFmpeg and ensure it's on PATH.\n\nError:\n{str(e)}",
-            )
-            return None
-        finally:
-            try:
-                shutil.rmtree(tmp_dir, ignore_errors=True)
-            except Exception:
-                pass
+        self.root.after(0, show)
+
+    def show_sidebar_thumbnail(self, img):
+        """PhotoImage must be created on the Tk thread; keep a reference on self"""
+        self.thumbnail_img = ImageTk.PhotoImage(img)
+        self.thumbnail_label.config(image=self.thumbnail_img, text="")
+
+    def _on_frame_configure(self, canvas):
+        canvas.configure(scrollregion=canvas.bbox("all"))
+        canvas.yview_moveto(1.0)
+
+    def browse_folder(self):
+        folder = filedialog.askdirectory(initialdir=self.download_path.get())
+        if folder:
+            self.download_path.set(folder)
 
     def create_download_card_ui(self, video_title="Downloading..."):
         parent = self.downloads_scrollable_frame
@@ -819,6 +1367,18 @@ class VideoDownloader:
         )
         percent_label.pack(side=tk.RIGHT)
 
+        stats_btn = tk.Button(
+            header,
+            text="📊",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            activebackground=self.colors["card"],
+            relief=tk.FLAT,
+            bd=0,
+            cursor="hand2",
+        )
+        stats_btn.pack(side=tk.RIGHT, padx=(0, 8))
+
         # size_label = tk.Label(
         #     header,
         #     text="",
@@ -887,7 +1447,29 @@ class VideoDownloader:
         )
         cancel_btn.pack(side=tk.LEFT)
 
-        ui = {
+        format_label = tk.Label(
+            btn_frame,
+            text="",
+            font=("Segoe UI", 9),
+            bg=self.colors["card"],
+            fg=self.colors["text_secondary"],
+        )
+        format_label.pack(side=tk.RIGHT)
+
+        # Telemetry panel, packed below everything else when 📊 is toggled
+        stats_panel = tk.Label(
+            inner,
+            text="",
+            font=("Consolas", 9),
+            bg="#F5F5F5",
+            fg=self.colors["text_secondary"],
+            justify=tk.LEFT,
+            anchor="w",
+            padx=8,
+            pady=6,
+        )
+
+        ui = {
             "card": card,
             "title": title_label,
             "percent": percent_label,
@@ -896,159 +1478,277 @@ class VideoDownloader:
             "progress_bar": progress_bar,
             "speed": speed_label,
             "status": status_label,
+            "format": format_label,
             "btn_frame": btn_frame,
             "pause": pause_btn,
             "cancel": cancel_btn,
+            "stats_btn": stats_btn,
+            "stats_panel": stats_panel,
+            "stats_open": False,
         }
         return ui
 
+    def toggle_stats_panel(self, task):
+        ui = task.ui
+        ui["stats_open"] = not ui["stats_open"]
+        if ui["stats_open"]:
+            ui["stats_panel"].pack(fill=tk.X, pady=(8, 0))
+            self.refresh_stats_panel(task)
+        else:
+            ui["stats_panel"].pack_forget()
+
+    def refresh_stats_panel(self, task):
+        """Redraw an open stats panel, then again every second while it stays open"""
+        ui = task.ui
+        if not ui["stats_open"] or not ui["stats_panel"].winfo_exists():
+            return
+        stats = self.telemetry.get(task)
+        ui["stats_panel"].config(text=self.format_telemetry(stats))
+        if stats is None or stats["result"] == "running":
+            self.root.after(1000, lambda: self.refresh_stats_panel(task))
+
+    @staticmethod
+    def format_telemetry(stats):
+        if stats is None:
+            return "Waiting to start..."
+
+        def seconds(value):
+            return "--" if value is None else f"{value:.2f} s"
+
+        def rate(value):
+            return "--" if not value else f"{format_bytes(int(value))}/s"
+
+        def size(value):
+            return "--" if not value else format_bytes(int(value))
+
+        lines = [
+            f"Format       {stats['format'] or '--'}"
+            f"    Estimated  {size(stats['estimated_bytes'])}"
+            f"    Got  {size(stats['bytes'])}",
+            f"Extraction   {seconds(stats['extraction_s'])}"
+            f"    First byte  {seconds(stats['ttfb_s'])}",
+            f"Avg speed    {rate(stats['avg_speed'])}"
+            f"    p95  {rate(stats['p95_speed'])}    max  {rate(stats['max_speed'])}",
+            f"Stalls       {stats['stalls']} ({seconds(stats['stalled_s'])})"
+            f"    Retries  {stats['retries']}",
+            f"Postprocess  {seconds(stats['postprocess_s'])}",
+        ]
+        for name, elapsed in stats["postprocessors"].items():
+            lines.append(f"  {name:<11}{seconds(elapsed)}")
+        return "\n".join(lines)
+
+    def export_telemetry(self):
+        """Save the telemetry ring buffer as CSV or JSON (by extension)"""
+        path = filedialog.asksaveasfilename(
+            title="Export download stats",
+            defaultextension=".csv",
+            initialfile="download_stats.csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")],
+        )
+        if not path:
+            return
+        try:
+            if path.lower().endswith(".json"):
+                count = self.telemetry.export_json(path)
+            else:
+                count = self.telemetry.export_csv(path)
+        except OSError as e:
+            messagebox.showerror("Export Failed", str(e))
+            return
+        messagebox.showinfo("Stats Exported", f"Wrote {count} downloads to {path}.")
+
     def toggle_pause_task(self, task):
         # schedule UI update on main thread
         def do_toggle():
-            if task.pause_flag:
-                task.pause_flag = False
+            running = task.state == "running"
+            if not self.engine.toggle_pause(task):
                 try:
-                    task.ui["pause"].config(text="Pause")
-                    task.ui["status"].config(text="Resuming...")
+                    task.ui["pause"].config(text="⏸️ Pause", bg="#bf8200")
+                    task.ui["status"].config(
+                        text="Resuming..." if running else "⏳ Queued"
+                    )
                 except Exception:
                     pass
             else:
-                task.pause_flag = True
+                self.progress.discard(task)
                 try:
                     task.ui["pause"].config(text="▶️ Resume", bg="#00bf46")
-                    task.ui["status"].config(text="Paused")
+                    # A running transfer is stopped at its next progress update
+                    task.ui["status"].config(text="Pausing..." if running else "Paused")
                 except Exception:
                     pass
 
         self.root.after(0, do_toggle)
 
+    def reset_card_controls(self, task):
+        """
+        Re-enable pause and cancel for a task that will run again, e.g. after
+        its postprocessing stage disabled them and it was retried (main thread)
+        """
+        if task.cancel_flag or task.pause_flag:
+            return  # Its cancelled/paused UI stays
+        try:
+            task.ui["pause"].config(text="⏸️ Pause", bg="#bf8200", state=tk.NORMAL)
+            task.ui["cancel"].config(state=tk.NORMAL, bg="#F44336", fg="white")
+        except Exception:
+            pass
+
+    def show_paused_ui(self, task):
+        """The transfer has stopped and the worker is free (main thread)"""
+        self.progress.discard(task)
+        try:
+            task.ui["status"].config(text="⏸️ Paused")
+            task.ui["speed"].config(text="Speed: --")
+        except Exception:
+            pass
+
     def cancel_task(self, task):
-        task.cancel_flag = True
+        idle = task.state in ("queued", "paused", "retrying")
+        self.engine.cancel(task)
+        if idle:
+            return  # The engine reports "cancelled" straight away
 
         def do_cancel():
+            self.progress.discard(task, ended=True)
             try:
                 task.ui["status"].config(text="Cancelling...", fg="#FF9800")
                 task.ui["cancel"].config(state=tk.DISABLED, bg="#CCCCCC", fg="#666666")
                 task.ui["pause"].config(state=tk.DISABLED, bg="#CCCCCC", fg="#666666")
-
-                # Clean up partial files in background
-                cleanup_thread = threading.Thread(
-                    target=self.cleanup_partial_files, args=(task,), daemon=True
-                )
-                cleanup_thread.start()
-
             except Exception:
                 pass
 
         self.root.after(0, do_cancel)
 
-    def cleanup_partial_files(self, task):
-        """Clean up partial download files when cancelled"""
+    def retry_task(self, task):
+        """Retry a failed download on its own card; its .part file is continued"""
+        self.progress.revive(task)
         try:
-            # Wait a moment for the download to fully stop
-            time.sleep(2)
-
-            if task.video_title and task.path:
-                # Look for partial files with the video title
-                base_name = task.video_title
-                search_patterns = [
-                    os.path.join(task.path, f"{base_name}*.part"),
-                    os.path.join(
-                        task.path, f"{base_name}*.f*"
-                    ),  # Format-specific files
-                    os.path.join(task.path, f"{base_name}*.temp"),
-                    os.path.join(
-                        task.path, f"*{base_name[:20]}*.part"
-                    ),  # Partial name match
-                ]
-
-                files_deleted = []
-                for pattern in search_patterns:
-                    for file_path in glob.glob(pattern):
-                        try:
-                            if os.path.exists(file_path):
-                                os.remove(file_path)
-                                files_deleted.append(os.path.basename(file_path))
-                        except:
-                            pass
-
-                if files_deleted:
-                    print(
-                        f"🗑️ Cleaned up {len(files_deleted)} partial files: {files_deleted}"
-                    )
+            task.ui["cancel"].config(
+                text="Cancel",
+                bg="#F44336",
+                fg="white",
+                command=lambda: self.cancel_task(task),
+            )
+            task.ui["pause"].config(text="⏸️ Pause", bg="#bf8200", state=tk.NORMAL)
+            task.ui["status"].config(
+                text="⏳ Queued", fg=self.colors["text_secondary"]
+            )
+        except Exception:
+            pass
+        self.engine.retry(task)
 
+    def offer_resume(self):
+        """Offer to re-queue downloads a previous session left unfinished"""
+        try:
+            pending = self.journal.pending()
         except Exception as e:
-            print(f"⚠️ Error cleaning up files: {e}")
-
-    def retry_task(self, task):
-        """Retry a failed download"""
-        # Create a new task with the same parameters
-        ui = self.create_download_card_ui(task.ui["title"].cget("text"))
-
-        new_task = DownloadTask(
-            url=task.url,
-            quality=task.quality,
-            path=task.path,
-            ui=ui,
-        )
-
-        ui["cancel"].config(command=lambda t=new_task: self.cancel_task(t))
-        ui["pause"].config(command=lambda t=new_task: self.toggle_pause_task(t))
+            print(f"⚠️ Could not read download journal: {e}")
+            return
+        if not pending:
+            return
 
-        new_task.thread = threading.Thread(
-            target=self.run_task, args=(new_task,), daemon=True
-        )
-        new_task.thread.start()
+        if not messagebox.askyesno(
+            "Resume Downloads",
+            f"{len(pending)} download(s) from a previous session did not finish.\n\n"
+            "Resume them now? Partially downloaded files will be continued.",
+        ):
+            self.journal.dismiss([row["id"] for row in pending])
+            return
 
-        self.tasks.append(new_task)
+        for row in pending:
+            ui = self.create_download_card_ui(row["title"] or "Downloading...")
+            task = DownloadTask(
+                url=row["url"],
+                quality=row["quality"],
+                path=row["path"],
+                ui=ui,
+                priority=row["priority"],
+            )
+            task.journal_id = row["id"]
+            self.enqueue_task(task)
 
-    def make_progress_hook(self, task):
+    def on_engine_event(self, task, event, data):
         """
-        Returns a function suitable for yt-dlp progress_hooks.
-        It schedules UI updates on the main thread via root.after.
-        If task.pause_flag is True, it will sleep inside the hook (pausing the download thread).
+        Route engine events (worker threads) to the UI. Progress-like events
+        only update the task's slot in self.progress; one-off state changes
+        are scheduled on the Tk thread.
         """
+        if event == "progress":
+            self.progress.publish(task, **data)
+        elif event == "processing":
+            self.progress.publish(task, percent=100.0, status="Processing...")
+        elif event == "stage" and data["name"] != "downloading":
+            status = {
+                "waiting": "⏳ Waiting to process...",
+                "processing": "⚙ Processing...",
+            }[data["name"]]
+            self.progress.publish(task, percent=100.0, status=status)
+            # The transfer is over, so there is nothing left to pause
+            self.root.after(0, lambda: task.ui["pause"].config(state=tk.DISABLED))
+        elif event == "paused":
+            self.root.after(0, lambda: self.show_paused_ui(task))
+        elif event == "started":
+            self.root.after(0, lambda: task.ui["status"].config(text="Starting..."))
+        elif event == "info":
+            self.root.after(0, lambda: self.show_task_info(task, data))
+        elif event == "completed":
+            self.root.after(0, lambda: self.show_completed_ui(task, data))
+        elif event == "cancelled":
+            self.root.after(0, lambda: self.show_cancelled_ui(task))
+        elif event == "retrying":
+            self.progress.publish(
+                task,
+                status=f"↻ Retry {data['attempt']} in {data['delay']:.0f}s "
+                f"({data['error_class']})",
+                speed=None,
+            )
+            self.root.after(0, lambda: self.reset_card_controls(task))
+        elif event == "queued":
+            self.root.after(0, lambda: self.reset_card_controls(task))
+        elif event == "backoff":
+            self.progress.publish(
+                task,
+                status=f"🐢 {data['host']} is cooling down, {data['delay']:.0f}s",
+            )
+        elif event == "failed":
+            self.root.after(
+                0,
+                lambda: self.show_failed_ui(
+                    task, data["error"], data.get("error_class")
+                ),
+            )
+        elif event == "ffmpeg_missing" and not self._ffmpeg_error_shown:
+            self._ffmpeg_error_shown = True
+            self.root.after(
+                0,
+                lambda: messagebox.showerror(
+                    "FFmpeg Required",
+                    f"FFmpeg is required but could not be downloaded automatically.\n\nPlease install FFmpeg and ensure it's on PATH.\n\nError:\n{data['error']}",
+                ),
+            )
 
-        def hook(d):
-            if task.cancel_flag:
-                # Raise to abort download inside yt-dlp
-                raise Exception("Cancelled")
-
-            # If paused, block here until resumed or cancelled
-            while task.pause_flag and not task.cancel_flag:
-                # schedule a UI update to show paused state
-                try:
-                    self.root.after(0, lambda: task.ui["status"].config(text="Paused"))
-                except Exception:
-                    pass
-                time.sleep(0.25)
-
-            if task.cancel_flag:
-                raise Exception("Cancelled")
-
-            status = d.get("status")
-            if status == "downloading":
-                downloaded = d.get("downloaded_bytes", 0)
-                total = d.get("total_bytes", 0) or d.get("total_bytes_estimate", 0)
-                percent = (downloaded * 100 / total) if total else 0.0
-
-                # format sizes
-                def format_bytes(b):
-                    if b >= 1024**3:
-                        return f"{round(b / (1024 ** 3))} GB"
-                    if b >= 1024**2:
-                        return f"{round(b / (1024 ** 2))} MB"
-                    if b >= 1024:
-                        return f"{round(b / 1024)} KB"
-                    return f"{b} B"
-
-                downloaded_str = format_bytes(downloaded) if downloaded else ""
-                total_str = format_bytes(total) if total else ""
-                size_text = (
-                    f"{downloaded_str} / {total_str}" if total else downloaded_str
-                )
+    def show_task_info(self, task, data):
+        """Title and picked formats once the task's metadata is known (main thread)"""
+        task.ui["title"].config(text=data["title"])
+        choice = data.get("format")
+        if choice is not None:
+            size = f" · ≈ {format_bytes(choice.size)}" if choice.size else ""
+            task.ui["format"].config(text=f"🎯 {choice.label}{size}")
 
-                speed = d.get("speed", 0)
+    def render_progress(self, task, state):
+        """Repaint one card from its latest published progress state (main thread)"""
+        try:
+            if "percent" in state:
+                percent = state["percent"]
+                task.ui["percent"].config(text=f"{percent:.0f}%")
+                # update canvas bar width
+                canvas = task.ui["progress_canvas"]
+                width = max(canvas.winfo_width(), 2)
+                new_width = (width * percent) / 100.0
+                canvas.coords(task.ui["progress_bar"], 0, 0, new_width, 8)
+
+            if "speed" in state:
+                speed = state["speed"]
                 if speed:
                     if speed > 1024 * 1024:
                         speed_text = f"⚡ {speed / (1024 * 1024):.2f} MB/s"
@@ -1056,177 +1756,149 @@ class VideoDownloader:
                         speed_text = f"⚡ {speed / 1024:.1f} KB/s"
                 else:
                     speed_text = "Speed: ---"
+                if state.get("allocation"):
+                    # Share of the bandwidth cap currently granted to this task
+                    speed_text += f"  ⚖ {format_bytes(int(state['allocation']))}/s"
+                task.ui["speed"].config(text=speed_text)
+
+            status_text = state.get("status")
+            if status_text is None and "downloaded" in state:
+                downloaded, total = state["downloaded"], state["total"]
+                downloaded_str = format_bytes(downloaded) if downloaded else ""
+                total_str = format_bytes(total) if total else ""
+                status_text = "⬇ " + (
+                    f"{downloaded_str} / {total_str}" if total else downloaded_str
+                )
+            if status_text is not None:
+                task.ui["status"].config(text=status_text)
+        except Exception:
+            pass
 
-                # schedule UI update
-                def ui_update():
-                    try:
-                        task.ui["percent"].config(text=f"{percent:.0f}%")
-                        task.ui["speed"].config(text=speed_text)
-                        task.ui["status"].config(text=size_text)
-                        # update canvas bar width
-                        canvas = task.ui["progress_canvas"]
-                        width = max(canvas.winfo_width(), 2)
-                        new_width = (width * percent) / 100.0
-                        canvas.coords(task.ui["progress_bar"], 0, 0, new_width, 8)
-                    except Exception:
-                        pass
-
-                self.root.after(0, ui_update)
-
-            elif status == "finished":
-
-                def ui_finished():
-                    try:
-                        task.ui["percent"].config(text="100%")
-                        task.ui["status"].config(text="Processing...")
-                        canvas = task.ui["progress_canvas"]
-                        width = max(canvas.winfo_width(), 2)
-                        canvas.coords(task.ui["progress_bar"], 0, 0, width, 8)
-                    except Exception:
-                        pass
-
-                self.root.after(0, ui_finished)
-
-        return hook
-
-    def run_task(self, task: DownloadTask):
-        url = task.url
-        quality = task.quality
-        download_path = task.path
-
-        # Ensure ffmpeg
-        ffmpeg_dir = None
+    def show_completed_ui(self, task, data):
+        self.progress.discard(task, ended=True)
+        self.update_archive_label()
+        # Badge: was anything re-encoded, and which container came out
+        badge = "🔁 Re-encoded" if data.get("transcoded") else "⚡ Stream copy"
+        ext = os.path.splitext(data.get("filename") or "")[1]
+        if ext:
+            badge += f" ({ext})"
         try:
-            ffmpeg_dir = self.ensure_ffmpeg()
+            task.ui["status"].config(
+                text=f"✓ Completed · {badge}", fg=self.colors["accent"]
+            )
+            task.ui["percent"].config(text="100%", fg=self.colors["accent"])
+            # Hide progress elements but keep title
+            progress_parent = task.ui["progress_canvas"].master
+            progress_parent.pack_forget()
+            task.ui["speed"].pack_forget()
+            task.ui["btn_frame"].pack_forget()
         except Exception:
-            ffmpeg_dir = None
-
-        ydl_opts = {
-            "outtmpl": os.path.join(download_path, "%(title)s.%(ext)s"),
-            "progress_hooks": [self.make_progress_hook(task)],
-            "merge_output_format": "mp4",
-        }
+            pass
 
-        if ffmpeg_dir:
-            ydl_opts["ffmpeg_location"] = ffmpeg_dir
-
-        # Format handling
-        if quality == "audio":
-            ydl_opts.update(
-                {
-                    "format": "bestaudio/best",
-                    "postprocessors": [
-                        {
-                            "key": "FFmpegExtractAudio",
-                            "preferredcodec": "mp3",
-                            "preferredquality": "192",
-                        }
-                    ],
-                }
-            )
-        elif quality == "best":
-            ydl_opts["format"] = (
-                "bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best"
+    def show_failed_ui(self, task, error, error_class=None):
+        self.progress.discard(task, ended=True)
+        try:
+            prefix = f"✗ Failed ({error_class})" if error_class else "✗ Failed"
+            task.ui["status"].config(text=f"{prefix}: {error}", fg="#F44336")
+
+            # Replace cancel button with retry button for failed downloads
+            task.ui["cancel"].config(
+                text="Retry",
+                bg="#4CAF50",
+                fg="white",
+                state=tk.NORMAL,
+                command=lambda: self.retry_task(task),
             )
-        else:
-            # numeric like '720', '480'
-            try:
-                h = int(str(quality).replace("p", ""))
-                ydl_opts["format"] = (
-                    f"bestvideo[height<={h}][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<={h}]+bestaudio/best"
-                )
-            except Exception:
-                ydl_opts["format"] = "best"
+            task.ui["pause"].config(state=tk.DISABLED)
+        except Exception:
+            pass
 
+    def show_cancelled_ui(self, task):
+        """Collapse a card to its struck-through title"""
+        self.progress.discard(task, ended=True)
         try:
-            # Try to extract info to get title and update card title
-            try:
-                with yt_dlp.YoutubeDL({}) as ydl_info:
-                    info = ydl_info.extract_info(url, download=False)
-                    title = info.get("title") or url
-                    # schedule title update
-                    self.root.after(0, lambda: task.ui["title"].config(text=title))
-
-                    if self.is_playlist:
-                        task.path =  os.mkdir(self.download_path+f"/{title}/")
-            except Exception:
-                pass
+            # Simplified cancelled UI - only title with strikethrough
+            title_text = task.ui["title"].cget("text")
+            task.ui["title"].config(
+                text=f"\u0336".join(title_text) + "\u0336",  # Unicode strikethrough
+                fg="#999999",
+                font=("Segoe UI", 11, "bold"),
+            )
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            # Hide all other elements except title
+            widgets_to_hide = ["percent", "speed", "status", "btn_frame"]
+            for widget_name in widgets_to_hide:
+                if widget_name in task.ui:
+                    try:
+                        widget = task.ui[widget_name]
+                        if hasattr(widget, "pack_forget"):
+                            widget.pack_forget()
+                        elif hasattr(widget, "grid_forget"):
+                            widget.grid_forget()
+                    except:
+                        pass
 
-            def ui_on_complete():
+            # Hide progress bar area
+            if "progress_canvas" in task.ui:
                 try:
-                    task.ui["status"].config(
-                        text="✓ Completed", fg=self.colors["accent"]
-                    )
-                    task.ui["percent"].config(text="100%", fg=self.colors["accent"])
-                    # Hide progress elements but keep title
                     progress_parent = task.ui["progress_canvas"].master
                     progress_parent.pack_forget()
-                    task.ui["speed"].pack_forget()
-                    task.ui["btn_frame"].pack_forget()
-                except Exception:
+                except:
                     pass
 
-            self.root.after(0, ui_on_complete)
-        except Exception as e:
+            # Make card background slightly gray
+            task.ui["card"].config(bg="#FAFAFA")
+        except Exception:
+            pass
 
-            def ui_on_fail():
-                try:
-                    if task.cancel_flag:
-                        # Simplified cancelled UI - only title with strikethrough
-                        title_text = task.ui["title"].cget("text")
-                        task.ui["title"].config(
-                            text=f"\u0336".join(title_text)
-                            + "\u0336",  # Unicode strikethrough
-                            fg="#999999",
-                            font=("Segoe UI", 11, "bold"),
-                        )
-
-                        # Hide all other elements except title
-                        widgets_to_hide = ["percent", "speed", "status", "btn_frame"]
-                        for widget_name in widgets_to_hide:
-                            if widget_name in task.ui:
-                                try:
-                                    widget = task.ui[widget_name]
-                                    if hasattr(widget, "pack_forget"):
-                                        widget.pack_forget()
-                                    elif hasattr(widget, "grid_forget"):
-                                        widget.grid_forget()
-                                except:
-                                    pass
-
-                        # Hide progress bar area
-                        if "progress_canvas" in task.ui:
-                            try:
-                                progress_parent = task.ui["progress_canvas"].master
-                                progress_parent.pack_forget()
-                            except:
-                                pass
-
-                        # Make card background slightly gray
-                        task.ui["card"].config(bg="#FAFAFA")
+    def enqueue_task(self, task):
+        """Wire up card buttons and hand the task to the scheduler"""
+        task.ui["cancel"].config(command=lambda t=task: self.cancel_task(t))
+        task.ui["pause"].config(command=lambda t=task: self.toggle_pause_task(t))
+        task.ui["stats_btn"].config(command=lambda t=task: self.toggle_stats_panel(t))
+        task.ui["status"].config(text="⏳ Queued")
+        task.ui["percent"].config(text="--")
 
-                    else:
-                        task.ui["status"].config(
-                            text=f"✗ Failed: {str(e)}", fg="#F44336"
-                        )
-
-                        # Replace cancel button with retry button for failed downloads
-                        task.ui["cancel"].config(
-                            text="Retry",
-                            bg="#4CAF50",
-                            fg="white",
-                            state=tk.NORMAL,
-                            command=lambda: self.retry_task(task),
-                        )
-                        task.ui["pause"].config(state=tk.DISABLED)
+        task.rate_limit = RATE_CHOICES.get(self.task_limit_var.get())
 
-                except Exception:
-                    pass
+        self.tasks.append(task)
+        self.engine.submit(task)
+
+    def queue_videos(self, videos):
+        """
+        Queue {url, title, key} dicts (playlist or batch entries), leaving out
+        archived ones when enabled. Returns how many were queued.
+        """
+        if self.skip_archived_var.get():
+            # Drop videos already in the archive before any task exists
+            wanted = [
+                video
+                for video in videos
+                if not self.archive.contains_url(video["url"], video.get("key"))
+            ]
+            skipped = len(videos) - len(wanted)
+            if skipped:
+                print(f"📚 Skipping {skipped} already downloaded videos")
+            if not wanted:
+                messagebox.showinfo(
+                    "Already Downloaded",
+                    "All selected videos are already in the download archive.",
+                )
+                return 0
+            videos = wanted
 
-            self.root.after(0, ui_on_fail)
+        for video in videos:
+            ui = self.create_download_card_ui(video["title"])
+
+            task = DownloadTask(
+                url=video["url"],
+                quality=self.quality_var.get(),
+                path=self.download_path.get(),
+                ui=ui,
+                priority=1,  # Single downloads jump ahead of playlists
+            )
+            self.enqueue_task(task)
+        return len(videos)
 
     def start_download(self):
         url = self.url_var.get().strip()
@@ -1235,35 +1907,34 @@ class VideoDownloader:
             return
 
         # Handle playlist downloads
-        if self.playlist_detected and self.playlist_videos:
-            selected_videos = [v for v in self.playlist_videos if v["selected"]]
+        if (
+            self.playlist_detected
+            and self.playlist_videos
+            and self.playlist_url == url
+        ):
+            selected_videos = [
+                video
+                for video, selected in zip(self.playlist_videos, self.playlist_selected)
+                if selected
+            ]
             if not selected_videos:
                 messagebox.showwarning(
                     "No Selection", "No videos selected from playlist."
                 )
                 return
 
-            # Download selected videos from playlist
-            for video in selected_videos:
-                ui = self.create_download_card_ui(video["title"])
-
-                task = DownloadTask(
-                    url=video["url"],
-                    quality=self.quality_var.get(),
-                    path=self.download_path.get(),
-                    ui=ui,
-                )
-
-                ui["cancel"].config(command=lambda t=task: self.cancel_task(t))
-                ui["pause"].config(command=lambda t=task: self.toggle_pause_task(t))
-
-                task.thread = threading.Thread(
-                    target=self.run_task, args=(task,), daemon=True
+            self.queue_videos(selected_videos)
+        else:
+            if (
+                self.skip_archived_var.get()
+                and self.archive.contains_url(url)
+                and not messagebox.askyesno(
+                    "Already Downloaded",
+                    "This video is already in the download archive.\n\nDownload it again?",
                 )
-                task.thread.start()
+            ):
+                return
 
-                self.tasks.append(task)
-        else:
             # Single video download
             ui = self.create_download_card_ui()
 
@@ -1273,21 +1944,12 @@ class VideoDownloader:
                 path=self.download_path.get(),
                 ui=ui,
             )
-
-            ui["cancel"].config(command=lambda t=task: self.cancel_task(t))
-            ui["pause"].config(command=lambda t=task: self.toggle_pause_task(t))
-
-            task.thread = threading.Thread(
-                target=self.run_task, args=(task,), daemon=True
-            )
-            task.thread.start()
-
-            self.tasks.append(task)
+            self.enqueue_task(task)
 
     # minimal update check wrapper (safe)
     def check_for_updates(self, auto=True):
         try:
-            response = requests.get(
+            response = get_http_session().get(
                 f"https://api.github.com/repos/{self.GITHUB_REPO}/releases/latest",
                 timeout=5,
             )
@@ -1402,7 +2064,13 @@ class VideoDownloader:
             self.quality_radios.append(radio)
 
     def show_playlist_selection(self):
-        """Show a window to select videos from a playlist"""
+        """
+        Show a window to select videos from a playlist.
+
+        Rows live in a ttk.Treeview, which only draws what is on screen, and
+        the checked state is a bytearray parallel to self.playlist_videos
+        rather than one BooleanVar per row.
+        """
         if not self.playlist_videos:
             messagebox.showwarning("No Playlist", "Please fetch a playlist first.")
             return
@@ -1437,6 +2105,13 @@ class VideoDownloader:
         content_frame = tk.Frame(selection_window, bg=self.colors["background"])
         content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
 
+        # Working copy of the checked state; written back on Confirm
+        selection = bytearray(self.playlist_selected)
+        view = []  # playlist indices currently shown, in row order
+        view_pos = {}  # playlist index -> its position in view
+        filter_var = tk.StringVar()
+        anchor = {"index": None}  # last clicked row, for shift-click ranges
+
         # Action buttons frame
         action_frame = tk.Frame(content_frame, bg=self.colors["background"])
         action_frame.pack(fill=tk.X, pady=(0, 10))
@@ -1444,7 +2119,7 @@ class VideoDownloader:
         select_all_btn = tk.Button(
             action_frame,
             text="Select All",
-            command=lambda: self.toggle_all_videos(True, video_vars),
+            command=lambda: set_checked(view, True),
             font=("Segoe UI", 10),
             bg=self.colors["accent"],
             fg="white",
@@ -1457,7 +2132,7 @@ class VideoDownloader:
         deselect_all_btn = tk.Button(
             action_frame,
             text="Deselect All",
-            command=lambda: self.toggle_all_videos(False, video_vars),
+            command=lambda: set_checked(view, False),
             font=("Segoe UI", 10),
             bg="#FF5722",
             fg="white",
@@ -1467,82 +2142,233 @@ class VideoDownloader:
         )
         deselect_all_btn.pack(side=tk.LEFT)
 
-        # Scrollable list
-        canvas = tk.Canvas(
-            content_frame, bg=self.colors["background"], highlightthickness=0
-        )
-        scrollbar = ttk.Scrollbar(
-            content_frame, orient="vertical", command=canvas.yview
+        filter_entry = tk.Entry(
+            action_frame,
+            textvariable=filter_var,
+            font=("Segoe UI", 10),
+            bg="#FFFFFF",
+            fg=self.colors["text_primary"],
+            relief=tk.FLAT,
+            bd=0,
+            width=24,
         )
-        scrollable_frame = tk.Frame(canvas, bg=self.colors["background"])
+        filter_entry.pack(side=tk.RIGHT, ipady=4, ipadx=6)
+        tk.Label(
+            action_frame,
+            text="🔎",
+            font=("Segoe UI", 10),
+            bg=self.colors["background"],
+            fg=self.colors["text_secondary"],
+        ).pack(side=tk.RIGHT, padx=(10, 4))
 
-        scrollable_frame.bind(
-            "<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        count_label = tk.Label(
+            content_frame,
+            text="",
+            font=("Segoe UI", 9),
+            bg=self.colors["background"],
+            fg=self.colors["text_secondary"],
+            anchor="w",
         )
+        count_label.pack(fill=tk.X, pady=(0, 6))
+
+        # Virtualized list
+        list_frame = tk.Frame(content_frame, bg=self.colors["background"])
+        list_frame.pack(fill=tk.BOTH, expand=True)
 
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        style = ttk.Style(selection_window)
+        style.configure("Playlist.Treeview", rowheight=ROW_THUMB_SIZE[1] + 4)
 
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tree = ttk.Treeview(
+            list_frame,
+            columns=("check", "title", "duration"),
+            show="tree headings",
+            selectmode="extended",
+            style="Playlist.Treeview",
+        )
+        tree.column("#0", width=ROW_THUMB_SIZE[0] + 12, stretch=False)
+        tree.heading("check", text="✓")
+        tree.heading("title", text="Title", anchor="w")
+        tree.heading("duration", text="Duration")
+        tree.column("check", width=40, stretch=False, anchor="center")
+        tree.column("title", width=480, anchor="w")
+        tree.column("duration", width=90, stretch=False, anchor="e")
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        # Add videos to selection list
-        video_vars = []
-        for i, video in enumerate(self.playlist_videos):
-            var = tk.BooleanVar(value=video["selected"])
-            video_vars.append(var)
+        # Thumbnails and missing metadata are prefetched for the rows on
+        # screen (plus a screen either side) and dropped when they scroll away.
+        # Workers return PIL images already scaled to ROW_THUMB_SIZE, so the
+        # Tk thread only wraps them in a PhotoImage.
+        thumb_prefetcher = Prefetcher(workers=6, name="thumbs")
+        meta_prefetcher = Prefetcher(workers=2, name="meta")
+        row_images = {}  # playlist index -> PhotoImage, kept alive with the window
+        meta_done = set()  # indices whose metadata lookup already finished
+        prefetch = {"job": None, "closed": False}
+
+        def visible_indices():
+            if not view:
+                return []
+            first, last = tree.yview()
+            lo = int(first * len(view))
+            hi = min(len(view), int(last * len(view)) + 1)
+            margin = hi - lo
+            return view[max(0, lo - margin) : hi + margin]
+
+        def fetch_row_meta(url):
+            # Full extraction is cached and reused if the video is downloaded
+            try:
+                info = self.engine.extract_info(url)
+            except Exception as e:
+                print(f"Row metadata error: {e}")  # Debug
+                return {}
+            return {"duration": info.get("duration"), "thumbnail": info.get("thumbnail")}
+
+        def apply_thumbnail(index, img):
+            if prefetch["closed"]:
+                return
+            row_images[index] = ImageTk.PhotoImage(img)
+            if tree.exists(str(index)):
+                tree.item(str(index), image=row_images[index])
 
-            # Video card
-            video_card = tk.Frame(
-                scrollable_frame, bg=self.colors["card"], relief=tk.FLAT, bd=0
-            )
-            video_card.pack(fill=tk.X, pady=5)
-            video_card.configure(
-                highlightbackground=self.colors["border"], highlightthickness=1
-            )
+        def apply_meta(index, meta):
+            if prefetch["closed"]:
+                return
+            meta_done.add(index)
+            video = self.playlist_videos[index]
+            for field, value in meta.items():
+                if value and not video.get(field):
+                    video[field] = value
+            if tree.exists(str(index)):
+                tree.set(str(index), "duration", self.format_duration(video["duration"]))
+            schedule_prefetch()  # A thumbnail URL may have turned up
+
+        def prefetch_visible():
+            prefetch["job"] = None
+            wanted = visible_indices()
+            keys = set(wanted)
+            thumb_prefetcher.retain(keys)
+            meta_prefetcher.retain(keys)
+            for index in wanted:
+                video = self.playlist_videos[index]
+                if index not in row_images and video.get("thumbnail") and ImageTk:
+                    thumb_prefetcher.request(
+                        index,
+                        lambda url=video["thumbnail"]: self.thumbnail_cache.get(
+                            url, ROW_THUMB_SIZE
+                        ),
+                        lambda i, img: self.root.after(0, apply_thumbnail, i, img),
+                    )
+                if index not in meta_done and not (
+                    video.get("duration") and video.get("thumbnail")
+                ):
+                    meta_prefetcher.request(
+                        index,
+                        lambda url=video["url"]: fetch_row_meta(url),
+                        lambda i, meta: self.root.after(0, apply_meta, i, meta),
+                    )
 
-            video_inner = tk.Frame(video_card, bg=self.colors["card"])
-            video_inner.pack(fill=tk.X, padx=15, pady=10)
+        def schedule_prefetch():
+            # Coalesce bursts of scroll events into one pass
+            if prefetch["job"] is None and not prefetch["closed"]:
+                prefetch["job"] = selection_window.after(80, prefetch_visible)
 
-            # Checkbox and title
-            check_frame = tk.Frame(video_inner, bg=self.colors["card"])
-            check_frame.pack(fill=tk.X)
+        def on_yscroll(first, last):
+            scrollbar.set(first, last)
+            schedule_prefetch()
 
-            checkbox = tk.Checkbutton(
-                check_frame,
-                variable=var,
-                bg=self.colors["card"],
-                activebackground=self.colors["card"],
-                relief=tk.FLAT,
-            )
-            checkbox.pack(side=tk.LEFT, padx=(0, 10))
+        tree.configure(yscrollcommand=on_yscroll)
 
-            title_label = tk.Label(
-                check_frame,
-                text=video["title"],
-                font=("Segoe UI", 10, "bold"),
-                bg=self.colors["card"],
-                fg=self.colors["text_primary"],
-                anchor="w",
-                wraplength=450,
+        def update_count():
+            count_label.config(
+                text=f"Selected: {sum(selection)}/{len(self.playlist_videos)}"
+                f"   Showing: {len(view)}   (Shift+click selects a range, Space toggles)"
             )
-            title_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
-            # Duration
-            if video["duration"]:
-                duration = video["duration"]
-                m, s = divmod(int(duration), 60)
-                h, m = divmod(m, 60)
-                duration_text = f"{h:d}h {m:d}m {s:d}s" if h else f"{m:d}m {s:d}s"
-
-                duration_label = tk.Label(
-                    check_frame,
-                    text=duration_text,
-                    font=("Segoe UI", 9),
-                    bg=self.colors["card"],
-                    fg=self.colors["text_secondary"],
+        def matches(index):
+            needle = filter_var.get().strip().lower()
+            return not needle or needle in self.playlist_videos[index]["title"].lower()
+
+        def insert_rows(indices):
+            for index in indices:
+                video = self.playlist_videos[index]
+                tree.insert(
+                    "",
+                    tk.END,
+                    iid=str(index),
+                    image=row_images.get(index, ""),
+                    values=(
+                        CHECKED if selection[index] else UNCHECKED,
+                        video["title"],
+                        self.format_duration(video["duration"]),
+                    ),
                 )
-                duration_label.pack(side=tk.RIGHT)
+                view_pos[index] = len(view)
+                view.append(index)
+
+        def set_checked(indices, checked):
+            for index in indices:
+                selection[index] = 1 if checked else 0
+                tree.set(str(index), "check", CHECKED if checked else UNCHECKED)
+            update_count()
+
+        def rebuild_view():
+            tree.delete(*tree.get_children())
+            view.clear()
+            view_pos.clear()
+            anchor["index"] = None
+            insert_rows([i for i in range(len(selection)) if matches(i)])
+            update_count()
+            schedule_prefetch()
+
+        def on_click(event):
+            if tree.identify_region(event.x, event.y) != "cell":
+                return None
+            row = tree.identify_row(event.y)
+            if not row:
+                return None
+            index = int(row)
+            shift = event.state & 0x0001
+            if shift and anchor["index"] in view_pos:
+                # Apply the anchor row's state to every visible row in between
+                lo, hi = sorted((view_pos[anchor["index"]], view_pos[index]))
+                set_checked(view[lo : hi + 1], bool(selection[anchor["index"]]))
+                return "break"
+            if tree.identify_column(event.x) == "#1":
+                set_checked([index], not selection[index])
+                anchor["index"] = index
+                return "break"
+            anchor["index"] = index
+            return None
+
+        def on_space(event):
+            rows = [int(row) for row in tree.selection()]
+            if rows:
+                # Toggle the highlighted rows together, following the first one
+                set_checked(rows, not selection[rows[0]])
+            return "break"
+
+        def add_rows(videos):
+            # A new page arrived from the playlist enumerator
+            start = len(selection)
+            selection.extend(b"\x01" * len(videos))
+            insert_rows([i for i in range(start, start + len(videos)) if matches(i)])
+            update_count()
+            schedule_prefetch()
+
+        debounce = {"job": None}
+
+        def on_filter_change(*_):
+            if debounce["job"]:
+                selection_window.after_cancel(debounce["job"])
+            debounce["job"] = selection_window.after(200, rebuild_view)
+
+        tree.bind("<Button-1>", on_click)
+        tree.bind("<space>", on_space)
+        filter_var.trace_add("write", on_filter_change)
+
+        rebuild_view()
 
         # Bottom buttons
         bottom_frame = tk.Frame(content_frame, bg=self.colors["background"])
@@ -1566,7 +2392,7 @@ class VideoDownloader:
             bottom_frame,
             text="Confirm",
             command=lambda: self.confirm_playlist_selection(
-                video_vars, selection_window
+                selection, selection_window
             ),
             font=("Segoe UI", 11, "bold"),
             bg=self.colors["primary"],
@@ -1578,39 +2404,29 @@ class VideoDownloader:
         )
         confirm_btn.pack(side=tk.RIGHT)
 
-        # Bind mousewheel to canvas
-        def _on_mousewheel(event):
-            try:
-                if event.num == 5 or getattr(event, "delta", 0) < 0:
-                    canvas.yview_scroll(1, "units")
-                elif event.num == 4 or getattr(event, "delta", 0) > 0:
-                    canvas.yview_scroll(-1, "units")
-            except tk.TclError:
-                # Canvas has been destroyed, ignore the event
-                pass
+        # Pages that arrive while the window is open are appended as they come
+        self.playlist_page_listener = add_rows
 
-        # Bind to the canvas specifically instead of bind_all to prevent issues when window is closed
-        canvas.bind("<MouseWheel>", _on_mousewheel)
-        canvas.bind("<Button-4>", _on_mousewheel)
-        canvas.bind("<Button-5>", _on_mousewheel)
+        def _on_destroy(event):
+            if event.widget is selection_window:
+                self.playlist_page_listener = None
+                prefetch["closed"] = True
+                thumb_prefetcher.close()
+                meta_prefetcher.close()
 
-        # Also bind to the selection window to ensure mouse events are captured
-        selection_window.bind("<MouseWheel>", _on_mousewheel)
-        selection_window.bind("<Button-4>", _on_mousewheel)
-        selection_window.bind("<Button-5>", _on_mousewheel)
+        selection_window.bind("<Destroy>", _on_destroy)
 
-    def toggle_all_videos(self, select_all, video_vars):
-        """Select or deselect all videos"""
-        for var in video_vars:
-            var.set(select_all)
+    def format_duration(self, duration):
+        """Render seconds as "1h 2m 3s" / "2m 3s", or "" when unknown"""
+        if not isinstance(duration, (int, float)) or duration <= 0:
+            return ""
+        m, s = divmod(int(duration), 60)
+        h, m = divmod(m, 60)
+        return f"{h:d}h {m:d}m {s:d}s" if h else f"{m:d}m {s:d}s"
 
-    def confirm_playlist_selection(self, video_vars, window):
+    def confirm_playlist_selection(self, selection, window):
         """Confirm the playlist selection and update the video list"""
-        selected_count = 0
-        for i, var in enumerate(video_vars):
-            self.playlist_videos[i]["selected"] = var.get()
-            if var.get():
-                selected_count += 1
+        selected_count = sum(selection)
 
         if selected_count == 0:
             messagebox.showwarning(
@@ -1618,6 +2434,8 @@ class VideoDownloader:
             )
             return
 
+        self.playlist_selected[: len(selection)] = selection
+
         # Update sidebar info
         self.sidebar_meta.config(
             text=f"Selected: {selected_count}/{len(self.playlist_videos)}\nReady to download"
@@ -1628,12 +2446,278 @@ class VideoDownloader:
             "Selection Confirmed", f"Selected {selected_count} videos for download."
         )
 
+    def show_batch_window(self):
+        """
+        Paste, load or drop a list of URLs, resolve them all in parallel and
+        queue the unique videos in one go.
+        """
+        batch_window = tk.Toplevel(self.root)
+        batch_window.title("Batch Download")
+        batch_window.geometry("760x560")
+        batch_window.configure(bg=self.colors["background"])
+        batch_window.transient(self.root)
+
+        batch_window.geometry(
+            "+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50)
+        )
+
+        title_frame = tk.Frame(batch_window, bg=self.colors["primary"], height=60)
+        title_frame.pack(fill=tk.X)
+        title_frame.pack_propagate(False)
+
+        tk.Label(
+            title_frame,
+            text="📑 Batch Download",
+            font=("Segoe UI", 16, "bold"),
+            bg=self.colors["primary"],
+            fg="white",
+        ).pack(pady=15)
+
+        content_frame = tk.Frame(batch_window, bg=self.colors["background"])
+        content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+
+        hint = "Paste URLs, one per line (# comments are ignored)"
+        if DND_FILES:
+            hint += ", or drop text files here"
+        tk.Label(
+            content_frame,
+            text=hint,
+            font=("Segoe UI", 9),
+            bg=self.colors["background"],
+            fg=self.colors["text_secondary"],
+            anchor="w",
+        ).pack(fill=tk.X, pady=(0, 6))
+
+        urls_text = tk.Text(
+            content_frame,
+            height=6,
+            font=("Segoe UI", 10),
+            bg="#FFFFFF",
+            fg=self.colors["text_primary"],
+            relief=tk.FLAT,
+            bd=0,
+            wrap=tk.NONE,
+        )
+        urls_text.pack(fill=tk.X)
+
+        rows = []  # resolved rows, in arrival order
+        state = {"cancel": None, "closed": False}
+
+        action_frame = tk.Frame(content_frame, bg=self.colors["background"])
+        action_frame.pack(fill=tk.X, pady=10)
+
+        def append_urls(text):
+            if urls_text.get("1.0", tk.END).strip():
+                urls_text.insert(tk.END, "\n")
+            urls_text.insert(tk.END, text.strip() + "\n")
+
+        def load_file(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    append_urls(f.read())
+            except (OSError, UnicodeDecodeError) as e:
+                messagebox.showerror("Load Failed", str(e), parent=batch_window)
+
+        def browse_file():
+            path = filedialog.askopenfilename(
+                parent=batch_window,
+                title="Load URL list",
+                filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            )
+            if path:
+                load_file(path)
+
+        tk.Button(
+            action_frame,
+            text="📂 Load File",
+            command=browse_file,
+            font=("Segoe UI", 10),
+            bg="#E0E0E0",
+            relief=tk.FLAT,
+            cursor="hand2",
+            padx=15,
+        ).pack(side=tk.LEFT, padx=(0, 10))
+
+        resolve_btn = tk.Button(
+            action_frame,
+            text="🔍 Resolve",
+            font=("Segoe UI", 10),
+            bg=self.colors["accent"],
+            fg="white",
+            relief=tk.FLAT,
+            cursor="hand2",
+            padx=15,
+        )
+        resolve_btn.pack(side=tk.LEFT)
+
+        summary_label = tk.Label(
+            action_frame,
+            text="",
+            font=("Segoe UI", 9),
+            bg=self.colors["background"],
+            fg=self.colors["text_secondary"],
+            anchor="e",
+        )
+        summary_label.pack(side=tk.RIGHT)
+
+        if DND_FILES:
+
+            def on_drop(event):
+                # Dropped files are read; dropped text (e.g. links) is pasted
+                for item in batch_window.tk.splitlist(event.data):
+                    if os.path.isfile(item):
+                        load_file(item)
+                    else:
+                        append_urls(item)
+                return event.action
+
+            urls_text.drop_target_register(DND_FILES, DND_TEXT)
+            urls_text.dnd_bind("<<Drop>>", on_drop)
+
+        list_frame = tk.Frame(content_frame, bg=self.colors["background"])
+        list_frame.pack(fill=tk.BOTH, expand=True)
+
+        tree = ttk.Treeview(
+            list_frame,
+            columns=("status", "title", "duration", "source"),
+            show="headings",
+            selectmode="none",
+        )
+        tree.heading("status", text="")
+        tree.heading("title", text="Title", anchor="w")
+        tree.heading("duration", text="Duration")
+        tree.heading("source", text="From", anchor="w")
+        tree.column("status", width=36, stretch=False, anchor="center")
+        tree.column("title", width=360, anchor="w")
+        tree.column("duration", width=80, stretch=False, anchor="e")
+        tree.column("source", width=200, anchor="w")
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        bottom_frame = tk.Frame(content_frame, bg=self.colors["background"])
+        bottom_frame.pack(fill=tk.X, pady=(20, 0))
+
+        def update_summary(duplicates=None, finished=False):
+            failed = sum(1 for row in rows if row["error"])
+            text = f"Videos: {len(rows) - failed}   Failed: {failed}"
+            if duplicates is not None:
+                text += f"   Duplicates skipped: {duplicates}"
+            summary_label.config(text=text + ("" if finished else "   (resolving...)"))
+
+        def add_row(row):
+            if state["closed"]:
+                return
+            rows.append(row)
+            tree.insert(
+                "",
+                tk.END,
+                values=(
+                    "❌" if row["error"] else "✅",
+                    row["error"] if row["error"] else row["title"],
+                    self.format_duration(row["duration"]),
+                    row["source"],
+                ),
+            )
+            update_summary()
+
+        def finish(duplicates):
+            if state["closed"]:
+                return
+            state["cancel"] = None
+            resolve_btn.config(state=tk.NORMAL)
+            download_btn.config(state=tk.NORMAL)
+            update_summary(duplicates, finished=True)
+
+        def resolve():
+            urls = split_url_list(urls_text.get("1.0", tk.END))
+            if not urls:
+                messagebox.showwarning(
+                    "No URLs", "Paste or load at least one URL.", parent=batch_window
+                )
+                return
+            rows.clear()
+            tree.delete(*tree.get_children())
+            resolve_btn.config(state=tk.DISABLED)
+            download_btn.config(state=tk.DISABLED)
+            cancel = state["cancel"] = threading.Event()
+            update_summary()
+
+            def worker():
+                print(f"📑 Resolving {len(urls)} URLs")  # Debug
+                duplicates = self.engine.resolve_batch(
+                    urls,
+                    on_row=lambda row: self.root.after(0, add_row, row),
+                    cancel=cancel,
+                )
+                self.root.after(0, finish, duplicates)
+
+            threading.Thread(target=worker, daemon=True).start()
+
+        def download_all():
+            videos = [row for row in rows if not row["error"]]
+            if not videos:
+                messagebox.showwarning(
+                    "Nothing to Download",
+                    "No URL resolved to a video.",
+                    parent=batch_window,
+                )
+                return
+            if self.queue_videos(videos):
+                batch_window.destroy()
+
+        resolve_btn.config(command=resolve)
+
+        tk.Button(
+            bottom_frame,
+            text="Close",
+            command=batch_window.destroy,
+            font=("Segoe UI", 11),
+            bg="#757575",
+            fg="white",
+            relief=tk.FLAT,
+            cursor="hand2",
+            padx=20,
+            pady=8,
+        ).pack(side=tk.RIGHT, padx=(10, 0))
+
+        download_btn = tk.Button(
+            bottom_frame,
+            text="⬇ Download All",
+            command=download_all,
+            state=tk.DISABLED,
+            font=("Segoe UI", 11, "bold"),
+            bg=self.colors["primary"],
+            fg="white",
+            relief=tk.FLAT,
+            cursor="hand2",
+            padx=20,
+            pady=8,
+        )
+        download_btn.pack(side=tk.RIGHT)
+
+        def _on_destroy(event):
+            if event.widget is batch_window:
+                state["closed"] = True
+                if state["cancel"]:
+                    state["cancel"].set()  # URLs not started yet are skipped
+
+        batch_window.bind("<Destroy>", _on_destroy)
+
+        # Start with whatever is in the main URL box
+        if self.url_var.get().strip():
+            append_urls(self.url_var.get())
+        urls_text.focus_set()
+
 
 def main():
-    root = tk.Tk()
+    root = TkinterDnD.Tk() if TkinterDnD else tk.Tk()
     app = VideoDownloader(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Isolated downloads in frozen builds
     main()
@@ -0,0 +1,88 @@
+"""
+Index of already downloaded videos.
+
+Keys are yt-dlp download_archive lines ("<extractor> <id>", e.g.
+"youtube dQw4w9WgXcQ"), so the on-disk file can be exchanged with
+yt-dlp's --download-archive directly. The whole set is held in memory,
+so membership checks before queuing a playlist cost microseconds each.
+"""
+
+import os
+import threading
+
+from engine import info_cache_key, normalize_video_key
+
+
+def archive_key(video_key):
+    """Convert an engine video key ("Youtube:abc") to an archive line ("youtube abc")"""
+    if not video_key or ":" not in video_key or "://" in video_key:
+        return None  # Plain URL fallback keys can't be archived reliably
+    extractor, video_id = video_key.split(":", 1)
+    return f"{extractor.lower()} {video_id}"
+
+
+class DownloadArchive:
+    """In-memory set of completed videos backed by an append-only text file"""
+
+    def __init__(self, path, extraction_cache=None):
+        self.path = path
+        # Looked up for URLs whose ID only extraction reveals (generic sites)
+        self.extraction_cache = extraction_cache
+        self._keys = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._keys.update(self._read(path))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    @staticmethod
+    def _read(path):
+        with open(path, encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def contains_url(self, url, video_key=None):
+        """True if the video behind url (or an already known video_key) is archived"""
+        key = archive_key(video_key or normalize_video_key(url))
+        if key is None and self.extraction_cache is not None:
+            info = self.extraction_cache.get(url)
+            key = archive_key(info and info_cache_key(info))
+        return key is not None and key in self._keys
+
+    def add(self, key):
+        if not key:
+            return
+        with self._lock:
+            if key in self._keys:
+                return
+            self._keys.add(key)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(key + "\n")
+
+    def record(self, task, event, data):
+        """DownloadEngine listener: archive tasks as they complete"""
+        if event == "completed" and task is not None:
+            self.add(archive_key(getattr(task, "video_key", None)))
+
+    def import_file(self, path):
+        """Merge a yt-dlp download_archive file; returns the number of new entries"""
+        keys = self._read(path)
+        with self._lock:
+            new_keys = keys - self._keys
+            self._keys.update(new_keys)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(key + "\n" for key in sorted(new_keys))
+        return len(new_keys)
+
+    def export_file(self, path):
+        """Write the archive as a sorted, de-duplicated yt-dlp download_archive file"""
+        with self._lock:
+            keys = sorted(self._keys)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(key + "\n" for key in keys)
+        os.replace(tmp_path, path)
+        return len(keys)
@@ -0,0 +1,183 @@
+"""
+Shared bandwidth governor.
+
+Every running task draws from its own token bucket. The bucket rates are
+max-min fair shares of one global cap, so a task that can't use its share
+(slow server, small file) leaves the rest to the others. Shares are
+recomputed from the speeds the progress hook measures. A schedule can swap
+the global cap by time of day, e.g. unthrottled at night.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket; consume() returns how long the caller should wait"""
+
+    def __init__(self, rate, burst_seconds=0.5):
+        self.rate = rate  # bytes/s, None for unlimited
+        self.burst_seconds = burst_seconds
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+
+    def set_rate(self, rate):
+        self._refill()
+        self.rate = rate
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate:
+            burst = self.rate * self.burst_seconds
+            self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, amount):
+        if not self.rate:
+            return 0.0
+        self._refill()
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+def parse_schedule(text):
+    """
+    "0-7=0, 9-17=2M" -> [(0, 7, None), (9, 17, 2097152)].
+    Hours are local, end is exclusive, windows may wrap midnight (22-6) and
+    a limit of 0 means unthrottled.
+    """
+    windows = []
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        hours, _, limit = part.partition("=")
+        start, _, end = hours.partition("-")
+        limit = parse_rate(limit or "0")
+        windows.append((int(start) % 24, int(end) % 24, limit or None))
+    return windows
+
+
+def parse_rate(text):
+    """'2M', '500K', '1048576' -> bytes per second (0 for unlimited)"""
+    text = text.strip().upper().rstrip("/S").rstrip("B")
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    if text and text[-1] in units:
+        rate = int(float(text[:-1]) * units[text[-1]])
+    else:
+        rate = int(text or 0)
+    if rate < 0:
+        raise ValueError(f"negative rate: {text}")
+    return rate
+
+
+class BandwidthGovernor:
+    """Global and per-task rate limits with fair sharing between active tasks"""
+
+    REBALANCE_INTERVAL = 1.0  # seconds
+    MAX_SLEEP = 0.25  # Sleep in slices so cancellation stays responsive
+
+    def __init__(self, global_limit=None, schedule=None):
+        self.global_limit = global_limit  # bytes/s or None
+        self.schedule = schedule or []  # [(start_hour, end_hour, limit_or_None)]
+        self._lock = threading.Lock()
+        self._tasks = {}  # task -> state dict
+        self._last_rebalance = 0.0
+
+    def current_limit(self, now=None):
+        """Global cap in effect right now, taking the schedule into account"""
+        hour = time.localtime(now).tm_hour
+        for start, end, limit in self.schedule:
+            inside = start <= hour < end if start <= end else hour >= start or hour < end
+            if inside:
+                return limit
+        return self.global_limit
+
+    def register(self, task):
+        with self._lock:
+            self._tasks[task] = {
+                "bucket": TokenBucket(None),
+                "last_bytes": 0,
+                "speed": 0.0,
+                "allocation": None,
+            }
+            self._last_rebalance = 0.0  # Re-split on the next throttle call
+
+    def unregister(self, task):
+        with self._lock:
+            self._tasks.pop(task, None)
+            self._last_rebalance = 0.0
+
+    def allocation(self, task):
+        state = self._tasks.get(task)
+        return state["allocation"] if state else None
+
+    def throttle(self, task, downloaded_bytes, speed=None):
+        """
+        Account for bytes received since the last call and block for as long
+        as the task's bucket requires. Called from the yt-dlp progress hook.
+        """
+        wait = self.account(task, downloaded_bytes, speed)
+        while wait > 0 and not task.cancel_flag:
+            time.sleep(min(wait, self.MAX_SLEEP))
+            wait -= self.MAX_SLEEP
+
+    def account(self, task, downloaded_bytes, speed=None):
+        """
+        Account for bytes received since the last call without blocking, and
+        return how long the task should wait. For tasks that are throttled
+        elsewhere, e.g. in a worker process.
+        """
+        with self._lock:
+            state = self._tasks.get(task)
+            if state is None:
+                return 0.0
+            delta = downloaded_bytes - state["last_bytes"]
+            if delta < 0:  # A new stream (e.g. audio after video) restarted the count
+                delta = downloaded_bytes
+            state["last_bytes"] = downloaded_bytes
+            if speed:
+                state["speed"] = 0.7 * state["speed"] + 0.3 * speed
+            if time.monotonic() - self._last_rebalance >= self.REBALANCE_INTERVAL:
+                self._rebalance()
+            return state["bucket"].consume(delta)
+
+    def _rebalance(self):
+        """Max-min fair split of the global cap (caller holds the lock)"""
+        self._last_rebalance = time.monotonic()
+        cap = self.current_limit()
+        limits = {
+            task: getattr(task, "rate_limit", None) or float("inf")
+            for task in self._tasks
+        }
+
+        shares = {}
+        if cap:
+            demands = {}
+            for task, state in self._tasks.items():
+                demand = limits[task]
+                allocation = state["allocation"]
+                if allocation and state["speed"] and state["speed"] < 0.8 * allocation:
+                    # Not using its share: only ask for a bit more than it gets
+                    demand = min(demand, state["speed"] * 1.2)
+                demands[task] = demand
+
+            remaining = float(cap)
+            pending = sorted(demands, key=demands.get)
+            while pending:
+                fair = remaining / len(pending)
+                task = pending[0]
+                if demands[task] <= fair:
+                    shares[task] = demands[task]
+                    remaining -= demands[task]
+                    pending.pop(0)
+                else:
+                    for task in pending:
+                        shares[task] = fair
+                    break
+        else:
+            shares = limits
+
+        for task, state in self._tasks.items():
+            share = shares.get(task)
+            # Uncapped tasks only get a bucket when they have their own limit
+            allocation = None if share in (None, float("inf")) else max(share, 1024.0)
+            state["allocation"] = allocation
+            state["bucket"].set_rate(allocation)
@@ -0,0 +1,615 @@
+"""
+Benchmark the download pipeline against a local synthetic media server.
+
+    python -m benchmark [--kinds progressive,hls,dash] [--workers 1,3,6]
+                        [--videos 1,10] [--qualities best,720]
+                        [--latency 0.05] [--bandwidth 4MB] [-o result.json]
+                        [--baseline previous.json]
+
+Every combination of kind x workers x videos x quality is one scenario: that
+many videos are submitted to a real DownloadEngine at once, served by an
+in-process HTTP stand-in (progressive MP4 with Range support, HLS master and
+media playlists, DASH SegmentTemplate manifests) with the given per-response
+latency and per-connection bandwidth. Payloads are synthetic bytes, so no
+ffmpeg postprocessing (and hence no "audio" preset) is exercised.
+
+The JSON report (stdout unless -o) has per scenario: wall time, bytes,
+throughput, time-to-first-byte (task start to first downloaded byte, so it
+includes extraction), CPU use of this process, peak RSS, and the depth of a
+simulated UI event queue drained every PROGRESS_INTERVAL_MS, as the Tk app
+does. With --baseline, throughput and TTFB changes against an earlier report
+are printed to stderr.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import queue
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import yt_dlp
+
+from bandwidth import parse_rate
+from engine import DownloadEngine, DownloadTask, MiB
+
+KINDS = ("progressive", "hls", "dash")
+VARIANT_HEIGHTS = (360, 720, 1080)  # HLS/DASH renditions, sizes scale with height
+SEGMENT_SECONDS = 2
+PROGRESS_INTERVAL_MS = 100  # Tick of the simulated UI thread, as in app.py
+SAMPLE_INTERVAL = 0.05  # RSS sampling period in seconds
+TERMINAL_EVENTS = ("completed", "failed", "cancelled")
+
+_PATTERN = os.urandom(MiB)  # Served bytes repeat this block
+
+
+def payload(offset, length):
+    """Deterministic synthetic bytes for [offset, offset + length)"""
+    out = bytearray()
+    while length > 0:
+        start = offset % len(_PATTERN)
+        piece = _PATTERN[start : start + length]
+        out += piece
+        offset += len(piece)
+        length -= len(piece)
+    return bytes(out)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections mid-body all the time (cancel, retries)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MediaServer:
+    """
+    Threaded HTTP stand-in for a video site, on 127.0.0.1 and a free port.
+
+        /p/<name>.mp4                       progressive file
+        /hls/<name>.m3u8                    master playlist
+        /hls/<name>/<height>.m3u8           media playlist
+        /hls/<name>/<height>/seg<n>.ts      segment
+        /dash/<name>.mpd                    manifest
+        /dash/<name>/<height>/init.mp4, seg<n>.m4s
+
+    Every response waits ``latency`` seconds before its headers, and bodies
+    are paced to ``bandwidth`` bytes/s per connection (None = unpaced).
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        bandwidth=None,
+        file_size=8 * MiB,
+        segments=20,
+        segment_size=256 * 1024,
+    ):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.file_size = file_size
+        self.segments = segments
+        self.segment_size = segment_size
+        self.requests = 0
+        self._httpd = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self._httpd.server_address[1]
+
+    def url_for(self, kind, name):
+        if kind == "progressive":
+            return f"{self.base_url}/p/{name}.mp4"
+        if kind == "hls":
+            return f"{self.base_url}/hls/{name}.m3u8"
+        return f"{self.base_url}/dash/{name}.mpd"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def segment_bytes(self, height):
+        return self.segment_size * height // VARIANT_HEIGHTS[-1]
+
+    def hls_master(self, name):
+        lines = ["#EXTM3U"]
+        for height in VARIANT_HEIGHTS:
+            rate = self.segment_bytes(height) * 8 // SEGMENT_SECONDS
+            lines.append(
+                f"#EXT-X-STREAM-INF:BANDWIDTH={rate},"
+                f"RESOLUTION={height * 16 // 9}x{height},"
+                'CODECS="avc1.4d401f,mp4a.40.2"'
+            )
+            lines.append(f"{name}/{height}.m3u8")
+        return "\n".join(lines) + "\n"
+
+    def hls_media(self, height):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{SEGMENT_SECONDS}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for n in range(self.segments):
+            lines.append(f"#EXTINF:{SEGMENT_SECONDS}.0,")
+            lines.append(f"{height}/seg{n}.ts")
+        lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+    def dash_manifest(self, name):
+        duration = self.segments * SEGMENT_SECONDS
+        representations = "".join(
+            f'<Representation id="{height}" bandwidth="'
+            f'{self.segment_bytes(height) * 8 // SEGMENT_SECONDS}" '
+            f'width="{height * 16 // 9}" height="{height}"/>'
+            for height in VARIANT_HEIGHTS
+        )
+        return (
+            '<?xml version="1.0"?>'
+            '<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+            f'mediaPresentationDuration="PT{duration}S" minBufferTime="PT2S" '
+            'profiles="urn:mpeg:dash:profile:isoff-live:2011">'
+            "<Period>"
+            '<AdaptationSet mimeType="video/mp4" codecs="avc1.4d401f,mp4a.40.2">'
+            f'<SegmentTemplate timescale="1" duration="{SEGMENT_SECONDS}" '
+            'startNumber="0" '
+            f'initialization="{name}/$RepresentationID$/init.mp4" '
+            f'media="{name}/$RepresentationID$/seg$Number$.m4s"/>'
+            f"{representations}"
+            "</AdaptationSet></Period></MPD>"
+        )
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_args):
+                pass
+
+            def do_HEAD(self):
+                self.route(head=True)
+
+            def do_GET(self):
+                self.route(head=False)
+
+            def route(self, head):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                path = self.path.split("?", 1)[0]
+                match = re.fullmatch(r"/p/[\w-]+\.mp4", path)
+                if match:
+                    return self.send_body(head, "video/mp4", size=server.file_size)
+                match = re.fullmatch(r"/hls/([\w-]+)\.m3u8", path)
+                if match:
+                    text = server.hls_master(match.group(1))
+                    return self.send_text(head, "application/vnd.apple.mpegurl", text)
+                match = re.fullmatch(r"/hls/[\w-]+/(\d+)\.m3u8", path)
+                if match:
+                    text = server.hls_media(int(match.group(1)))
+                    return self.send_text(head, "application/vnd.apple.mpegurl", text)
+                match = re.fullmatch(
+                    r"/(?:hls|dash)/[\w-]+/(\d+)/seg\d+\.(?:ts|m4s)", path
+                )
+                if match:
+                    size = server.segment_bytes(int(match.group(1)))
+                    return self.send_body(head, "video/mp2t", size=size)
+                match = re.fullmatch(r"/dash/[\w-]+/\d+/init\.mp4", path)
+                if match:
+                    return self.send_body(head, "video/mp4", size=1024)
+                match = re.fullmatch(r"/dash/([\w-]+)\.mpd", path)
+                if match:
+                    text = server.dash_manifest(match.group(1))
+                    return self.send_text(head, "application/dash+xml", text)
+                self.send_error(404)
+
+            def send_text(self, head, content_type, text):
+                data = text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                if not head:
+                    self.wfile.write(data)
+
+            def send_body(self, head, content_type, size):
+                start, end = 0, size - 1
+                byte_range = re.fullmatch(
+                    r"bytes=(\d+)-(\d*)", self.headers.get("Range", "")
+                )
+                if byte_range:
+                    start = int(byte_range.group(1))
+                    if byte_range.group(2):
+                        end = min(end, int(byte_range.group(2)))
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                if head:
+                    return
+                block = 64 * 1024
+                began = time.monotonic()
+                sent = 0
+                try:
+                    for offset in range(start, end + 1, block):
+                        data = payload(offset, min(block, end + 1 - offset))
+                        self.wfile.write(data)
+                        sent += len(data)
+                        if server.bandwidth:
+                            ahead = sent / server.bandwidth - (time.monotonic() - began)
+                            if ahead > 0:
+                                time.sleep(ahead)
+                except ConnectionError:
+                    pass  # Client cancelled
+
+        return Handler
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unknown"""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def summarize(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(values[len(values) // 2], 4),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+        "max": round(values[-1], 4),
+    }
+
+
+class ScenarioProbe:
+    """
+    Engine listener collecting the per-scenario metrics.
+
+    Events are pushed onto a queue that a separate thread drains once per
+    PROGRESS_INTERVAL_MS, standing in for the Tk main loop; the queue depth
+    seen at each tick is what a UI would have to catch up on.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.done = threading.Event()
+        self.started = {}  # task -> perf_counter at "started"
+        self.ttfb = {}  # task -> seconds to the first downloaded byte
+        self.downloaded = {}  # task -> bytes, from the last progress event
+        self.results = {"completed": 0, "failed": 0, "cancelled": 0}
+        self.errors = []
+        self.events = 0
+        self.depths = []
+        self.peak_rss = current_rss()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._drain, daemon=True),
+            threading.Thread(target=self._sample, daemon=True),
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __call__(self, task, event, data):
+        now = time.perf_counter()
+        self._queue.put((task, event))
+        with self._lock:
+            self.events += 1
+            if event == "started":
+                self.started[task] = now
+            elif event == "progress":
+                downloaded = data.get("downloaded") or 0
+                self.downloaded[task] = downloaded
+                if downloaded and task not in self.ttfb and task in self.started:
+                    self.ttfb[task] = now - self.started[task]
+            elif event == "completed":
+                filename = data.get("filename")
+                if filename and os.path.exists(filename):
+                    self.downloaded[task] = os.path.getsize(filename)
+            elif event == "failed":
+                self.errors.append(data.get("error"))
+            if event in TERMINAL_EVENTS:
+                self.results[event] += 1
+                if sum(self.results.values()) >= self.total:
+                    self.done.set()
+
+    def _drain(self):
+        while not self._stop.is_set():
+            time.sleep(PROGRESS_INTERVAL_MS / 1000)
+            self.depths.append(self._queue.qsize())
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            rss = current_rss()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+
+
+def run_scenario(
+    engine, server, out_dir, kind, workers, videos, quality, timeout, tag
+):
+    engine.scheduler.resize(workers)
+    probe = ScenarioProbe(videos)
+    engine.add_listener(probe)
+    probe.start()
+    # Fresh names per scenario, so no scenario hits another's extraction cache
+    urls = [server.url_for(kind, f"{tag}-{kind}-{n}") for n in range(videos)]
+    tasks = [DownloadTask(url, quality, out_dir) for url in urls]
+
+    cpu_before = time.process_time()
+    began = time.perf_counter()
+    for task in tasks:
+        engine.submit(task)
+    finished = probe.done.wait(timeout)
+    wall = time.perf_counter() - began
+    cpu = time.process_time() - cpu_before
+
+    if not finished:
+        for task in tasks:
+            engine.cancel(task)
+    probe.stop()
+    engine.listeners.remove(probe)
+
+    total_bytes = sum(probe.downloaded.values())
+    return {
+        "kind": kind,
+        "workers": workers,
+        "videos": videos,
+        "quality": quality,
+        "timed_out": not finished,
+        "wall_s": round(wall, 4),
+        "bytes": total_bytes,
+        "throughput_bps": round(total_bytes / wall) if wall else None,
+        "ttfb_s": summarize(list(probe.ttfb.values())),
+        "cpu_percent": round(100 * cpu / wall, 1) if wall else None,
+        "peak_rss_bytes": probe.peak_rss,
+        "event_queue_depth": {
+            "max": max(probe.depths, default=0),
+            "mean": round(sum(probe.depths) / len(probe.depths), 2)
+            if probe.depths
+            else 0,
+        },
+        "events": probe.events,
+        "results": probe.results,
+        "errors": probe.errors[:5],
+    }
+
+
+def scenario_id(scenario):
+    return tuple(scenario[field] for field in ("kind", "workers", "videos", "quality"))
+
+
+def compare(report, baseline, stream=sys.stderr):
+    """Print throughput and median TTFB changes against an earlier report"""
+    previous = {scenario_id(s): s for s in baseline.get("scenarios", [])}
+    for scenario in report["scenarios"]:
+        old = previous.get(scenario_id(scenario))
+        if not old:
+            continue
+        label = "%s w=%d n=%d q=%s" % scenario_id(scenario)
+        parts = []
+        if old.get("throughput_bps") and scenario.get("throughput_bps"):
+            change = scenario["throughput_bps"] / old["throughput_bps"] - 1
+            parts.append(f"throughput {change:+.1%}")
+        if old.get("ttfb_s") and scenario.get("ttfb_s"):
+            change = scenario["ttfb_s"]["p50"] / old["ttfb_s"]["p50"] - 1
+            parts.append(f"ttfb p50 {change:+.1%}")
+        print(f"# {label}: {', '.join(parts) or 'no comparable metrics'}", file=stream)
+
+
+def csv_list(cast):
+    def parse(value):
+        try:
+            return [cast(item) for item in value.split(",") if item.strip()]
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    return parse
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="benchmark",
+        description="Benchmark the download engine against a local media server.",
+    )
+    parser.add_argument(
+        "--kinds",
+        type=csv_list(str),
+        default=list(KINDS),
+        help="comma separated stream kinds: " + ", ".join(KINDS),
+    )
+    parser.add_argument(
+        "--workers", type=csv_list(int), default=[3], help="worker counts (default 3)"
+    )
+    parser.add_argument(
+        "--videos",
+        type=csv_list(int),
+        default=[6],
+        help="videos submitted per scenario, i.e. playlist sizes (default 6)",
+    )
+    parser.add_argument(
+        "--qualities",
+        type=csv_list(str),
+        default=["best"],
+        help="quality presets (default best)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="seconds before every response (default 0.02)",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=parse_rate,
+        default=None,
+        metavar="RATE",
+        help="per-connection rate such as 4MB (default unpaced)",
+    )
+    parser.add_argument(
+        "--file-size",
+        type=parse_rate,
+        default=8 * MiB,
+        metavar="SIZE",
+        help="progressive file size (default 8MB)",
+    )
+    parser.add_argument(
+        "--segments", type=int, default=20, help="HLS/DASH segments per video"
+    )
+    parser.add_argument(
+        "--segment-size",
+        type=parse_rate,
+        default=256 * 1024,
+        metavar="SIZE",
+        help="size of a 1080p segment (default 256KB)",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=300, help="per-scenario timeout in seconds"
+    )
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [kind for kind in args.kinds if kind not in KINDS]
+    if unknown:
+        parser.error(f"unknown kind(s): {', '.join(unknown)}")
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read {args.baseline}: {e}")
+
+    server = MediaServer(
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        file_size=args.file_size,
+        segments=args.segments,
+        segment_size=args.segment_size,
+    ).start()
+    out_dir = tempfile.mkdtemp(prefix="ytdl-bench-")
+    engine = DownloadEngine(max_workers=1, cache_db=False, quiet=True)
+    # One local server stands in for every host: no per-site limits
+    engine.host_limiter.max_per_site = None
+    engine.host_limiter.start_spacing = 0
+    scenarios = []
+    try:
+        # Engine chatter goes to stderr so stdout stays valid JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            engine.ensure_ffmpeg()  # Resolve once, outside the timed runs
+            tag = 0
+            for kind in args.kinds:
+                for workers in args.workers:
+                    for videos in args.videos:
+                        for quality in args.qualities:
+                            tag += 1
+                            print(
+                                f"# {kind} workers={workers} "
+                                f"videos={videos} quality={quality}"
+                            )
+                            scenario = run_scenario(
+                                engine,
+                                server,
+                                out_dir,
+                                kind,
+                                workers,
+                                videos,
+                                quality,
+                                args.timeout,
+                                f"s{tag}",
+                            )
+                            scenarios.append(scenario)
+                            print(
+                                f"#   {scenario['wall_s']:.2f}s, "
+                                f"{scenario['throughput_bps'] or 0:,} B/s, "
+                                f"results {scenario['results']}"
+                            )
+    except KeyboardInterrupt:
+        print("# interrupted, reporting finished scenarios", file=sys.stderr)
+    finally:
+        server.stop()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "yt_dlp": yt_dlp.version.__version__,
+        "config": {
+            "latency_s": args.latency,
+            "bandwidth_bps": args.bandwidth,
+            "file_size": args.file_size,
+            "segments": args.segments,
+            "segment_size": args.segment_size,
+        },
+        "scenarios": scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if baseline:
+        compare(report, baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
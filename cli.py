@@ -0,0 +1,405 @@
+"""
+Headless batch downloader built on the same engine as the Tk app.
+
+    python -m cli URL [URL ...] [-a urls.txt] [-q 1080] [-o ~/Downloads] [-j 3]
+    python -m cli --resume
+
+Exit status: 0 when every download completed, 1 if any failed or was
+cancelled, 2 on usage errors and 130 when interrupted.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import yt_dlp
+
+from engine import (
+    DEFAULT_OUTPUT_PROFILE,
+    DownloadEngine,
+    DownloadScheduler,
+    DownloadTask,
+    OUTPUT_PROFILES,
+    PLAYLIST_PREVIEW_OPTS,
+    QUALITY_PRESETS,
+    format_bytes,
+    get_app_data_dir,
+    info_cache_key,
+    iter_playlist_entries,
+    normalize_video_key,
+)
+from archive import DownloadArchive
+from bandwidth import parse_rate, parse_schedule
+from isolation import ProcessRunner
+from journal import DownloadJournal
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+def read_url_file(path):
+    """URLs from a text file (or stdin for "-"), one per line, # comments allowed"""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [
+            line.strip()
+            for line in handle
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def expand_playlists(urls):
+    """
+    Replace playlist URLs by their entries so each video gets its own worker.
+    Returns (url, video_key) pairs; the key is None where it isn't known yet.
+    """
+    expanded = []
+    with yt_dlp.YoutubeDL(dict(PLAYLIST_PREVIEW_OPTS, quiet=True)) as ydl:
+        for url in urls:
+            try:
+                info = ydl.extract_info(url, download=False, process=False)
+            except Exception as e:
+                print(f"! could not enumerate {url}: {e}", file=sys.stderr)
+                info = None
+            if info and info.get("_type") in ("playlist", "multi_video"):
+                entries = [
+                    (video["url"], video["key"]) for video in iter_playlist_entries(info)
+                ]
+                print(f"# {url}: playlist with {len(entries)} videos")
+                expanded.extend(entries)
+            else:
+                # Its ID is known now, which generic URLs don't reveal otherwise
+                expanded.append((url, info and info_cache_key(info)))
+    return expanded
+
+
+def unique_targets(targets):
+    """
+    (url, video_key) pairs without repeats, compared by video key like the
+    batch resolver does (the URL's own key where none is known yet)
+    """
+    seen = set()
+    unique = []
+    for url, key in targets:
+        identity = key or normalize_video_key(url)
+        if identity not in seen:
+            seen.add(identity)
+            unique.append((url, key))
+    return unique
+
+
+class ProgressPrinter:
+    """
+    Compact progress stream: one line per state change, and progress
+    lines at most once per ``interval`` seconds for each task.
+    """
+
+    def __init__(self, total, interval=1.0, stream=sys.stdout):
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.finished = threading.Event()
+        self.results = {"completed": 0, "failed": 0, "cancelled": 0}
+        self._last_line = {}
+        self._lock = threading.Lock()
+        self._ffmpeg_warned = False
+
+    def line(self, task, text):
+        index = task.ui["index"]
+        width = len(str(self.total))
+        label = task.video_title or task.url
+        with self._lock:
+            print(f"[{index:>{width}}/{self.total}] {text}  {label}", file=self.stream)
+            self.stream.flush()
+
+    def __call__(self, task, event, data):
+        if event == "progress":
+            now = time.monotonic()
+            if now - self._last_line.get(task, 0) < self.interval:
+                return
+            self._last_line[task] = now
+            speed = data.get("speed")
+            speed_text = f"{format_bytes(int(speed))}/s" if speed else "--"
+            self.line(task, f"{data['percent']:5.1f}% {speed_text:>10}")
+        elif event == "started":
+            self.line(task, "start")
+        elif event == "processing":
+            self.line(task, "post-processing")
+        elif event == "stage" and data["name"] == "waiting":
+            self.line(task, "waiting for a post-processing slot")
+        elif event == "retrying":
+            self.line(
+                task,
+                f"retry {data['attempt']} in {data['delay']:.0f}s "
+                f"({data['error_class']}): {data['error']}",
+            )
+        elif event == "backoff":
+            self.line(task, f"waiting {data['delay']:.0f}s for {data['host']}")
+        elif event == "ffmpeg_missing":
+            if not self._ffmpeg_warned:
+                self._ffmpeg_warned = True
+                print(f"! ffmpeg unavailable: {data['error']}", file=sys.stderr)
+        elif event in self.results:
+            if event == "failed":
+                self.line(task, f"FAILED: {data['error']}")
+            elif event == "completed":
+                self.line(task, "done (re-encoded)" if data["transcoded"] else "done")
+            else:
+                self.line(task, "cancelled")
+            with self._lock:
+                self.results[event] += 1
+                if sum(self.results.values()) >= self.total:
+                    self.finished.set()
+
+
+def parse_size(text):
+    """'10M', '512K', '1048576' -> bytes"""
+    text = text.strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Download videos or playlists without the GUI.",
+    )
+    parser.add_argument("urls", nargs="*", metavar="URL", help="video or playlist URL")
+    parser.add_argument(
+        "-a",
+        "--batch-file",
+        metavar="FILE",
+        help="read URLs from FILE, one per line ('-' for stdin)",
+    )
+    parser.add_argument(
+        "-q",
+        "--quality",
+        default="best",
+        choices=QUALITY_PRESETS,
+        help="quality preset (default: best)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=os.path.expanduser("~/Downloads"),
+        help="download directory (default: ~/Downloads)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=3,
+        help="parallel downloads (default: 3)",
+    )
+    parser.add_argument(
+        "--per-site",
+        type=int,
+        help="parallel downloads from one site, e.g. YouTube (default: --jobs); "
+        "starts on one site are always spaced 1s apart",
+    )
+    parser.add_argument(
+        "--fragments",
+        type=int,
+        help="concurrent fragment downloads per video (default: from preset)",
+    )
+    parser.add_argument(
+        "--adaptive-fragments",
+        action="store_true",
+        help="raise fragment concurrency while throughput keeps improving",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=parse_size,
+        help="HTTP chunk size, e.g. 10M; 0 disables chunking (default: from preset)",
+    )
+    parser.add_argument(
+        "--buffer-size",
+        type=parse_size,
+        help="download buffer size, e.g. 1M (default: yt-dlp's own)",
+    )
+    parser.add_argument(
+        "--limit-rate",
+        type=parse_rate,
+        help="total bandwidth cap shared by all downloads, e.g. 5M",
+    )
+    parser.add_argument(
+        "--task-limit-rate",
+        type=parse_rate,
+        help="bandwidth cap for each download, e.g. 1M",
+    )
+    parser.add_argument(
+        "--schedule",
+        type=parse_schedule,
+        default=[],
+        help="time-of-day total caps, e.g. '0-7=0,9-17=2M' (0 = unthrottled)",
+    )
+    parser.add_argument(
+        "--output-profile",
+        default=DEFAULT_OUTPUT_PROFILE,
+        choices=tuple(OUTPUT_PROFILES),
+        help="copy: never re-encode, mkv when mp4 can't hold the streams, audio "
+        "in its own codec; compatible: always mp4, audio as MP3 (default: copy)",
+    )
+    parser.add_argument(
+        "--isolate",
+        action="store_true",
+        help="run each download in its own worker process",
+    )
+    parser.add_argument(
+        "--priority-order",
+        action="store_true",
+        help="run tasks in priority order instead of FIFO",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="also re-queue unfinished downloads recorded in the journal",
+    )
+    parser.add_argument(
+        "--ignore-archive",
+        action="store_true",
+        help="download videos even if they are in the download archive",
+    )
+    parser.add_argument(
+        "--import-archive",
+        metavar="FILE",
+        help="merge a yt-dlp download_archive file into the archive first",
+    )
+    parser.add_argument(
+        "--no-expand",
+        action="store_true",
+        help="download playlists as a single task instead of one task per video",
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.batch_file:
+        try:
+            urls.extend(read_url_file(args.batch_file))
+        except OSError as e:
+            parser.error(f"cannot read {args.batch_file}: {e}")
+    if not urls and not args.resume:
+        parser.error("no URLs given")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.per_site is not None and args.per_site < 1:
+        parser.error("--per-site must be at least 1")
+
+    archive = DownloadArchive(os.path.join(get_app_data_dir(), "download_archive.txt"))
+    if args.import_archive:
+        try:
+            added = archive.import_file(args.import_archive)
+        except (OSError, UnicodeDecodeError) as e:
+            parser.error(f"cannot import {args.import_archive}: {e}")
+        print(f"# imported {added} archive entries")
+
+    tasks = []
+    engine = None
+    try:
+        # Repeated URLs are dropped before anything is extracted twice
+        targets = unique_targets((url, None) for url in urls)
+        duplicates = len(urls) - len(targets)
+        if not args.no_expand:
+            expanded = expand_playlists([url for url, _ in targets])
+            targets = unique_targets(expanded)
+            duplicates += len(expanded) - len(targets)
+        if duplicates:
+            print(f"# skipping {duplicates} duplicate videos")
+
+        if not args.ignore_archive:
+            # Filter before any task exists; costs a set lookup per video
+            before = len(targets)
+            targets = [
+                (url, key)
+                for url, key in targets
+                if not archive.contains_url(url, key)
+            ]
+            if before != len(targets):
+                print(f"# skipping {before - len(targets)} already downloaded videos")
+
+        os.makedirs(args.output, exist_ok=True)
+        engine = DownloadEngine(
+            max_workers=args.jobs,
+            ordering=DownloadScheduler.PRIORITY
+            if args.priority_order
+            else DownloadScheduler.FIFO,
+            quiet=True,
+        )
+        engine.transfer = {
+            "fragments": args.fragments,
+            "chunk_size": args.chunk_size,
+            "buffer_size": args.buffer_size,
+        }
+        engine.adaptive_fragments = args.adaptive_fragments
+        engine.host_limiter.max_per_site = args.per_site
+        engine.output_profile = args.output_profile
+        if args.isolate:
+            engine.process_runner = ProcessRunner(engine)
+        engine.governor.global_limit = args.limit_rate or None
+        engine.governor.schedule = args.schedule
+        journal = DownloadJournal(os.path.join(get_app_data_dir(), "journal.sqlite"))
+
+        if args.resume:
+            for row in journal.pending():
+                task = DownloadTask(
+                    row["url"], row["quality"], row["path"], priority=row["priority"]
+                )
+                task.journal_id = row["id"]
+                task.video_title = row["title"] or ""
+                tasks.append(task)
+            print(f"# resuming {len(tasks)} unfinished downloads from the journal")
+        for url, _ in targets:
+            tasks.append(DownloadTask(url, args.quality, args.output))
+        if not tasks:
+            print("# nothing to do")
+            return EXIT_OK
+
+        printer = ProgressPrinter(total=len(tasks))
+        engine.add_listener(journal.record)
+        engine.add_listener(archive.record)
+        engine.add_listener(printer)
+
+        for index, task in enumerate(tasks, start=1):
+            task.ui = {"index": index}
+            task.rate_limit = args.task_limit_rate or None
+            engine.submit(task)
+
+        # Poll so Ctrl+C is delivered to the main thread promptly
+        while not printer.finished.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        print("! interrupted, cancelling downloads", file=sys.stderr)
+        if engine is not None:
+            for task in tasks:
+                engine.cancel(task)
+        return EXIT_INTERRUPTED
+
+    results = printer.results
+    print(
+        f"# {results['completed']} completed, {results['failed']} failed, "
+        f"{results['cancelled']} cancelled"
+    )
+    return EXIT_OK if results["completed"] == len(tasks) else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Isolated downloads in frozen builds
+    sys.exit(main())
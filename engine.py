@@ -0,0 +1,1535 @@
+"""
+UI-agnostic download engine shared by the Tk app (app.py) and the CLI (cli.py).
+
+Nothing in here touches Tk. Front-ends subscribe to DownloadEngine events,
+which are delivered on worker threads, and marshal them to their own thread
+if they need to.
+"""
+
+import contextlib
+import os
+import threading
+import time
+import tempfile
+import shutil
+import zipfile
+import subprocess
+import copy
+import functools
+import glob
+import hashlib
+import itertools
+import json
+import socket
+import sqlite3
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from queue import PriorityQueue, Empty
+import requests
+import requests.adapters
+import urllib3.util.connection
+import yt_dlp
+from yt_dlp.extractor import gen_extractor_classes
+from yt_dlp.utils import DownloadCancelled, prepend_extension
+
+from bandwidth import BandwidthGovernor
+from formats import choose_formats
+from hosts import HostLimiter, site_of
+from retry import HostBackoff, RetryPolicy, classify_error, jittered
+
+# Shared yt-dlp options for metadata extraction (preview and download)
+EXTRACT_OPTS = {
+    "quiet": True,
+    "no_warnings": False,
+    "nocheckcertificate": True,
+    "extract_flat": False,
+    "ignoreerrors": True,
+    "youtube_include_dash_manifest": True,
+}
+
+# Playlist previews only enumerate entries; formats are resolved per download
+PLAYLIST_PREVIEW_OPTS = dict(
+    EXTRACT_OPTS, extract_flat="in_playlist", lazy_playlist=True
+)
+PLAYLIST_PAGE_SIZE = 50
+BATCH_RESOLVE_WORKERS = 6  # Concurrent extractions when resolving a URL list
+POSTPROCESS_WORKERS = os.cpu_count() or 2  # Concurrent merges/conversions
+HTTP_RETRIES = 5  # yt-dlp's own retries within one attempt
+FRAGMENT_RETRIES = 10
+# Postprocessors too cheap to wait for a postprocessing slot
+LIGHT_POSTPROCESSORS = ("MoveFiles",)
+
+
+def get_app_data_dir():
+    """Per-user data directory, created on first use"""
+    local_appdata = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
+    path = os.path.join(local_appdata, "VideoDownloader")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Process-wide requests.Session so plain HTTP calls reuse keep-alive connections"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=8, pool_maxsize=16, max_retries=2
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+            )
+            _http_session = session
+        return _http_session
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_video_key(url):
+    """
+    Map a URL to "<extractor>:<id>" without touching the network, so that
+    youtu.be/x, youtube.com/watch?v=x&t=10 etc. share one cache entry.
+    Falls back to the stripped URL for sites only the generic extractor handles.
+    """
+    url = url.strip()
+    for ie in gen_extractor_classes():
+        if ie.ie_key() == "Generic" or not ie.suitable(url):
+            continue
+        try:
+            video_id = ie.get_temp_id(url)
+        except Exception:
+            video_id = None
+        if video_id:
+            return f"{ie.ie_key()}:{video_id}"
+        break
+    return url
+
+
+def split_url_list(text):
+    """URLs from pasted text or a file: whitespace separated, # comments allowed"""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.extend(line.split())
+    return urls
+
+
+def info_cache_key(info):
+    """Cache key for an already extracted info dict (or a flat playlist entry)"""
+    ie_key = info.get("extractor_key") or info.get("ie_key")
+    video_id = info.get("id")
+    if ie_key and video_id:
+        return f"{ie_key}:{video_id}"
+    return None
+
+
+def format_bytes(b):
+    if b >= 1024**3:
+        return f"{round(b / (1024 ** 3))} GB"
+    if b >= 1024**2:
+        return f"{round(b / (1024 ** 2))} MB"
+    if b >= 1024:
+        return f"{round(b / 1024)} KB"
+    return f"{b} B"
+
+
+class ExtractionCache:
+    """
+    Thread-safe LRU cache of yt-dlp info dicts keyed by normalized video ID.
+
+    Entries expire after ``ttl`` seconds because the signed format URLs in
+    them go stale. With ``db_path`` set, entries are also written to SQLite
+    so they survive a restart.
+    """
+
+    def __init__(self, max_entries=256, ttl=1800, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, info)
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS extraction_cache "
+                    "(key TEXT PRIMARY KEY, stored_at REAL, info TEXT)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Extraction cache disk store disabled: {e}")
+                self._db = None
+
+    def get(self, url):
+        """Return a private copy of the cached info for url, or None"""
+        key = normalize_video_key(url)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return copy.deepcopy(entry[1])
+            self._entries.pop(key, None)
+
+            entry = self._load(key, now)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+            return copy.deepcopy(entry[1])
+
+    def put(self, info, url=None):
+        """Store info under its own ID and, if given, under the URL it came from"""
+        if not info:
+            return
+        info = yt_dlp.YoutubeDL.sanitize_info(info)
+        keys = {info_cache_key(info)}
+        if url:
+            keys.add(normalize_video_key(url))
+        keys.discard(None)
+        entry = (time.time(), info)
+        with self._lock:
+            for key in keys:
+                self._remember(key, entry)
+                self._store(key, entry)
+
+    def discard(self, url):
+        """Forget url's entry, e.g. when its signed media URLs were refused"""
+        key = normalize_video_key(url)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            keys = {key, info_cache_key(entry[1]) if entry else None} - {None}
+            for key in keys:
+                self._entries.pop(key, None)
+                if self._db:
+                    try:
+                        self._db.execute(
+                            "DELETE FROM extraction_cache WHERE key = ?", (key,)
+                        )
+                        self._db.commit()
+                    except sqlite3.Error as e:
+                        print(f"⚠️ Extraction cache write error: {e}")
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key, now):
+        if not self._db:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT stored_at, info FROM extraction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            if now - row[0] >= self.ttl:
+                self._db.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            return row[0], json.loads(row[1])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Extraction cache read error: {e}")
+            return None
+
+    def _store(self, key, entry):
+        if not self._db:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO extraction_cache VALUES (?, ?, ?)",
+                (key, entry[0], json.dumps(entry[1], default=str)),
+            )
+            # Drop expired rows and keep the table within max_entries
+            self._db.execute(
+                "DELETE FROM extraction_cache WHERE stored_at < ? OR key NOT IN "
+                "(SELECT key FROM extraction_cache ORDER BY stored_at DESC LIMIT ?)",
+                (time.time() - self.ttl, self.max_entries),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Extraction cache write error: {e}")
+
+
+def interrupt_response(response):
+    """
+    Unblock a read on a yt-dlp response from another thread. Closing alone
+    waits for the reader, so shut the socket down underneath it instead.
+    """
+    fp = getattr(response, "fp", None)
+    try:
+        if hasattr(fp, "shutdown"):  # urllib3 >= 2.3, behind the requests handler
+            fp.shutdown()
+        else:  # http.client response, behind the urllib handler
+            fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+    except Exception:
+        pass
+
+
+class CancelScope:
+    """
+    Blocking work a task has in flight (sockets, HTTP responses, ffmpeg
+    processes), so cancel() can interrupt it instead of waiting for the next
+    progress hook.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sockets = weakref.WeakSet()
+        self._responses = weakref.WeakSet()
+        self._processes = weakref.WeakSet()
+
+    def add_socket(self, sock):
+        with self._lock:
+            self._sockets.add(sock)
+
+    def add_response(self, response):
+        with self._lock:
+            self._responses.add(response)
+
+    def add_process(self, process):
+        with self._lock:
+            self._processes.add(process)
+
+    def interrupt(self):
+        with self._lock:
+            sockets = list(self._sockets)
+            responses = list(self._responses)
+            processes = list(self._processes)
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # Also wakes a wait for headers
+            except OSError:
+                pass  # Already closed
+        for response in responses:
+            interrupt_response(response)
+        for process in processes:
+            try:
+                if process.poll() is None:
+                    process.kill()
+                    print(f"🛑 Killed {os.path.basename(str(process.args[0]))}")
+            except Exception:
+                pass
+
+
+_task_context = threading.local()  # .task: the DownloadTask this thread runs
+
+
+def _install_io_tracking():
+    """
+    Let the sockets and subprocesses (ffmpeg for merges, fixups and
+    conversions) that yt-dlp opens register with the task of the thread that
+    opened them. Threads without a task are unaffected. yt-dlp's fragment
+    threads have no task either; their responses are tracked via track_io.
+    """
+    popen_cls = yt_dlp.utils.Popen
+    if getattr(popen_cls, "_task_tracking", False):
+        return
+    original_init = popen_cls.__init__
+
+    def __init__(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        task = getattr(_task_context, "task", None)
+        if task is not None:
+            task.io.add_process(self)
+            if task.cancel_flag:
+                self.kill()
+
+    popen_cls.__init__ = __init__
+    popen_cls._task_tracking = True
+
+    def tracking(create_connection):
+        def tracked_create_connection(*args, **kwargs):
+            sock = create_connection(*args, **kwargs)
+            task = getattr(_task_context, "task", None)
+            if task is not None:
+                task.io.add_socket(sock)
+            return sock
+
+        return tracked_create_connection
+
+    # The requests handler connects through urllib3, the urllib one through
+    # http.client, which looks socket.create_connection up at call time
+    urllib3.util.connection.create_connection = tracking(
+        urllib3.util.connection.create_connection
+    )
+    socket.create_connection = tracking(socket.create_connection)
+
+
+@contextlib.contextmanager
+def tracking_io(task):
+    """
+    Register the sockets and subprocesses the calling thread opens with
+    task.io, for work outside run_task (anything with .io and .cancel_flag)
+    """
+    _task_context.task = task
+    try:
+        yield
+    finally:
+        _task_context.task = None
+
+
+class DownloadTask:
+    def __init__(self, url, quality, path, ui=None, priority=0):
+        self.url = url
+        self.quality = quality
+        self.path = path
+        self.ui = ui  # Front-end data for this task (card widgets in the Tk app)
+        self.priority = priority  # Lower runs first in priority mode
+        # new -> queued -> running -> done; paused/retrying -> queued
+        self.state = "new"
+        self.thread = None
+        self.cancel_flag = False
+        self.pause_flag = False
+        self.pausing = False  # The progress hook aborted the transfer for a pause
+        self.attempts = 0  # Automatic retries so far
+        self.backoff_until = 0.0  # End of the site cooldown last reported
+        self.submit_seq = None  # Sequence of the live queue entry; others are stale
+        self.video_title = ""  # Store video title for cleanup
+        self.partial_files = []  # Temp/intermediate files this task has written
+        self.io = CancelScope()  # In-flight responses and subprocesses
+        self.journal_id = None  # Row in the download journal, if any
+        self.transfer = {}  # Per-task overrides of fragments/chunk_size/buffer_size
+        self.rate_limit = None  # Per-task bandwidth cap in bytes/s
+        self.ydl = None  # Live YoutubeDL instance while running
+        self.worker = None  # isolation.WorkerProcess while running in a process
+        self.video_key = None  # "<extractor>:<id>" once metadata is known
+        self.format_choice = None  # formats.FormatChoice picked for the download
+        self.stage = None  # While running: downloading -> waiting -> processing
+        self.holds_postprocess_slot = False
+
+
+class FFmpegLocator:
+    """
+    Process-wide ffmpeg resolution.
+
+    The first caller probes PATH, then the local install, and bootstraps a
+    download if neither works. All of this happens under a lock, so
+    concurrent tasks never race to fetch or extract the archive. The result
+    is cached for every later caller; a failure only for RETRY_AFTER
+    seconds, so installing ffmpeg doesn't need a restart.
+    """
+
+    DOWNLOAD_URL = "https://github.com/yt-dlp/FFmpeg-Builds/releases/latest/download/ffmpeg-master-latest-win64-gpl.zip"
+    CHECKSUMS_URL = "https://github.com/yt-dlp/FFmpeg-Builds/releases/latest/download/checksums.sha256"
+    MANIFEST = "install.json"
+    RETRY_AFTER = 60.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resolved = False
+        self._failed_at = None
+        self.location = None  # value for yt-dlp's ffmpeg_location, None if on PATH
+        self.path = None  # full path of the ffmpeg binary
+        self.version = None
+        self.error = None
+
+    def resolve(self):
+        """Return the ffmpeg_location to pass to yt-dlp (None when on PATH)"""
+        if self._failed_at and time.monotonic() - self._failed_at > self.RETRY_AFTER:
+            self.reset()
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    try:
+                        self._resolve()
+                    except Exception as e:
+                        self.error = e
+                        self._failed_at = time.monotonic()
+                    self._resolved = True
+        if self.error:
+            raise self.error
+        return self.location
+
+    def reset(self):
+        """Forget the cached result so the next resolve() probes again"""
+        with self._lock:
+            self._resolved = False
+            self._failed_at = None
+            self.location = self.path = self.version = self.error = None
+
+    @property
+    def install_dir(self):
+        return os.path.join(get_app_data_dir(), "ffmpeg")
+
+    def _resolve(self):
+        on_path = shutil.which("ffmpeg")
+        if on_path:
+            version_line = self._probe_version(on_path)
+            if version_line:
+                self.path, self.version = on_path, version_line
+                print(f"🎞️ Using ffmpeg from PATH: {version_line}")
+                return
+
+        manifest = self._verified_manifest()
+        if manifest is None:
+            manifest = self._bootstrap()
+        self.location = self.install_dir
+        self.path = os.path.join(self.install_dir, "ffmpeg.exe")
+        self.version = manifest.get("version")
+        print(f"🎞️ Using bundled ffmpeg: {self.version}")
+
+    def _probe_version(self, binary):
+        try:
+            result = subprocess.run(
+                [binary, "-version"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                check=True,
+                timeout=15,
+            )
+            return result.stdout.decode(errors="replace").splitlines()[0].strip()
+        except Exception:
+            return None
+
+    @staticmethod
+    def _sha256_file(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _stat_key(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _verified_manifest(self):
+        """
+        Return the install manifest if the binaries on disk still match it.
+        Binaries whose size and mtime are unchanged since the last check are
+        trusted; only changed ones are hashed again.
+        """
+        manifest_path = os.path.join(self.install_dir, self.MANIFEST)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            stats = manifest.setdefault("stat", {})
+            rehashed = False
+            for name, expected in manifest["sha256"].items():
+                path = os.path.join(self.install_dir, name)
+                stat_key = self._stat_key(path)
+                if stats.get(name) == stat_key:
+                    continue
+                if self._sha256_file(path) != expected:
+                    print(f"⚠️ {name} does not match its recorded checksum")
+                    return None
+                stats[name] = stat_key
+                rehashed = True
+            if rehashed:
+                with open(manifest_path, "w") as f:
+                    json.dump(manifest, f, indent=2)
+            return manifest
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _expected_archive_sha256(self):
+        r = get_http_session().get(self.CHECKSUMS_URL, timeout=20)
+        r.raise_for_status()
+        archive_name = self.DOWNLOAD_URL.rsplit("/", 1)[-1]
+        for line in r.text.splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[1].lstrip("*") == archive_name:
+                return parts[0].lower()
+        raise RuntimeError(f"No published checksum for {archive_name}")
+
+    def _bootstrap(self):
+        os.makedirs(self.install_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp()
+        zip_path = os.path.join(tmp_dir, "ffmpeg.zip")
+
+        try:
+            expected = self._expected_archive_sha256()
+            digest = hashlib.sha256()
+            with get_http_session().get(self.DOWNLOAD_URL, stream=True, timeout=20) as r:
+                r.raise_for_status()
+                with open(zip_path, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=1024 * 128):
+                        if chunk:
+                            f.write(chunk)
+                            digest.update(chunk)
+            if digest.hexdigest() != expected:
+                raise RuntimeError("Downloaded FFmpeg archive failed checksum verification.")
+
+            with zipfile.ZipFile(zip_path, "r") as zf:
+                zf.extractall(tmp_dir)
+
+            found = {}
+            for root_dir, dirs, files in os.walk(tmp_dir):
+                for name in ("ffmpeg.exe", "ffprobe.exe"):
+                    if name in files and name not in found:
+                        found[name] = os.path.join(root_dir, name)
+                if len(found) == 2:
+                    break
+
+            if len(found) != 2:
+                raise RuntimeError("FFmpeg binaries not found in downloaded archive.")
+
+            checksums = {}
+            stats = {}
+            for name, src in found.items():
+                path = os.path.join(self.install_dir, name)
+                shutil.copy2(src, path)
+                checksums[name] = self._sha256_file(path)
+                stats[name] = self._stat_key(path)
+
+            manifest = {
+                "archive_sha256": expected,
+                "sha256": checksums,
+                "stat": stats,
+                "version": self._probe_version(
+                    os.path.join(self.install_dir, "ffmpeg.exe")
+                ),
+            }
+            with open(os.path.join(self.install_dir, self.MANIFEST), "w") as f:
+                json.dump(manifest, f, indent=2)
+            return manifest
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Shared by every task in this process
+ffmpeg_locator = FFmpegLocator()
+
+
+class DownloadScheduler:
+    """
+    Bounded pool of worker threads fed from a shared priority queue.
+
+    Queue items are (priority, sequence, task) tuples. In FIFO mode every
+    task gets the same priority so the sequence number decides the order.
+
+    A worker whose task moves on to postprocessing hands its slot off: a new
+    worker starts on the next download, and the old one exits afterwards.
+
+    With a limiter (hosts.HostLimiter), tasks whose site is busy or cooling
+    down stay queued in order while later tasks for other sites start;
+    on_deferred(task) is called each time one is passed over.
+
+    A task submitted again while a worker still runs it (resumed or retried
+    before its last run has wound down) is only queued once that worker has
+    released its site slot, so the two runs never share one.
+    """
+
+    FIFO = "fifo"
+    PRIORITY = "priority"
+    POLL_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        download_queue,
+        runner,
+        max_workers=3,
+        ordering=FIFO,
+        limiter=None,
+        on_deferred=None,
+    ):
+        self.queue = download_queue
+        self.runner = runner
+        self.max_workers = max(1, int(max_workers))
+        self.ordering = ordering
+        self.limiter = limiter
+        self.on_deferred = on_deferred
+        self._seq = itertools.count()
+        self._take_lock = threading.Lock()  # One worker scans the queue at a time
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._handed_off = set()  # Workers finishing a task outside the pool
+        self._running = set()  # Tasks a worker is running or cleaning up after
+        self._resubmitted = set()  # Running tasks to queue once their run ends
+        self._spawn_workers()
+
+    def submit(self, task):
+        with self._lock:
+            task.state = "queued"
+            task.submit_seq = next(self._seq)
+            if task in self._running:
+                self._resubmitted.add(task)
+                return
+        self.queue.put((self._priority_of(task), task.submit_seq, task))
+
+    def resize(self, max_workers):
+        """Change the worker count. Surplus workers exit after their current task."""
+        with self._lock:
+            self.max_workers = max(1, int(max_workers))
+        self._spawn_workers()
+
+    def set_ordering(self, ordering):
+        """Switch between FIFO and priority ordering, re-keying queued tasks."""
+        if ordering == self.ordering:
+            return
+        self.ordering = ordering
+        pending = []
+        while True:
+            try:
+                _, seq, task = self.queue.get_nowait()
+            except Empty:
+                break
+            self.queue.task_done()
+            pending.append((seq, task))
+        for seq, task in pending:
+            self.queue.put((self._priority_of(task), seq, task))
+
+    def pending_count(self):
+        return self.queue.qsize()
+
+    def hand_off(self, task):
+        """
+        Let the calling worker's slot go to the next task (no-op elsewhere).
+        The task is done with the network, so its site slot goes too.
+        """
+        if self.limiter is not None:
+            self.limiter.release(task)
+        me = threading.current_thread()
+        with self._lock:
+            if me not in self._workers or me in self._handed_off:
+                return
+            self._handed_off.add(me)
+        self._spawn_workers()
+
+    def _priority_of(self, task):
+        return task.priority if self.ordering == self.PRIORITY else 0
+
+    def _spawn_workers(self):
+        with self._lock:
+            while len(self._workers) - len(self._handed_off) < self.max_workers:
+                worker = threading.Thread(target=self._worker_loop, daemon=True)
+                self._workers.add(worker)
+                worker.start()
+
+    def _worker_loop(self):
+        me = threading.current_thread()
+        while True:
+            with self._lock:
+                if me in self._handed_off:
+                    self._handed_off.discard(me)
+                    self._workers.discard(me)
+                    return
+                if len(self._workers) - len(self._handed_off) > self.max_workers:
+                    self._workers.discard(me)
+                    return
+            item = self._take()
+            if item is None:
+                continue
+            _, _, task = item
+            with self._lock:
+                self._running.add(task)
+            try:
+                task.state = "running"
+                task.thread = me
+                self.runner(task)
+            except Exception as e:
+                print(f"⚠️ Worker error: {e}")
+            finally:
+                if self.limiter is not None:
+                    self.limiter.release(task)
+                with self._lock:
+                    if task.state == "running":  # Paused tasks keep their state
+                        task.state = "done"
+                    self._running.discard(task)
+                    requeue = task in self._resubmitted
+                    self._resubmitted.discard(task)
+                if requeue:
+                    # Submitted again during the run: its queue entry is due now
+                    self.queue.put((self._priority_of(task), task.submit_seq, task))
+                self.queue.task_done()
+
+    def _take(self):
+        """
+        The first queue item the limiter lets start, or None after a short
+        wait. Items it turns down go back into the queue unchanged, so they
+        keep their place.
+        """
+        skipped = []
+        wait = self.POLL_INTERVAL
+        with self._take_lock:
+            try:
+                while True:
+                    try:
+                        if skipped:
+                            item = self.queue.get_nowait()
+                        else:
+                            item = self.queue.get(timeout=self.POLL_INTERVAL)
+                    except Empty:
+                        break
+                    _, seq, task = item
+                    # Tasks cancelled or paused while still queued are dropped
+                    # without running, as are entries left behind by a resubmit
+                    if task.cancel_flag or task.pause_flag or seq != task.submit_seq:
+                        self.queue.task_done()
+                        continue
+                    delay = 0 if self.limiter is None else self.limiter.acquire(task)
+                    if not delay:
+                        return item
+                    skipped.append(item)
+                    wait = min(wait, delay)
+                    if self.on_deferred is not None:
+                        self.on_deferred(task)
+            finally:
+                for item in skipped:
+                    self.queue.put(item)
+                    self.queue.task_done()
+        if skipped:
+            time.sleep(wait)
+        return None
+
+
+# Quality presets shared by the UI radio buttons and the CLI --quality flag
+QUALITY_PRESETS = ("best", "2160", "1440", "1080", "720", "480", "360", "240", "audio")
+
+
+MiB = 1024 * 1024
+
+# Transfer tuning per quality preset. Keys map to yt-dlp's
+# concurrent_fragment_downloads, http_chunk_size and buffersize; None keeps
+# yt-dlp's own default. High resolutions are DASH/HLS with many fragments.
+# No preset raises buffersize: yt-dlp reads a whole buffer before calling the
+# progress hooks, so a large one starves progress, the bandwidth governor and
+# pause for every smaller fragment. Only an explicit override sets it.
+TRANSFER_PRESETS = {
+    "audio": {"fragments": 2, "chunk_size": 10 * MiB, "buffer_size": None},
+    "best": {"fragments": 8, "chunk_size": 10 * MiB, "buffer_size": None},
+    "2160": {"fragments": 8, "chunk_size": 10 * MiB, "buffer_size": None},
+    "1440": {"fragments": 8, "chunk_size": 10 * MiB, "buffer_size": None},
+}
+DEFAULT_TRANSFER = {"fragments": 4, "chunk_size": 10 * MiB, "buffer_size": None}
+
+
+def resolve_transfer(quality, *overrides):
+    """Preset transfer settings for quality, with non-None overrides applied in order"""
+    settings = dict(TRANSFER_PRESETS.get(str(quality), DEFAULT_TRANSFER))
+    for override in overrides:
+        for key, value in (override or {}).items():
+            if value is not None:
+                settings[key] = value
+    return settings
+
+
+class FragmentTuner:
+    """
+    Adaptive concurrent_fragment_downloads.
+
+    Each finished fragmented stream reports its throughput at the level it
+    ran with. The level doubles while that keeps beating the level below it
+    by a margin, and falls back one step once it stops improving.
+    """
+
+    LEVELS = (1, 2, 4, 8, 16, 32)
+    MIN_GAIN = 1.05  # Require 5% more throughput to justify the next step
+
+    def __init__(self, start=4, maximum=16):
+        self.levels = [level for level in self.LEVELS if level <= maximum]
+        self.level = start if start in self.levels else self.levels[0]
+        self._rates = {}  # level -> smoothed bytes/s
+        self._settled = False
+        self._lock = threading.Lock()
+
+    def record(self, level, throughput):
+        if not throughput or level not in self.levels:
+            return
+        with self._lock:
+            previous = self._rates.get(level)
+            self._rates[level] = (
+                throughput if previous is None else 0.7 * previous + 0.3 * throughput
+            )
+            if level != self.level or self._settled:
+                return
+            index = self.levels.index(level)
+            lower = self._rates.get(self.levels[index - 1]) if index else None
+            if lower is not None and self._rates[level] < lower * self.MIN_GAIN:
+                # No longer improving: go back to the cheaper level and stay
+                self.level = self.levels[index - 1]
+                self._settled = True
+            elif index + 1 < len(self.levels):
+                self.level = self.levels[index + 1]
+            print(f"⚡ Fragment concurrency -> {self.level}")
+
+
+# How downloads become files. "copy" never re-encodes: merges go to mp4 when
+# the streams fit it and to mkv otherwise, and audio keeps its own codec
+# (m4a, opus). "compatible" is the old output: always mp4, audio as MP3.
+OUTPUT_PROFILES = {
+    "copy": {"merge_output_format": "mp4/mkv", "audio_codec": None},
+    "compatible": {"merge_output_format": "mp4", "audio_codec": "mp3"},
+}
+DEFAULT_OUTPUT_PROFILE = "copy"
+
+
+def build_format_opts(quality, profile=DEFAULT_OUTPUT_PROFILE):
+    """yt-dlp options selecting formats (and postprocessing) for a quality preset"""
+    output = OUTPUT_PROFILES.get(profile, OUTPUT_PROFILES[DEFAULT_OUTPUT_PROFILE])
+    if quality == "audio":
+        extract = {"key": "FFmpegExtractAudio", "preferredcodec": "best"}
+        if output["audio_codec"]:
+            extract.update(preferredcodec=output["audio_codec"], preferredquality="192")
+        # With "best" an audio-only download is left as it is, and audio in a
+        # video file is copied out into its own container
+        return {"format": "bestaudio/best", "postprocessors": [extract]}
+    merge = {"merge_output_format": output["merge_output_format"]}
+    if quality == "best":
+        return dict(
+            merge,
+            format="bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best",
+        )
+    # numeric like '720', '480'
+    try:
+        h = int(str(quality).replace("p", ""))
+        return dict(
+            merge,
+            format=f"bestvideo[height<={h}][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<={h}]+bestaudio/best",
+        )
+    except Exception:
+        return dict(merge, format="best")
+
+
+def iter_playlist_entries(info):
+    """Yield lightweight {title, url, duration, key, thumbnail} dicts for a (flat) playlist info"""
+    for entry in info.get("entries") or []:
+        if not entry:  # Unavailable entries come through as None
+            continue
+        yield {
+            "key": info_cache_key(entry),
+            "title": entry.get("title") or "Unknown",
+            "url": entry.get("webpage_url")
+            or entry.get("url", "")
+            or f"https://www.youtube.com/watch?v={entry.get('id', '')}",
+            "duration": entry.get("duration") or 0,
+            # Flat entries list thumbnails smallest first; rows only need a small one
+            "thumbnail": (entry.get("thumbnails") or [{}])[0].get("url")
+            or entry.get("thumbnail"),
+        }
+
+
+class DownloadEngine:
+    """
+    Runs DownloadTasks on a bounded DownloadScheduler and reports progress
+    through listeners, called on worker threads as
+
+        listener(task, event, data)
+
+    Events and their data keys:
+        queued, started, cancelled
+        completed   filename, transcoded (whether anything was re-encoded)
+        info        title, video_key, format (FormatChoice, None if undecided)
+        progress    percent, downloaded, total, speed, filename, allocation
+        paused          (nothing running; toggle_pause again to re-queue)
+        processing      (a stream finished; merging/fixups may follow)
+        postprocess     name, status ("started" / "finished")
+        stage           name ("downloading", "waiting" for a postprocessing
+                        slot, "processing")
+        retry           kind ("http", "fragment", "extractor"), attempt
+        retrying        attempt, delay, error, error_class (re-queued after delay)
+        backoff         host, delay (queued behind a throttled site's cooldown)
+        failed      error, error_class ("permanent", "throttled", "transient")
+        ffmpeg_missing  error
+    """
+
+    def __init__(
+        self,
+        max_workers=3,
+        ordering=DownloadScheduler.FIFO,
+        cache_db=True,
+        quiet=False,
+        scheduler=True,
+    ):
+        self.quiet = quiet  # Silence yt-dlp's own console output
+        self.transfer = {}  # Global overrides of the preset transfer settings
+        self.adaptive_fragments = False
+        self.output_profile = DEFAULT_OUTPUT_PROFILE  # Key of OUTPUT_PROFILES
+        self.fragment_tuner = FragmentTuner()
+        self.governor = BandwidthGovernor()
+        self.download_queue = PriorityQueue()
+        self.extraction_cache = ExtractionCache(
+            db_path=os.path.join(get_app_data_dir(), "extraction_cache.sqlite")
+            if cache_db
+            else None
+        )
+        self.listeners = []
+        self.process_runner = None  # isolation.ProcessRunner, to run tasks isolated
+        self._pause_lock = threading.Lock()
+        self.postprocess_slots = threading.BoundedSemaphore(POSTPROCESS_WORKERS)
+        self.retry_policy = RetryPolicy()
+        self.host_backoff = HostBackoff()
+        _install_io_tracking()
+        if not scheduler:
+            # The caller runs tasks through run_task itself (a worker process)
+            self.host_limiter = self.scheduler = None
+            return
+        self.host_limiter = HostLimiter(self.host_backoff)
+        self.scheduler = DownloadScheduler(
+            self.download_queue,
+            runner=self.run_task,
+            max_workers=max_workers,
+            ordering=ordering,
+            limiter=self.host_limiter,
+            on_deferred=self.report_deferred,
+        )
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def emit(self, task, event, **data):
+        for listener in self.listeners:
+            try:
+                listener(task, event, data)
+            except Exception as e:
+                print(f"⚠️ Listener error on {event}: {e}")
+
+    def submit(self, task):
+        self.scheduler.submit(task)
+        self.emit(task, "queued")
+
+    def cancel(self, task):
+        """
+        Cancel a task. Queued tasks are dropped; a running one has its open
+        responses shut down and its ffmpeg killed, so it stops even inside
+        extraction, a stalled read or a merge, and run_task cleans up.
+        """
+        with self._pause_lock:
+            task.cancel_flag = True
+            idle_state = task.state
+            if idle_state in ("queued", "paused", "retrying"):
+                # Also stops a pending retry timer from re-queueing it
+                task.state = "cancelled"
+        if idle_state in ("queued", "paused", "retrying"):
+            # Not running, so no worker will report it
+            self.emit(task, "cancelled")
+            if idle_state != "queued":
+                threading.Thread(
+                    target=self.cleanup_partial_files, args=(task,), daemon=True
+                ).start()
+            return
+        task.io.interrupt()
+        worker = task.worker
+        if worker is not None:
+            worker.send("cancel")
+
+    def toggle_pause(self, task):
+        """
+        Pause or resume a task and return the new paused state.
+
+        A running task stops at its next progress hook: the transfer is
+        aborted, so the connection is closed and the worker moves on, and the
+        .part file stays. Resuming queues the task again; yt-dlp continues
+        the .part file with a Range request, and the metadata comes from the
+        extraction cache.
+        """
+        with self._pause_lock:
+            task.pause_flag = not task.pause_flag
+            paused = task.pause_flag
+            if paused and task.state in ("queued", "retrying"):
+                task.state = "paused"
+                event = "paused"
+            elif not paused and task.state == "paused":
+                event = "resume"
+            else:
+                event = None  # Running: run_task reports it once the transfer stops
+        worker = task.worker
+        if event is None and worker is not None:
+            worker.send("pause", paused)
+        if event == "paused":
+            self.emit(task, "paused")
+        elif event == "resume":
+            self.submit(task)
+        return paused
+
+    def retry(self, task):
+        """Queue a failed task again; yt-dlp continues its .part file"""
+        task.cancel_flag = task.pause_flag = False
+        task.attempts = 0
+        self.submit(task)
+
+    def fail(self, task, error, error_class):
+        """
+        An attempt failed. Retry it after a jittered backoff unless the error
+        is permanent or the task is out of attempts; otherwise report it.
+        """
+        host = site_of(task.url)
+        if error_class == "throttled":
+            self.host_backoff.penalize(host)
+            # Signed media URLs may be what got refused: extract afresh
+            self.extraction_cache.discard(task.url)
+        delay = self.retry_policy.delay(error_class, task.attempts)
+        if delay is None:
+            self.emit(task, "failed", error=error, error_class=error_class)
+            return
+        task.attempts += 1
+        delay = max(delay, self.host_backoff.remaining(host))
+        with self._pause_lock:
+            task.state = "retrying"
+        print(f"↻ Retry {task.attempts} in {delay:.0f}s ({error_class}): {error}")
+        self.emit(
+            task,
+            "retrying",
+            attempt=task.attempts,
+            delay=delay,
+            error=error,
+            error_class=error_class,
+        )
+        timer = threading.Timer(delay, self._retry_due, (task,))
+        timer.daemon = True
+        timer.start()
+
+    def _retry_due(self, task):
+        with self._pause_lock:
+            if task.cancel_flag or task.state != "retrying":
+                return  # Cancelled or paused meanwhile
+        self.submit(task)
+
+    def report_deferred(self, task):
+        """Scheduler callback: a queued task was passed over for its site"""
+        site = site_of(task.url)
+        delay = self.host_backoff.remaining(site)
+        until = time.monotonic() + delay
+        # Once per cooldown, not on every pass over the queue
+        if delay > 0 and until > task.backoff_until + 1:
+            task.backoff_until = until
+            self.emit(task, "backoff", host=site, delay=delay)
+
+    def ensure_ffmpeg(self, task=None):
+        """ffmpeg_location for yt-dlp, or None (on PATH, or unavailable)"""
+        try:
+            return ffmpeg_locator.resolve()
+        except Exception as e:
+            self.emit(task, "ffmpeg_missing", error=str(e))
+            return None
+
+    def extract_info(self, url, task=None):
+        """Return cached metadata for url, extracting (once) on a miss"""
+        info = self.extraction_cache.get(url)
+        if info is None:
+            with yt_dlp.YoutubeDL(dict(EXTRACT_OPTS, ignoreerrors=False)) as ydl_info:
+                if task is not None:
+                    self.track_io(ydl_info, task)
+                info = ydl_info.extract_info(url, download=False)
+            if not info:
+                raise Exception("Could not extract video information")
+            self.extraction_cache.put(info, url)
+        return info
+
+    def resolve_batch(self, urls, on_row, workers=BATCH_RESOLVE_WORKERS, cancel=None):
+        """
+        Resolve a list of URLs on a bounded pool, playlists expanded to their
+        entries, and deduplicated by video key (first by URL, then again once
+        the extractor has named the video).
+
+        on_row(row) is called from pool threads for every unique video, with
+        row keys url, key, title, duration, source and error (None unless
+        extraction failed). Setting the cancel Event stops URLs that haven't
+        started yet. Returns the number of duplicates dropped.
+        """
+        seen = set()
+        duplicates = [0]
+        lock = threading.Lock()
+
+        def accept(row):
+            with lock:
+                if row["key"] in seen:
+                    duplicates[0] += 1
+                    return
+                if row["key"]:
+                    seen.add(row["key"])
+            on_row(row)
+
+        def resolve(url):
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                info = self.extraction_cache.get(url)
+                if info is None:
+                    with yt_dlp.YoutubeDL(
+                        dict(PLAYLIST_PREVIEW_OPTS, ignoreerrors=False)
+                    ) as ydl:
+                        info = ydl.extract_info(url, download=False, process=False)
+                        if not info:
+                            raise Exception("Could not extract video information")
+                        if info.get("_type") in ("playlist", "multi_video"):
+                            for video in iter_playlist_entries(info):
+                                if cancel is not None and cancel.is_set():
+                                    return
+                                accept(dict(video, source=url, error=None))
+                            return
+                        info = ydl.process_ie_result(info, download=False)
+                    # Kept for run_task, so the download won't extract again
+                    self.extraction_cache.put(info, url)
+                if "entries" in info:
+                    for video in iter_playlist_entries(info):
+                        accept(dict(video, source=url, error=None))
+                    return
+                accept(
+                    {
+                        "url": url,
+                        "key": info_cache_key(info) or normalize_video_key(url),
+                        "title": info.get("title") or "Unknown",
+                        "duration": info.get("duration") or 0,
+                        "source": url,
+                        "error": None,
+                    }
+                )
+            except Exception as e:
+                print(f"⚠️ Could not resolve {url}: {e}")
+                on_row(
+                    {
+                        "url": url,
+                        "key": None,
+                        "title": url,
+                        "duration": 0,
+                        "source": url,
+                        "error": str(e),
+                    }
+                )
+
+        unique = []
+        requested = set()
+        for url in urls:
+            key = normalize_video_key(url)
+            if key in requested:
+                duplicates[0] += 1
+                continue
+            requested.add(key)
+            unique.append(url)
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="resolve"
+        ) as pool:
+            list(pool.map(resolve, unique))
+        return duplicates[0]
+
+    @staticmethod
+    def track_io(ydl, task):
+        """Route a YoutubeDL's requests through the task's CancelScope"""
+        urlopen = ydl.urlopen
+
+        def tracked_urlopen(req):
+            if task.cancel_flag:
+                raise DownloadCancelled("Cancelled")
+            response = urlopen(req)
+            task.io.add_response(response)
+            if task.cancel_flag:  # Cancelled while we were connecting
+                interrupt_response(response)
+            return response
+
+        ydl.urlopen = tracked_urlopen
+
+    def record_partial_file(self, task, path):
+        if path and path not in task.partial_files:
+            task.partial_files.append(path)
+
+    def cleanup_partial_files(self, task):
+        """
+        Delete what a cancelled task wrote: the files recorded by its hooks,
+        plus the fragment and resume-state files yt-dlp derives from them.
+        """
+        files_deleted = []
+        for path in task.partial_files:
+            candidates = [path, path + ".ytdl"]
+            candidates += glob.glob(glob.escape(path) + "-Frag*")
+            for file_path in candidates:
+                try:
+                    if os.path.isfile(file_path):
+                        os.remove(file_path)
+                        files_deleted.append(os.path.basename(file_path))
+                except OSError as e:
+                    print(f"⚠️ Could not remove {file_path}: {e}")
+
+        if files_deleted:
+            print(f"🗑️ Cleaned up {len(files_deleted)} partial files: {files_deleted}")
+
+    def reset_fragment_state(self, task):
+        """
+        Make a paused task's fragmented streams safe to resume.
+
+        A pause can abort right after a fragment's last byte is written;
+        resuming that .part file asks for a Range past its end, which the
+        server refuses with 416 and yt-dlp retries forever. So unfinished
+        fragment files go, and yt-dlp fetches those fragments again.
+
+        With concurrent fragments, yt-dlp's .ytdl resume index can count
+        fragments that finished but were never appended, and a resume would
+        skip them. Such streams start over instead; sequential ones resume.
+        """
+        # The tuner may have changed the level since the run started
+        concurrent = self.tunes_fragments(task) or self.fragment_concurrency(task) > 1
+        doomed = []
+        for path in task.partial_files:
+            doomed += glob.glob(glob.escape(path) + "-Frag*.part")
+            if concurrent and os.path.isfile(path + ".ytdl"):
+                part = path + ".part"
+                doomed += [path + ".ytdl", part]
+                doomed += glob.glob(glob.escape(part) + "-Frag*")
+        for file_path in dict.fromkeys(doomed):
+            try:
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+            except OSError as e:
+                print(f"⚠️ Could not remove {file_path}: {e}")
+
+    def make_progress_hook(self, task):
+        """
+        Returns a function suitable for yt-dlp progress_hooks.
+        It only emits the latest numbers; front-ends decide how often to draw.
+        If task.pause_flag is set, it aborts the transfer: run_task then parks
+        the task as paused and frees its worker slot, and resuming re-queues
+        it to continue the .part file.
+        """
+
+        stream = {"fragmented": False}
+
+        def hook(d):
+            status = d.get("status")
+            if status == "downloading":
+                # First, so a cancel or pause on the first call still knows them
+                self.record_partial_file(task, d.get("tmpfilename"))
+                self.record_partial_file(task, d.get("filename"))
+
+            if task.cancel_flag:
+                # Raise to abort download inside yt-dlp
+                raise Exception("Cancelled")
+
+            if status == "downloading" and task.pause_flag:
+                # Abort the transfer too; run_task parks the task as paused
+                task.pausing = True
+                raise Exception("Paused")
+
+            if status == "downloading":
+                if task.stage is None:
+                    task.stage = "downloading"
+                    self.emit(task, "stage", name="downloading")
+                if d.get("fragment_count"):
+                    stream["fragmented"] = True
+                downloaded = d.get("downloaded_bytes", 0)
+                total = d.get("total_bytes", 0) or d.get("total_bytes_estimate", 0)
+                self.governor.throttle(task, downloaded, d.get("speed"))
+                self.emit(
+                    task,
+                    "progress",
+                    percent=(downloaded * 100 / total) if total else 0.0,
+                    downloaded=downloaded,
+                    total=total,
+                    speed=d.get("speed", 0),
+                    filename=d.get("filename"),
+                    allocation=self.governor.allocation(task),
+                )
+
+            elif status == "finished":
+                if self.adaptive_fragments and stream["fragmented"]:
+                    self.tune_fragments(task, d)
+                stream["fragmented"] = False
+                self.emit(task, "processing")
+
+        return hook
+
+    def make_postprocessor_hook(self, task):
+        """yt-dlp postprocessor_hooks entry timing merges, fixups and conversions"""
+
+        def hook(d):
+            filepath = (d.get("info_dict") or {}).get("filepath")
+            if (
+                d.get("status") == "started"
+                and task.stage == "downloading"
+                and d.get("postprocessor") not in LIGHT_POSTPROCESSORS
+            ):
+                self.begin_postprocessing(task)
+            if d.get("status") == "started" and filepath:
+                # ffmpeg postprocessors write to "<name>.temp.<ext>" first
+                self.record_partial_file(task, prepend_extension(filepath, "temp"))
+            if d.get("status") in ("started", "finished"):
+                self.emit(
+                    task, "postprocess", name=d.get("postprocessor"), status=d["status"]
+                )
+
+        return hook
+
+    def begin_postprocessing(self, task):
+        """
+        Second pipeline stage, entered from the first real postprocessor:
+        the download slot goes to the next queued task while this one waits
+        for one of the POSTPROCESS_WORKERS slots for its merge/conversion.
+        """
+        task.stage = "waiting"
+        self.emit(task, "stage", name="waiting")
+        self.scheduler.hand_off(task)
+        if not self.wait_postprocess_slot(task):
+            raise DownloadCancelled("Cancelled")
+        task.stage = "processing"
+        self.emit(task, "stage", name="processing")
+
+    def wait_postprocess_slot(self, task):
+        """Block until a postprocessing slot is free; False if cancelled first"""
+        while not self.postprocess_slots.acquire(timeout=0.25):
+            if task.cancel_flag:
+                return False
+        task.holds_postprocess_slot = True
+        return True
+
+    def end_postprocessing(self, task):
+        if task.holds_postprocess_slot:
+            task.holds_postprocess_slot = False
+            self.postprocess_slots.release()
+        task.stage = None
+
+    def make_retry_reporter(self, task, kind):
+        """
+        yt-dlp retry_sleep_functions entry: called before each retry with the
+        zero-based attempt number, returns the delay: a short jittered backoff,
+        or longer while the task's host is backing off.
+        """
+        host = site_of(task.url)
+
+        def on_retry(n):
+            self.emit(task, "retry", kind=kind, attempt=n + 1)
+            return jittered(0.5, n, 30.0) + self.host_backoff.remaining(host)
+
+        return on_retry
+
+    def tune_fragments(self, task, d):
+        """Feed a finished fragmented stream's throughput to the tuner"""
+        elapsed = d.get("elapsed")
+        size = d.get("total_bytes") or d.get("downloaded_bytes")
+        if not elapsed or not size or task.ydl is None:
+            return
+        level = task.ydl.params.get("concurrent_fragment_downloads", 1)
+        self.fragment_tuner.record(level, size / elapsed)
+        # yt-dlp reads this per stream, so the task's next stream picks it up
+        task.ydl.params["concurrent_fragment_downloads"] = self.fragment_tuner.level
+
+    def build_ydl_opts(self, task):
+        ydl_opts = {
+            "outtmpl": os.path.join(task.path, "%(title)s.%(ext)s"),
+            "progress_hooks": [self.make_progress_hook(task)],
+            "postprocessor_hooks": [self.make_postprocessor_hook(task)],
+            "retry_sleep_functions": {
+                kind: self.make_retry_reporter(task, kind)
+                for kind in ("http", "fragment", "extractor")
+            },
+            "retries": HTTP_RETRIES,
+            "fragment_retries": FRAGMENT_RETRIES,
+        }
+        if self.quiet:
+            ydl_opts.update({"quiet": True, "noprogress": True, "no_warnings": True})
+
+        # Ensure ffmpeg
+        ffmpeg_dir = self.ensure_ffmpeg(task)
+        if ffmpeg_dir:
+            ydl_opts["ffmpeg_location"] = ffmpeg_dir
+
+        # Format handling
+        ydl_opts.update(build_format_opts(task.quality, self.output_profile))
+
+        # Transfer tuning: preset, then global settings, then the task's own
+        transfer = resolve_transfer(task.quality, self.transfer, task.transfer)
+        ydl_opts["concurrent_fragment_downloads"] = self.fragment_concurrency(task)
+        if transfer["chunk_size"]:
+            ydl_opts["http_chunk_size"] = int(transfer["chunk_size"])
+        if transfer["buffer_size"]:
+            ydl_opts["buffersize"] = int(transfer["buffer_size"])
+        return ydl_opts
+
+    def tunes_fragments(self, task):
+        """True if the tuner, not a fixed setting, picks task's fragment count"""
+        return self.adaptive_fragments and not task.transfer.get("fragments")
+
+    def fragment_concurrency(self, task):
+        """concurrent_fragment_downloads for task's next run"""
+        if self.tunes_fragments(task):
+            return max(1, int(self.fragment_tuner.level))
+        transfer = resolve_transfer(task.quality, self.transfer, task.transfer)
+        return max(1, int(transfer["fragments"]))
+
+    def run_task(self, task):
+        if self.process_runner is not None:
+            return self.process_runner.run(task)
+
+        url = task.url
+        self.emit(task, "started")
+        _task_context.task = task  # For the ffmpeg Popen tracking
+
+        try:
+            if task.cancel_flag:
+                raise Exception("Cancelled")
+
+            ydl_opts = self.build_ydl_opts(task)
+
+            # Reuse the metadata from the preview when we have it, otherwise
+            # extract once here and hand the same info dict to the download
+            info = self.extract_info(url, task)
+
+            title = info.get("title") or url
+            task.video_title = title
+            task.video_key = info_cache_key(info)
+            audio_codec = OUTPUT_PROFILES.get(
+                self.output_profile, OUTPUT_PROFILES[DEFAULT_OUTPUT_PROFILE]
+            )["audio_codec"]
+            choice = task.format_choice = choose_formats(
+                info, task.quality, audio_codec
+            )
+            if choice is not None:
+                # Exact streams, with the preset's selector in case they're gone
+                ydl_opts["format"] = f"{choice.format_id}/{ydl_opts['format']}"
+                print(f"🎯 Formats {choice.format_id}: {choice.label}")
+            self.emit(
+                task,
+                "info",
+                title=title,
+                video_key=task.video_key,
+                format=choice,
+            )
+
+            if task.pause_flag:
+                task.pausing = True
+                raise Exception("Paused")
+
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                task.ydl = ydl
+                self.track_io(ydl, task)
+                self.governor.register(task)
+                try:
+                    result = ydl.process_ie_result(info, download=True)
+                finally:
+                    self.governor.unregister(task)
+                    task.ydl = None
+
+            self.host_backoff.succeeded(site_of(url))
+            downloads = (result or {}).get("requested_downloads") or [{}]
+            self.emit(
+                task,
+                "completed",
+                filename=downloads[-1].get("filepath"),
+                # Merges and fixups only ever copy; audio conversion may encode
+                transcoded=choice.transcode
+                if choice is not None
+                else task.quality == "audio" and bool(audio_codec),
+            )
+        except Exception as e:
+            if task.cancel_flag:
+                self.cleanup_partial_files(task)
+                self.emit(task, "cancelled")
+            elif task.pausing:
+                self.park_paused(task)
+            else:
+                self.fail(task, str(e), classify_error(e))
+        finally:
+            self.end_postprocessing(task)
+            _task_context.task = None
+
+    def park_paused(self, task):
+        """Called from run_task once a pause has stopped the transfer"""
+        self.reset_fragment_state(task)
+        with self._pause_lock:
+            task.pausing = False
+            if task.pause_flag:
+                task.state = "paused"
+        if task.state == "paused":
+            self.emit(task, "paused")
+        else:
+            self.submit(task)  # Resumed while the transfer was still stopping
@@ -0,0 +1,272 @@
+"""
+Format selection from the format table yt-dlp extracted.
+
+The quality presets used to become generic selector strings like
+"bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/...", which pick the
+*best* stream at that height, often a far bigger one than needed.
+choose_formats() instead ranks the actual formats and picks exact IDs:
+
+    video   highest height (then fps) allowed by the preset, then streams
+            that copy into the mp4 output, then the fewest bytes
+    audio   container-compatible, then the smallest stream at or above the
+            preset's bitrate target (the best one for "best")
+    muxed   used instead of video+audio when it is as good and not bigger,
+            since nothing needs merging then
+
+Every pick carries its size estimate and the reason it won.
+"""
+
+# Codecs that stream-copy into the mp4 we merge to (merge_output_format)
+MP4_VIDEO_CODECS = ("avc1", "avc3", "h264", "av01", "hvc1", "hev1", "h265")
+MP4_AUDIO_CODECS = ("mp4a", "aac", "mp3", "ac-3", "ec-3")
+KNOWN_VIDEO_CODECS = MP4_VIDEO_CODECS + ("vp9", "vp09", "vp8")
+KNOWN_AUDIO_CODECS = MP4_AUDIO_CODECS + ("opus", "vorbis", "flac")
+
+AUDIO_TARGET_KBPS = {"best": None, "audio": 160}  # None = highest available
+DEFAULT_AUDIO_TARGET_KBPS = 128
+
+
+def codec_family(codec):
+    """'avc1.64001F' -> 'avc1'; None/'none' -> ''"""
+    codec = (codec or "").split(".")[0].lower()
+    return "" if codec == "none" else codec
+
+
+def estimate_size(fmt, duration=None):
+    """Bytes from the listed (or approximate) size, else bitrate x duration"""
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if size:
+        return int(size)
+    tbr = fmt.get("tbr") or (fmt.get("vbr") or 0) + (fmt.get("abr") or 0)
+    if tbr and duration:
+        return int(tbr * 1000 / 8 * duration)
+    return None
+
+
+def is_usable(fmt):
+    return (
+        fmt.get("format_id")
+        and not fmt.get("has_drm")
+        and fmt.get("ext") != "mhtml"  # Storyboard images
+    )
+
+
+def has_video(fmt):
+    return bool(fmt.get("height")) and fmt.get("vcodec") != "none"
+
+
+def has_audio(fmt):
+    return bool(codec_family(fmt.get("acodec")))
+
+
+def video_compat(fmt):
+    """2: copies into mp4, 1: known codec needing a less portable mux, 0: unknown"""
+    codec = codec_family(fmt.get("vcodec"))
+    if codec in MP4_VIDEO_CODECS:
+        return 2
+    return 1 if codec in KNOWN_VIDEO_CODECS else 0
+
+
+def audio_compat(fmt):
+    codec = codec_family(fmt.get("acodec"))
+    if codec in MP4_AUDIO_CODECS:
+        return 2
+    return 1 if codec in KNOWN_AUDIO_CODECS else 0
+
+
+def target_height(quality):
+    """Height cap of a preset: None for "best" (and unknown presets)"""
+    try:
+        return int(str(quality).replace("p", ""))
+    except ValueError:
+        return None
+
+
+class FormatChoice:
+    """Exact streams for one download, with size estimates and reasons"""
+
+    def __init__(self, streams, transcode=False):
+        # [{format_id, kind ("video"/"audio"/"muxed"), label, size, reason}]
+        self.streams = streams
+        self.transcode = transcode  # Output is re-encoded (e.g. audio -> mp3)
+
+    @property
+    def format_id(self):
+        """yt-dlp format spec for exactly these streams, e.g. 137+140"""
+        return "+".join(stream["format_id"] for stream in self.streams)
+
+    @property
+    def size(self):
+        """Estimated total bytes, or None when any stream's size is unknown"""
+        sizes = [stream["size"] for stream in self.streams]
+        return None if None in sizes else sum(sizes)
+
+    @property
+    def label(self):
+        return " + ".join(stream["label"] for stream in self.streams)
+
+    def reasons(self):
+        """One "<id>: <why>" line per stream"""
+        return "\n".join(
+            f"{stream['format_id']}: {stream['reason']}" for stream in self.streams
+        )
+
+
+def _stream(fmt, kind, duration, reason):
+    if kind == "audio":
+        abr = fmt.get("abr")
+        label = f"{codec_family(fmt.get('acodec')) or fmt.get('ext')}"
+        label += f" {abr:.0f}k" if abr else ""
+    else:
+        fps = fmt.get("fps")
+        label = (
+            f"{fmt['height']}p{fps:.0f}" if fps and fps > 30 else f"{fmt['height']}p"
+        )
+        label += f" {codec_family(fmt.get('vcodec')) or fmt.get('ext')}"
+    return {
+        "format_id": str(fmt["format_id"]),
+        "kind": kind,
+        "label": label,
+        "size": estimate_size(fmt, duration),
+        "reason": reason,
+    }
+
+
+def _size_key(fmt, duration):
+    size = estimate_size(fmt, duration)
+    return float("inf") if size is None else size
+
+
+def _pick_video(formats, cap, duration):
+    candidates = [f for f in formats if has_video(f)]
+    if not candidates:
+        return None, None
+    allowed = [f for f in candidates if cap is None or f["height"] <= cap]
+    if allowed:
+        reasons = [f"highest quality at or below {cap}p" if cap else "highest quality"]
+    else:
+        # Nothing that small: fall back to the lowest height there is
+        lowest = min(f["height"] for f in candidates)
+        allowed = [f for f in candidates if f["height"] == lowest]
+        reasons = [f"lowest quality available, nothing at or below {cap}p"]
+    height = max(f["height"] for f in allowed)
+    fps = max(f.get("fps") or 0 for f in allowed if f["height"] == height)
+    tier = [f for f in allowed if f["height"] == height and (f.get("fps") or 0) == fps]
+    # Muxed streams are weighed against video+audio in choose_formats
+    tier = [f for f in tier if not has_audio(f)] or tier
+    best = min(tier, key=lambda f: (-video_compat(f), _size_key(f, duration)))
+
+    reasons.append(
+        "copies into mp4"
+        if video_compat(best) == 2
+        else "no mp4-native stream at this quality"
+    )
+    if len(tier) > 1:
+        sizes = [s for s in (estimate_size(f, duration) for f in tier) if s]
+        reason = f"smallest of {len(tier)} candidates"
+        best_size = estimate_size(best, duration)
+        if best_size and sizes and max(sizes) > best_size:
+            reason += f", {max(sizes) / best_size:.1f}x smaller than the largest"
+        reasons.append(reason)
+    return best, "; ".join(reasons)
+
+
+def _pick_audio(formats, target, prefer_compat, duration):
+    candidates = [f for f in formats if has_audio(f) and not has_video(f)]
+    if not candidates:
+        return None, None
+    if prefer_compat:
+        compat = max(audio_compat(f) for f in candidates)
+        candidates = [f for f in candidates if audio_compat(f) == compat]
+
+    if target is None:
+        best = max(
+            candidates, key=lambda f: (f.get("abr") or 0, -_size_key(f, duration))
+        )
+        reason = "highest bitrate"
+    else:
+        enough = [f for f in candidates if (f.get("abr") or 0) >= target * 0.9]
+        if enough:
+            best = min(
+                enough, key=lambda f: (_size_key(f, duration), f.get("abr") or 0)
+            )
+            reason = f"smallest at or above {target}k"
+        else:
+            best = max(candidates, key=lambda f: f.get("abr") or 0)
+            reason = f"nothing reaches {target}k; highest bitrate"
+    if prefer_compat and audio_compat(best) == 2:
+        reason += "; copies into mp4"
+    return best, reason
+
+
+def choose_formats(info, quality, audio_codec=None):
+    """
+    FormatChoice for an extracted info dict and a quality preset, or None
+    when the format table doesn't say enough to choose (no formats, no
+    heights or codecs); callers then keep the preset's selector string.
+
+    audio_codec is what audio downloads get converted to, None to keep the
+    source codec.
+    """
+    formats = [f for f in (info or {}).get("formats") or [] if is_usable(f)]
+    if not formats:
+        return None
+    duration = info.get("duration")
+
+    if quality == "audio":
+        # Kept in its own container, or converted anyway: the codec is moot
+        audio, reason = _pick_audio(
+            formats, AUDIO_TARGET_KBPS["audio"], prefer_compat=False, duration=duration
+        )
+        if audio is None:
+            return None
+        transcode = bool(audio_codec) and codec_family(audio["acodec"]) != audio_codec
+        return FormatChoice(
+            [_stream(audio, "audio", duration, reason)], transcode=transcode
+        )
+
+    video, video_reason = _pick_video(formats, target_height(quality), duration)
+    if video is None:
+        return None
+    if has_audio(video):
+        return FormatChoice([_stream(video, "muxed", duration, video_reason)])
+
+    target = AUDIO_TARGET_KBPS.get(quality, DEFAULT_AUDIO_TARGET_KBPS)
+    audio, audio_reason = _pick_audio(
+        formats, target, prefer_compat=True, duration=duration
+    )
+    if audio is None:
+        return None
+    choice = FormatChoice(
+        [
+            _stream(video, "video", duration, video_reason),
+            _stream(audio, "audio", duration, audio_reason),
+        ]
+    )
+
+    # A single muxed stream of the same quality saves the merge
+    muxed = [
+        f
+        for f in formats
+        if has_video(f)
+        and has_audio(f)
+        and f["height"] == video["height"]
+        and (f.get("fps") or 0) == (video.get("fps") or 0)
+        and video_compat(f) >= video_compat(video)
+    ]
+    if muxed:
+        single = min(muxed, key=lambda f: _size_key(f, duration))
+        size = estimate_size(single, duration)
+        if size is not None and (choice.size is None or size <= choice.size):
+            return FormatChoice(
+                [
+                    _stream(
+                        single,
+                        "muxed",
+                        duration,
+                        video_reason.split(";")[0] + "; video and audio in one "
+                        "stream, no merge needed",
+                    )
+                ]
+            )
+    return choice
@@ -0,0 +1,138 @@
+"""
+Per-site politeness for the download scheduler.
+
+Tasks are grouped by site (site_of), so www.youtube.com, youtu.be and the
+googlevideo.com media edges all count as one. A site is the registered
+domain, found with the public suffix list when tldextract is installed;
+without it, a hostname under a short country suffix it doesn't know (id.au)
+is a site of its own rather than risk lumping unrelated sites together.
+HostLimiter lets a queued task start only when its site has
+
+    concurrency   fewer than its limit of running tasks (none by default:
+                  the worker pool is the only cap)
+    spacing       had no other task start in the last `start_spacing`
+                  seconds; this spaces out task starts, not the requests
+                  a running task makes
+    cooldown      no throttling backoff pending (retry.HostBackoff, shared
+                  with the retries)
+
+The scheduler leaves tasks the limiter turns down queued, in order, and
+starts the next one instead, so other sites keep flowing at full speed.
+"""
+
+import ipaddress
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:  # Optional: the full public suffix list
+    import tldextract
+
+    # The snapshot bundled with tldextract: no download, no cache file
+    _extract = tldextract.TLDExtract(cache_dir=None, suffix_list_urls=())
+except ImportError:
+    _extract = None
+
+DEFAULT_MAX_PER_SITE = None  # None = as many as the worker pool runs
+DEFAULT_START_SPACING = 1.0  # Seconds between task starts on one site
+
+# Hosts that are the same site as far as rate limits go
+SITE_ALIASES = {
+    "youtu.be": "youtube.com",
+    "youtube-nocookie.com": "youtube.com",
+    "googlevideo.com": "youtube.com",
+    "ytimg.com": "youtube.com",
+}
+SITE_LIMITS = {}  # site -> concurrency limit overriding max_per_site
+
+# Second-level labels that are public suffixes under country domains
+# (co.uk, com.au, net.au, ac.jp, ...), for when tldextract is missing
+COUNTRY_SECOND_LEVEL = set(
+    "ac co com edu go gob gov ltd mil ne net nic nom or org plc sch".split()
+)
+
+
+def site_of(url):
+    """'https://m.youtube.com/watch?v=x' -> 'youtube.com'; IPs stay as they are"""
+    host = (urlsplit(url).hostname or "").lower().rstrip(".")
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    site = _registered_domain(host)
+    return SITE_ALIASES.get(site, site)
+
+
+def _registered_domain(host):
+    if _extract is not None:
+        parts = _extract(host)
+        if parts.domain and parts.suffix:
+            return f"{parts.domain}.{parts.suffix}"
+        return host
+    labels = host.split(".")
+    if len(labels) <= 2 or len(labels[-1]) != 2:
+        return ".".join(labels[-2:])
+    if labels[-2] in COUNTRY_SECOND_LEVEL:
+        return ".".join(labels[-3:])  # www.bbc.co.uk -> bbc.co.uk
+    if len(labels[-2]) <= 3:
+        # Maybe a suffix we don't know (like id.au): the whole hostname
+        return host
+    return ".".join(labels[-2:])  # www.spiegel.de -> spiegel.de
+
+
+class HostLimiter:
+    """Concurrency, spacing and cooldown per site; see the module docstring"""
+
+    def __init__(
+        self,
+        backoff,
+        max_per_site=DEFAULT_MAX_PER_SITE,
+        start_spacing=DEFAULT_START_SPACING,
+        limits=None,
+    ):
+        self.backoff = backoff  # retry.HostBackoff
+        self.max_per_site = max_per_site  # None = unlimited
+        self.start_spacing = start_spacing
+        self.limits = dict(SITE_LIMITS if limits is None else limits)
+        self._running = {}  # site -> running task count
+        self._holders = {}  # task -> site it holds a slot of
+        self._last_start = {}  # site -> monotonic time of the last start
+        self._lock = threading.Lock()
+
+    def limit_for(self, site):
+        return self.limits.get(site, self.max_per_site)
+
+    def acquire(self, task):
+        """
+        Take a slot on task's site and return 0, or return the seconds until
+        it might get one (math.inf while the site is at its limit).
+        """
+        site = site_of(task.url)
+        cooldown = self.backoff.remaining(site)
+        if cooldown > 0:
+            return cooldown
+        now = time.monotonic()
+        with self._lock:
+            if task in self._holders:
+                return 0
+            limit = self.limit_for(site)
+            if limit is not None and self._running.get(site, 0) >= limit:
+                return math.inf
+            wait = self._last_start.get(site, -math.inf) + self.start_spacing - now
+            if wait > 0:
+                return wait
+            self._running[site] = self._running.get(site, 0) + 1
+            self._holders[task] = site
+            self._last_start[site] = now
+        return 0
+
+    def release(self, task):
+        """Give task's slot back; a no-op when it holds none"""
+        with self._lock:
+            site = self._holders.pop(task, None)
+            if site is not None:
+                self._running[site] -= 1
+                if not self._running[site]:
+                    del self._running[site]
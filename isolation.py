@@ -0,0 +1,299 @@
+"""
+Process isolation for downloads.
+
+With a ProcessRunner installed as DownloadEngine.process_runner, every task
+runs in its own worker process instead of on the scheduler thread, so
+yt-dlp's Python-side work (extraction, fragment handling, hooks) gets its own
+GIL and a crashing extractor only takes its own process down.
+
+The scheduler thread stays the task's owner: it starts the process and relays
+the events that come back over a pipe to the engine's listeners, as if the
+task ran in-process. Commands (cancel, pause, rate limit, fragment level,
+postprocessing go-ahead) go the other way over the same pipe. The bandwidth
+governor, the fragment tuner and the postprocessing slots stay in the app;
+the worker only applies what they decide.
+"""
+
+import multiprocessing
+import threading
+import time
+
+from yt_dlp.utils import DownloadCancelled
+
+from engine import DownloadEngine, DownloadTask
+from hosts import site_of
+from retry import classify_error
+
+CANCEL_GRACE = 5.0  # Seconds a cancelled worker gets to stop before it is killed
+POLL_INTERVAL = 0.25
+TERMINAL_EVENTS = ("completed", "failed", "cancelled", "paused")
+
+# fork would copy the Tk app and its threads mid-flight
+_mp = multiprocessing.get_context("spawn")
+
+
+class WorkerProcess:
+    """App-side handle of one worker process and its end of the pipe"""
+
+    def __init__(self, spec):
+        self.conn, child_conn = _mp.Pipe()
+        self.process = _mp.Process(
+            target=_worker_main,
+            args=(child_conn, spec),
+            name=f"download-{spec['url']}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ratelimit = None  # Last allocation sent to the worker
+        self._send_lock = threading.Lock()
+
+    def send(self, command, value=None):
+        """Deliver a command; callable from any thread"""
+        with self._send_lock:
+            try:
+                self.conn.send((command, value))
+            except (OSError, ValueError):
+                pass  # The worker is already gone
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            print(f"🛑 Killed worker process {self.process.pid}")
+
+    def close(self):
+        self.process.join(timeout=1)
+        self.kill()
+        self.conn.close()
+
+
+class ProcessRunner:
+    """Runs DownloadTasks in worker processes; see the module docstring"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def spec_for(self, task):
+        """Everything the worker needs to rebuild the task, as plain data"""
+        engine = self.engine
+        return {
+            "url": task.url,
+            "quality": task.quality,
+            "path": task.path,
+            "priority": task.priority,
+            "transfer": dict(task.transfer),
+            "partial_files": list(task.partial_files),
+            "quiet": engine.quiet,
+            "engine_transfer": dict(engine.transfer),
+            "adaptive_fragments": engine.adaptive_fragments,
+            "output_profile": engine.output_profile,
+            "fragments_level": engine.fragment_tuner.level,
+            # Spares the worker an extraction when the preview already did it
+            "info": engine.extraction_cache.get(task.url),
+        }
+
+    def run(self, task):
+        """Scheduler runner: start a worker for task and relay until it ends"""
+        engine = self.engine
+        try:
+            worker = WorkerProcess(self.spec_for(task))
+        except Exception as e:
+            engine.emit(task, "started")
+            engine.emit(
+                task,
+                "failed",
+                error=f"Could not start worker process: {e}",
+                error_class="permanent",
+            )
+            return
+
+        task.worker = worker
+        engine.governor.register(task)
+        ended = False
+        cancel_deadline = None
+        try:
+            # Toggled before task.worker was set, so not sent yet
+            if task.pause_flag:
+                worker.send("pause", True)
+            if task.cancel_flag:
+                worker.send("cancel")
+
+            while not ended:
+                if task.cancel_flag:
+                    cancel_deadline = cancel_deadline or time.monotonic() + CANCEL_GRACE
+                    if time.monotonic() > cancel_deadline:
+                        worker.kill()  # Stuck somewhere the interrupt can't reach
+                        break
+                try:
+                    if not worker.conn.poll(POLL_INTERVAL):
+                        if not worker.process.is_alive():
+                            break
+                        continue
+                    event, data = worker.conn.recv()
+                except (EOFError, OSError):
+                    break  # The worker exited or crashed
+                ended = self.relay(task, worker, event, data)
+        finally:
+            engine.governor.unregister(task)
+            engine.end_postprocessing(task)
+            if task.worker is worker:  # Not a newer run's, if it was re-queued
+                task.worker = None
+            worker.close()
+
+        if not ended:
+            if task.cancel_flag:
+                engine.cleanup_partial_files(task)
+                engine.emit(task, "cancelled")
+            else:
+                error = f"Worker process exited with code {worker.process.exitcode}"
+                engine.fail(task, error, classify_error(error))
+
+    def relay(self, task, worker, event, data):
+        """Handle one message from the worker; True once the task has ended"""
+        engine = self.engine
+        if event == "_partial":
+            engine.record_partial_file(task, data["path"])
+        elif event == "_info":
+            engine.extraction_cache.put(data["info"], task.url)
+        elif event == "_tune":
+            engine.fragment_tuner.record(data["level"], data["throughput"])
+            worker.send("fragments", engine.fragment_tuner.level)
+        elif event == "paused":
+            engine.park_paused(task)
+        elif event == "failed":
+            # Retrying is the app's call, so it can back off across tasks
+            engine.fail(task, data["error"], data["error_class"])
+        elif event == "stage" and data["name"] == "waiting":
+            # Postprocessing slots are the app's: free the download slot,
+            # then let the worker merge once a slot is ours
+            task.stage = "waiting"
+            engine.emit(task, event, **data)
+            engine.scheduler.hand_off(task)
+            if engine.wait_postprocess_slot(task):
+                task.stage = "processing"
+                worker.send("postprocess")
+        else:
+            if event == "stage":
+                task.stage = data["name"]
+            elif event == "info":
+                task.video_title = data["title"]
+                task.video_key = data["video_key"]
+                task.format_choice = data["format"]
+            elif event == "completed":
+                engine.host_backoff.succeeded(site_of(task.url))
+            elif event == "progress":
+                # The app's governor decides the share, the worker enforces it
+                engine.governor.account(task, data["downloaded"], data["speed"])
+                allocation = engine.governor.allocation(task)
+                if allocation != worker.ratelimit:
+                    worker.ratelimit = allocation
+                    worker.send("ratelimit", allocation)
+                data["allocation"] = allocation
+            engine.emit(task, event, **data)
+        return event in TERMINAL_EVENTS
+
+
+class _Channel:
+    """Worker-side sender; hooks call it from yt-dlp's fragment threads too"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, event, **data):
+        with self._lock:
+            self.conn.send((event, data))
+
+
+class _TunerProxy:
+    """Worker-side FragmentTuner: measurements go to the app's tuner"""
+
+    def __init__(self, channel, level):
+        self.channel = channel
+        self.level = level  # Updated when the app answers with a "fragments" command
+
+    def record(self, level, throughput):
+        self.channel.send("_tune", level=level, throughput=throughput)
+
+
+class _WorkerEngine(DownloadEngine):
+    """DownloadEngine inside a worker process, reporting over the pipe"""
+
+    def __init__(self, channel, spec):
+        # run_task is called directly: no scheduler threads or host limiter
+        super().__init__(cache_db=False, quiet=spec["quiet"], scheduler=False)
+        self.channel = channel
+        self.transfer = spec["engine_transfer"]
+        self.adaptive_fragments = spec["adaptive_fragments"]
+        self.output_profile = spec["output_profile"]
+        self.fragment_tuner = _TunerProxy(channel, spec["fragments_level"])
+        self.postprocess_go = threading.Event()  # Set by the app's "postprocess"
+        if spec["info"]:
+            self.extraction_cache.put(spec["info"], spec["url"])
+        self.add_listener(lambda task, event, data: channel.send(event, **data))
+
+    def extract_info(self, url, task=None):
+        info = self.extraction_cache.get(url)
+        if info is None:
+            info = super().extract_info(url, task)
+            # Cached in the app too, so a resume doesn't extract again
+            self.channel.send("_info", info=self.extraction_cache.get(url))
+        return info
+
+    def record_partial_file(self, task, path):
+        if path and path not in task.partial_files:
+            super().record_partial_file(task, path)
+            self.channel.send("_partial", path=path)
+
+    def begin_postprocessing(self, task):
+        # The app owns the postprocessing slots: wait for its go-ahead
+        task.stage = "waiting"
+        self.emit(task, "stage", name="waiting")
+        while not self.postprocess_go.wait(0.25):
+            if task.cancel_flag:
+                raise DownloadCancelled("Cancelled")
+        task.stage = "processing"
+        self.emit(task, "stage", name="processing")
+
+    def fail(self, task, error, error_class):
+        self.emit(task, "failed", error=error, error_class=error_class)
+
+    def park_paused(self, task):
+        # The app decides between staying paused and re-queueing
+        self.emit(task, "paused")
+
+
+def _listen(conn, engine, task):
+    """Apply commands from the app until the pipe closes"""
+    while True:
+        try:
+            command, value = conn.recv()
+        except (EOFError, OSError):
+            command, value = "cancel", None  # The app is gone; don't linger
+        if command == "cancel":
+            engine.cancel(task)
+            return
+        if command == "pause":
+            task.pause_flag = value
+        elif command == "ratelimit":
+            # The only task here, so its share of the cap is all of it
+            engine.governor.global_limit = value
+        elif command == "postprocess":
+            engine.postprocess_go.set()
+        elif command == "fragments":
+            engine.fragment_tuner.level = value
+            ydl = task.ydl
+            if ydl is not None:
+                ydl.params["concurrent_fragment_downloads"] = value
+
+
+def _worker_main(conn, spec):
+    engine = _WorkerEngine(_Channel(conn), spec)
+    task = DownloadTask(
+        spec["url"], spec["quality"], spec["path"], priority=spec["priority"]
+    )
+    task.transfer = spec["transfer"]
+    task.partial_files = list(spec["partial_files"])
+    task.state = "running"
+    threading.Thread(target=_listen, args=(conn, engine, task), daemon=True).start()
+    engine.run_task(task)
@@ -0,0 +1,153 @@
+"""
+Crash-safe download journal.
+
+Every DownloadTask is recorded in SQLite (WAL mode) as it moves through the
+engine, so a session that dies halfway through a long playlist can be
+resumed: unfinished rows are re-queued with their original URL, quality and
+path, which lets yt-dlp pick up the existing .part files, and completed rows
+are never touched again.
+"""
+
+import sqlite3
+import threading
+import time
+
+# States that still need work on the next start
+PENDING_STATES = ("queued", "running", "paused", "failed")
+
+
+class DownloadJournal:
+    """Engine listener persisting task state; use engine.add_listener(journal.record)"""
+
+    PROGRESS_WRITE_INTERVAL = 2.0  # Seconds between byte-count writes per task
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._last_progress_write = {}
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                quality TEXT NOT NULL,
+                path TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                title TEXT,
+                state TEXT NOT NULL,
+                downloaded_bytes INTEGER NOT NULL DEFAULT 0,
+                total_bytes INTEGER NOT NULL DEFAULT 0,
+                filename TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state)")
+        self._db.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+
+    def add(self, task):
+        """Insert a row for task (once) and remember its id on the task"""
+        if getattr(task, "journal_id", None) is not None:
+            return task.journal_id
+        now = time.time()
+        cursor = self._execute(
+            "INSERT INTO tasks (url, quality, path, priority, title, state, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+            (
+                task.url,
+                str(task.quality),
+                task.path,
+                task.priority,
+                task.video_title or None,
+                now,
+                now,
+            ),
+        )
+        task.journal_id = cursor.lastrowid
+        return task.journal_id
+
+    def update(self, task, **fields):
+        if getattr(task, "journal_id", None) is None:
+            return
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._execute(
+            f"UPDATE tasks SET {columns} WHERE id = ?",
+            (*fields.values(), task.journal_id),
+        )
+
+    def record(self, task, event, data):
+        """DownloadEngine listener"""
+        if task is None:
+            return
+        if event == "queued":
+            if getattr(task, "journal_id", None) is None:
+                self.add(task)
+            else:
+                self.update(task, state="queued", error=None)
+        elif event == "started":
+            self.update(task, state="running")
+        elif event == "info":
+            self.update(task, title=data["title"])
+        elif event == "paused":
+            self.update(task, state="paused")
+        elif event == "progress":
+            now = time.monotonic()
+            if now - self._last_progress_write.get(task, 0) < self.PROGRESS_WRITE_INTERVAL:
+                return
+            self._last_progress_write[task] = now
+            self.update(
+                task,
+                downloaded_bytes=int(data.get("downloaded") or 0),
+                total_bytes=int(data.get("total") or 0),
+                filename=data.get("filename"),
+            )
+        elif event == "completed":
+            self._last_progress_write.pop(task, None)
+            fields = {"state": "completed", "error": None}
+            if data.get("filename"):
+                fields["filename"] = data["filename"]
+            self.update(task, **fields)
+        elif event == "failed":
+            self._last_progress_write.pop(task, None)
+            self.update(task, state="failed", error=data.get("error"))
+        elif event == "cancelled":
+            self._last_progress_write.pop(task, None)
+            self.update(task, state="cancelled")
+
+    def pending(self):
+        """Unfinished rows from earlier sessions, oldest first, as dicts"""
+        placeholders = ", ".join("?" for _ in PENDING_STATES)
+        with self._lock:
+            self._db.row_factory = sqlite3.Row
+            try:
+                rows = self._db.execute(
+                    f"SELECT * FROM tasks WHERE state IN ({placeholders}) ORDER BY id",
+                    PENDING_STATES,
+                ).fetchall()
+            finally:
+                self._db.row_factory = None
+        return [dict(row) for row in rows]
+
+    def dismiss(self, journal_ids):
+        """Mark rows the user chose not to resume so they are not offered again"""
+        with self._lock:
+            self._db.executemany(
+                "UPDATE tasks SET state = 'dismissed', updated_at = ? WHERE id = ?",
+                [(time.time(), journal_id) for journal_id in journal_ids],
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,173 @@
+"""
+Failure classification and backoff for automatic retries.
+
+classify_error() sorts a failed attempt into
+
+    permanent   private/removed/geo-blocked/unsupported; never retried
+    throttled   HTTP 429/403, bot checks; retried slowly, and the host backs
+                off for every task
+    transient   resets, timeouts, truncated bodies, 5xx; retried soon
+
+RetryPolicy turns a class and attempt number into a jittered exponential
+delay (or None when out of attempts). HostBackoff keeps a per-host
+"not before" time; the scheduler starts no task for the host before it.
+"""
+
+import random
+import re
+import socket
+import threading
+import time
+
+from yt_dlp.networking.exceptions import IncompleteRead, TransportError
+from yt_dlp.utils import (
+    ContentTooShortError,
+    ExtractorError,
+    GeoRestrictedError,
+    UnsupportedError,
+)
+
+PERMANENT, THROTTLED, TRANSIENT = "permanent", "throttled", "transient"
+
+PERMANENT_STATUS = (401, 404, 410, 451)
+THROTTLED_STATUS = (403, 429)  # YouTube answers 403 to throttled or stale URLs
+
+HTTP_STATUS_PATTERN = re.compile(r"HTTP Error (\d{3})")
+THROTTLED_PATTERN = re.compile(
+    r"too many requests|rate.?limit|not a bot|try again later", re.IGNORECASE
+)
+PERMANENT_PATTERN = re.compile(
+    r"private video|video unavailable|has been removed|no longer available"
+    r"|not available in your country|members.only|unsupported url|drm"
+    r"|requested format is not available|confirm your age|copyright"
+    r"|account .* terminated|does not exist",
+    re.IGNORECASE,
+)
+
+
+def _error_chain(error):
+    """The error and whatever it wraps (DownloadError.exc_info, causes)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, "exc_info", None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) else None
+        error = (
+            wrapped
+            or getattr(error, "cause", None)
+            or error.__cause__
+            or error.__context__
+        )
+        if not isinstance(error, BaseException):
+            error = None
+
+
+def _status_class(status):
+    if status in THROTTLED_STATUS:
+        return THROTTLED
+    if status in PERMANENT_STATUS:
+        return PERMANENT
+    if status >= 500:
+        return TRANSIENT
+    return None
+
+
+def classify_error(error):
+    """PERMANENT, THROTTLED or TRANSIENT for an exception (or message)"""
+    if isinstance(error, str):
+        error = Exception(error)
+    chain = list(_error_chain(error))
+
+    for err in chain:
+        status = getattr(err, "status", None) or getattr(err, "code", None)
+        if isinstance(status, int) and _status_class(status):
+            return _status_class(status)
+
+    text = " ".join(str(err) for err in chain)
+    # yt-dlp often only has the status in the message
+    match = HTTP_STATUS_PATTERN.search(text)
+    if match and _status_class(int(match.group(1))):
+        return _status_class(int(match.group(1)))
+    if THROTTLED_PATTERN.search(text):
+        return THROTTLED
+    if PERMANENT_PATTERN.search(text):
+        return PERMANENT
+    for err in chain:
+        if isinstance(err, (GeoRestrictedError, UnsupportedError)):
+            return PERMANENT
+        if isinstance(
+            err,
+            (
+                TransportError,
+                IncompleteRead,
+                ContentTooShortError,
+                ConnectionError,
+                TimeoutError,
+                socket.timeout,
+            ),
+        ):
+            return TRANSIENT
+    # Extractors flag errors that are the video's fault, not the network's
+    if any(isinstance(err, ExtractorError) and err.expected for err in chain):
+        return PERMANENT
+    return TRANSIENT
+
+
+def jittered(base, attempt, cap):
+    """Exponential backoff with "equal jitter": half fixed, half random"""
+    delay = min(cap, base * 2**attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryPolicy:
+    """How often, and after how long, each class of failure is retried"""
+
+    def __init__(self, attempts=None, base=None, cap=300.0):
+        self.attempts = attempts or {TRANSIENT: 4, THROTTLED: 5, PERMANENT: 0}
+        self.base = base or {TRANSIENT: 2.0, THROTTLED: 15.0}  # seconds
+        self.cap = cap
+
+    def delay(self, error_class, attempt):
+        """Seconds before retry number attempt + 1, or None to give up"""
+        if attempt >= self.attempts.get(error_class, 0):
+            return None
+        return jittered(self.base[error_class], attempt, self.cap)
+
+
+class HostBackoff:
+    """
+    Per-host (per-site, keyed by hosts.site_of) backoff shared by all tasks.
+    Each throttled failure doubles the host's pause (with jitter); each
+    success steps it back down.
+    """
+
+    def __init__(self, base=10.0, cap=600.0):
+        self.base = base
+        self.cap = cap
+        self._hosts = {}  # host -> [level, not_before (monotonic)]
+        self._lock = threading.Lock()
+
+    def penalize(self, host):
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, 0.0])
+            delay = jittered(self.base, state[0], self.cap)
+            state[0] += 1
+            state[1] = max(state[1], time.monotonic() + delay)
+        print(f"🐢 Backing off {host} for {delay:.0f}s")
+        return delay
+
+    def succeeded(self, host):
+        """One strike fewer; a cooldown already set still runs out on its own"""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state[0] = max(0, state[0] - 1)
+                if not state[0] and state[1] <= time.monotonic():
+                    del self._hosts[host]
+
+    def remaining(self, host):
+        """Seconds until the host may be contacted again"""
+        with self._lock:
+            state = self._hosts.get(host)
+        return max(0.0, state[1] - time.monotonic()) if state else 0.0
@@ -0,0 +1,244 @@
+"""
+Per-task download telemetry, fed by DownloadEngine events.
+
+TelemetryStore.record is an engine listener. It keeps one record per task
+while it runs and moves finished ones into a bounded ring buffer, so a long
+session costs a fixed amount of memory. Snapshots are plain dicts, ready
+for the stats panel or for CSV/JSON export.
+"""
+
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+STALL_SECONDS = 3.0  # No new bytes for this long (while not paused) is a stall
+SPEED_SAMPLES = 1000  # Speed samples kept per task for the percentiles
+TERMINAL_EVENTS = ("completed", "failed", "cancelled")
+
+CSV_FIELDS = (
+    "id",
+    "url",
+    "title",
+    "quality",
+    "format",
+    "result",
+    "started_at",
+    "extraction_s",
+    "ttfb_s",
+    "download_s",
+    "bytes",
+    "estimated_bytes",
+    "avg_speed",
+    "p95_speed",
+    "max_speed",
+    "stalls",
+    "stalled_s",
+    "postprocess_s",
+    "retries",
+    "error",
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class _TaskRecord:
+    """Raw timings for one task; times are time.monotonic() unless noted"""
+
+    def __init__(self, record_id, task):
+        self.id = record_id
+        self.url = task.url
+        self.title = None
+        self.quality = task.quality
+        self.format = None  # Format IDs the selection picked
+        self.estimated_bytes = None  # What the selection expected to download
+        self.result = "running"
+        self.error = None
+        self.started_at = time.time()  # wall clock, for the export
+        self.started = time.monotonic()
+        self.info_at = None
+        self.first_byte_at = None
+        self.last_byte_at = None
+        self.finished_at = None
+        self.bytes = 0  # finished streams + the current one
+        self.done_bytes = 0  # streams already finished (video + audio merges)
+        self.stream_bytes = 0
+        self.speeds = deque(maxlen=SPEED_SAMPLES)
+        self.stalls = 0
+        self.stalled_s = 0.0
+        self.paused = False
+        self.processing_at = None  # last stream finished; merge/fixups follow
+        self.postprocessors = {}  # name -> seconds
+        self.pp_started = {}  # name -> monotonic start
+        self.retries = 0
+
+    def snapshot(self):
+        end = self.finished_at or time.monotonic()
+        download_end = max(self.processing_at or 0, self.last_byte_at or 0)
+        download_s = (
+            download_end - self.first_byte_at
+            if self.first_byte_at and download_end
+            else None
+        )
+        speeds = list(self.speeds)
+        return {
+            "id": self.id,
+            "url": self.url,
+            "title": self.title,
+            "quality": self.quality,
+            "format": self.format,
+            "result": self.result,
+            "started_at": time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)
+            ),
+            "elapsed_s": _round(end - self.started),
+            "extraction_s": _round(self.info_at and self.info_at - self.started),
+            # Measured from the end of extraction, so it is network time only
+            "ttfb_s": _round(
+                self.first_byte_at
+                and self.first_byte_at - (self.info_at or self.started)
+            ),
+            "download_s": _round(download_s),
+            "bytes": self.bytes,
+            "estimated_bytes": self.estimated_bytes,
+            "avg_speed": round(self.bytes / download_s) if download_s else None,
+            "p95_speed": _round(percentile(speeds, 0.95)),
+            "max_speed": _round(max(speeds, default=None)),
+            "stalls": self.stalls,
+            "stalled_s": _round(self.stalled_s),
+            "postprocess_s": (
+                _round(self.finished_at - self.processing_at)
+                if self.processing_at and self.result == "completed"
+                else None
+            ),
+            "postprocessors": {k: _round(v) for k, v in self.postprocessors.items()},
+            "retries": self.retries,
+            "error": self.error,
+        }
+
+
+def _round(value, digits=3):
+    return round(value, digits) if isinstance(value, (int, float)) else None
+
+
+class TelemetryStore:
+    """
+    Engine listener recording extraction time, time to first byte, speed
+    statistics, stalls, postprocessing time and retries per task.
+    """
+
+    def __init__(self, capacity=500):
+        self._active = {}  # task -> _TaskRecord
+        self._finished = deque(maxlen=capacity)  # (task, _TaskRecord)
+        self._by_task = {}  # task -> finished _TaskRecord still in the buffer
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def record(self, task, event, data):
+        now = time.monotonic()
+        with self._lock:
+            if event == "started":
+                if task in self._active:
+                    # Resumed after a pause: same record, and not a stall
+                    self._active[task].paused = True
+                    return
+                self._active[task] = _TaskRecord(self._next_id, task)
+                self._next_id += 1
+                return
+            rec = self._active.get(task)
+            if rec is None:
+                return  # e.g. queued, or cancelled before it started
+
+            if event == "info":
+                rec.title = data.get("title")
+                rec.info_at = rec.info_at or now
+                choice = data.get("format")
+                if choice is not None:
+                    rec.format = choice.format_id
+                    rec.estimated_bytes = choice.size
+            elif event == "progress":
+                self._on_progress(rec, data, now)
+            elif event == "paused":
+                rec.paused = True
+            elif event == "processing":
+                # One per finished stream; the next stream starts from zero
+                rec.processing_at = now
+                rec.done_bytes += rec.stream_bytes
+                rec.stream_bytes = 0
+            elif event == "postprocess":
+                name = data.get("name") or "?"
+                if data.get("status") == "started":
+                    rec.pp_started[name] = now
+                elif name in rec.pp_started:
+                    elapsed = now - rec.pp_started.pop(name)
+                    rec.postprocessors[name] = rec.postprocessors.get(name, 0) + elapsed
+            elif event in ("retry", "retrying"):
+                # yt-dlp's own retries and whole-attempt retries alike; the
+                # abort of a cancel or pause makes yt-dlp retry too
+                if not (task.cancel_flag or task.pause_flag):
+                    rec.retries += 1
+            elif event in TERMINAL_EVENTS:
+                rec.result = event
+                rec.error = data.get("error")
+                rec.finished_at = now
+                del self._active[task]
+                if len(self._finished) == self._finished.maxlen:
+                    # The oldest record falls out of the ring buffer
+                    self._by_task.pop(self._finished[0][0], None)
+                self._finished.append((task, rec))
+                self._by_task[task] = rec
+
+    @staticmethod
+    def _on_progress(rec, data, now):
+        downloaded = data.get("downloaded") or 0
+        speed = data.get("speed")
+        if speed:
+            rec.speeds.append(speed)
+        if rec.paused:
+            # Time spent paused is not a stall
+            rec.paused = False
+            rec.last_byte_at = now
+        if downloaded > rec.stream_bytes:
+            if rec.first_byte_at is None:
+                rec.first_byte_at = now
+            elif rec.last_byte_at is not None:
+                gap = now - rec.last_byte_at
+                if gap >= STALL_SECONDS:
+                    rec.stalls += 1
+                    rec.stalled_s += gap
+            rec.stream_bytes = downloaded
+            rec.bytes = rec.done_bytes + downloaded
+            rec.last_byte_at = now
+
+    def get(self, task):
+        """Snapshot for one task (running or recently finished), or None"""
+        with self._lock:
+            rec = self._active.get(task) or self._by_task.get(task)
+            return rec.snapshot() if rec else None
+
+    def snapshots(self):
+        """Finished records, oldest first, followed by the running ones"""
+        with self._lock:
+            return [rec.snapshot() for _, rec in self._finished] + [
+                rec.snapshot() for rec in self._active.values()
+            ]
+
+    def export_json(self, path):
+        records = self.snapshots()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2)
+        return len(records)
+
+    def export_csv(self, path):
+        records = self.snapshots()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(records)
+        return len(records)
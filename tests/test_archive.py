@@ -0,0 +1,36 @@
+from archive import DownloadArchive, archive_key
+from engine import ExtractionCache
+
+GENERIC_URL = "https://media.example.org/files/clip.mp4"
+
+
+def test_archive_key():
+    assert archive_key("Youtube:dQw4w9WgXcQ") == "youtube dQw4w9WgXcQ"
+    assert archive_key(GENERIC_URL) is None
+    assert archive_key(None) is None
+
+
+def test_youtube_url_matches_without_extraction(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive.txt"))
+    archive.add("youtube dQw4w9WgXcQ")
+    assert archive.contains_url("https://youtu.be/dQw4w9WgXcQ")
+    assert not archive.contains_url("https://youtu.be/aaaaaaaaaaa")
+
+
+def test_generic_url_matches_through_its_extracted_id(tmp_path):
+    archive = DownloadArchive(str(tmp_path / "archive.txt"))
+    archive.add("generic clip")
+    assert not archive.contains_url(GENERIC_URL)
+    assert archive.contains_url(GENERIC_URL, "Generic:clip")
+
+    cache = ExtractionCache()
+    cache.put({"extractor_key": "Generic", "id": "clip"}, GENERIC_URL)
+    archive.extraction_cache = cache
+    assert archive.contains_url(GENERIC_URL)
+    assert not archive.contains_url("https://media.example.org/files/other.mp4")
+
+
+def test_archive_survives_reload(tmp_path):
+    path = str(tmp_path / "archive.txt")
+    DownloadArchive(path).add("generic clip")
+    assert "generic clip" in DownloadArchive(path)
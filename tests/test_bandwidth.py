@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from bandwidth import BandwidthGovernor, parse_rate, parse_schedule
+
+MiB = 1024 * 1024
+
+
+class FakeTask:
+    def __init__(self, rate_limit=None):
+        self.rate_limit = rate_limit
+        self.cancel_flag = False
+
+
+def at_hour(hour):
+    """A timestamp at hour:30 local time"""
+    return time.mktime((2026, 1, 15, hour, 30, 0, 0, 0, -1))
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2M", 2 * MiB),
+        ("500K", 500 * 1024),
+        ("1.5M", int(1.5 * MiB)),
+        ("1G", 1024 * MiB),
+        ("2MB/s", 2 * MiB),
+        ("2mb", 2 * MiB),
+        (" 1048576 ", 1048576),
+        ("0", 0),
+        ("", 0),
+    ],
+)
+def test_parse_rate(text, expected):
+    assert parse_rate(text) == expected
+
+
+@pytest.mark.parametrize("text", ["abc", "M", "1.5.5M", "2X", "-1M", "fast"])
+def test_parse_rate_malformed(text):
+    with pytest.raises(ValueError):
+        parse_rate(text)
+
+
+def test_parse_schedule():
+    assert parse_schedule("0-7=0, 9-17=2M") == [(0, 7, None), (9, 17, 2 * MiB)]
+    assert parse_schedule("22-6=1M,") == [(22, 6, MiB)]
+    assert parse_schedule("") == []
+
+
+@pytest.mark.parametrize("text", ["9=2M", "a-b=1M", "9-17=fast"])
+def test_parse_schedule_malformed(text):
+    with pytest.raises(ValueError):
+        parse_schedule(text)
+
+
+@pytest.mark.parametrize(
+    "hour, expected",
+    [(21, 5 * MiB), (22, MiB), (23, MiB), (0, MiB), (5, MiB), (6, 5 * MiB)],
+)
+def test_overnight_window(hour, expected):
+    governor = BandwidthGovernor(5 * MiB, parse_schedule("22-6=1M"))
+    assert governor.current_limit(at_hour(hour)) == expected
+
+
+def test_unthrottled_window_overrides_global_cap():
+    governor = BandwidthGovernor(5 * MiB, parse_schedule("23-7=0"))
+    assert governor.current_limit(at_hour(2)) is None
+    assert governor.current_limit(at_hour(12)) == 5 * MiB
+
+
+def test_cap_split_evenly():
+    governor = BandwidthGovernor(10 * MiB)
+    tasks = [FakeTask(), FakeTask()]
+    for task in tasks:
+        governor.register(task)
+    governor.account(tasks[0], 0)
+    assert [governor.allocation(task) for task in tasks] == [5 * MiB, 5 * MiB]
+
+
+def test_finished_task_share_goes_to_the_others():
+    governor = BandwidthGovernor(9 * MiB)
+    tasks = [FakeTask(), FakeTask(), FakeTask()]
+    for task in tasks:
+        governor.register(task)
+    governor.account(tasks[0], 0)
+    assert governor.allocation(tasks[0]) == 3 * MiB
+
+    governor.unregister(tasks[2])
+    governor.account(tasks[0], 0)  # Rebalances: unregister reset the interval
+    assert governor.allocation(tasks[2]) is None
+    assert governor.allocation(tasks[0]) == governor.allocation(tasks[1]) == 4.5 * MiB
+
+
+def test_own_limit_and_unused_share_are_redistributed():
+    governor = BandwidthGovernor(10 * MiB)
+    limited, slow, fast = FakeTask(rate_limit=MiB), FakeTask(), FakeTask()
+    for task in (limited, slow, fast):
+        governor.register(task)
+    governor.account(fast, 0)
+    assert governor.allocation(limited) == MiB
+    assert governor.allocation(slow) == governor.allocation(fast) == 4.5 * MiB
+
+    # slow only manages 1 MiB/s of its 4.5: it keeps a bit more than that
+    governor._tasks[slow]["speed"] = MiB
+    governor._last_rebalance = 0.0
+    governor.account(fast, 0)
+    assert governor.allocation(slow) == pytest.approx(1.2 * MiB)
+    assert governor.allocation(fast) == pytest.approx(10 * MiB - MiB - 1.2 * MiB)
+
+
+def test_no_cap_only_own_limits():
+    governor = BandwidthGovernor()
+    limited, free = FakeTask(rate_limit=2 * MiB), FakeTask()
+    for task in (limited, free):
+        governor.register(task)
+    governor.account(free, 0)
+    assert governor.allocation(limited) == 2 * MiB
+    assert governor.allocation(free) is None
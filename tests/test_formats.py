@@ -0,0 +1,151 @@
+import pytest
+
+from formats import choose_formats
+
+
+def video(format_id, height, vcodec="avc1.640028", size=None, fps=30, ext="mp4"):
+    return {
+        "format_id": format_id,
+        "height": height,
+        "vcodec": vcodec,
+        "acodec": "none",
+        "fps": fps,
+        "ext": ext,
+        "filesize": size,
+    }
+
+
+def audio(format_id, acodec, abr, size=None, ext="m4a"):
+    return {
+        "format_id": format_id,
+        "vcodec": "none",
+        "acodec": acodec,
+        "abr": abr,
+        "ext": ext,
+        "filesize": size,
+    }
+
+
+def muxed(format_id, height, size, vcodec="avc1.42001E", acodec="mp4a.40.2"):
+    return {
+        "format_id": format_id,
+        "height": height,
+        "vcodec": vcodec,
+        "acodec": acodec,
+        "fps": 30,
+        "ext": "mp4",
+        "filesize": size,
+    }
+
+
+AUDIO = [
+    audio("140", "mp4a.40.2", 129, size=3_000_000),
+    audio("251", "opus", 160, size=3_500_000, ext="webm"),
+    audio("249", "opus", 50, size=1_000_000, ext="webm"),
+]
+
+
+@pytest.mark.parametrize(
+    "formats, quality, audio_codec, expected_id, transcode",
+    [
+        # Audio-only: smallest stream at or above the 160k target
+        (AUDIO, "audio", None, "251", False),
+        # ...converted when the output profile wants another codec
+        (AUDIO, "audio", "mp3", "251", True),
+        (AUDIO, "audio", "opus", "251", False),
+        # Video rows are never picked for an audio download
+        (AUDIO + [video("137", 1080, size=50_000_000)], "audio", None, "251", False),
+        # Video + audio: highest allowed height, mp4-compatible audio
+        (
+            AUDIO
+            + [
+                video("137", 1080, size=50_000_000),
+                video("136", 720, size=20_000_000),
+            ],
+            "720",
+            None,
+            "136+140",
+            False,
+        ),
+        # mp4-native video wins over a smaller VP9 stream at the same height
+        (
+            AUDIO
+            + [
+                video("137", 1080, size=50_000_000),
+                video("248", 1080, vcodec="vp9", size=30_000_000, ext="webm"),
+            ],
+            "1080",
+            None,
+            "137+140",
+            False,
+        ),
+        # No merge needed: a muxed stream as good and no bigger
+        (
+            AUDIO + [video("136", 720, size=20_000_000), muxed("22", 720, 15_000_000)],
+            "720",
+            None,
+            "22",
+            False,
+        ),
+        # ...but not when it is bigger than video + audio
+        (
+            AUDIO + [video("136", 720, size=20_000_000), muxed("22", 720, 40_000_000)],
+            "720",
+            None,
+            "136+140",
+            False,
+        ),
+        # Nothing at or below the cap: the lowest height there is
+        (AUDIO + [video("137", 1080, size=50_000_000)], "360", None, "137+140", False),
+    ],
+)
+def test_choose_formats(formats, quality, audio_codec, expected_id, transcode):
+    choice = choose_formats({"formats": formats}, quality, audio_codec)
+    assert choice is not None
+    assert choice.format_id == expected_id
+    assert choice.transcode == transcode
+
+
+@pytest.mark.parametrize(
+    "formats, quality",
+    [
+        ([], "best"),
+        # Missing heights: the table can't say which stream is which quality
+        ([{"format_id": "0", "vcodec": "avc1", "acodec": "mp4a", "ext": "mp4"}], "720"),
+        # vcodec "none" rows are audio, even if a height slipped in
+        ([dict(audio("140", "mp4a.40.2", 129), height=720)], "720"),
+        # Video without any audio stream to pair it with
+        ([video("137", 1080, size=50_000_000)], "1080"),
+        # Only storyboards and DRM streams
+        (
+            [
+                {"format_id": "sb0", "ext": "mhtml", "height": 90, "vcodec": "none"},
+                dict(video("137", 1080), has_drm=True),
+            ],
+            "best",
+        ),
+        # Audio-only download from a table without audio
+        ([video("137", 1080)], "audio"),
+    ],
+)
+def test_choose_formats_undecided(formats, quality):
+    assert choose_formats({"formats": formats}, quality) is None
+
+
+def test_vcodec_none_rows_are_not_video():
+    formats = AUDIO + [
+        video("136", 720, size=20_000_000),
+        dict(audio("139", "mp4a.40.5", 48, size=1_000_000), height=1080),
+    ]
+    choice = choose_formats({"formats": formats}, "best")
+    assert choice.format_id == "136+140"
+
+
+def test_size_estimated_from_bitrate_and_duration():
+    formats = [
+        dict(video("136", 720), tbr=1000),
+        dict(audio("140", "mp4a.40.2", 128), tbr=128),
+    ]
+    choice = choose_formats({"formats": formats, "duration": 8}, "720")
+    assert choice.size == 1000 * 1000 + 128 * 1000
+    assert [stream["kind"] for stream in choice.streams] == ["video", "audio"]
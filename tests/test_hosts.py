@@ -0,0 +1,134 @@
+import math
+
+import pytest
+
+from hosts import HostLimiter, site_of
+from retry import HostBackoff
+
+
+class FakeTask:
+    def __init__(self, url):
+        self.url = url
+
+
+@pytest.mark.parametrize(
+    "url, site",
+    [
+        ("https://www.youtube.com/watch?v=x", "youtube.com"),
+        ("https://m.youtube.com/watch?v=x", "youtube.com"),
+        ("https://music.youtube.com/watch?v=x", "youtube.com"),
+        ("https://youtu.be/x", "youtube.com"),
+        ("https://www.youtube-nocookie.com/embed/x", "youtube.com"),
+        ("https://rr3---sn-4g5e6nz7.googlevideo.com/videoplayback", "youtube.com"),
+        ("https://vimeo.com/123", "vimeo.com"),
+        ("https://player.vimeo.com/video/123", "vimeo.com"),
+        ("https://www.bbc.co.uk/iplayer/episode/x", "bbc.co.uk"),
+        ("https://WWW.Example.COM./video", "example.com"),
+        ("http://127.0.0.1:8000/a.mp4", "127.0.0.1"),
+        ("http://[::1]:8000/a.mp4", "::1"),
+        ("http://localhost:8000/a.mp4", "localhost"),
+    ],
+)
+def test_site_of(url, site):
+    assert site_of(url) == site
+
+
+@pytest.mark.parametrize(
+    "url, site",
+    [
+        ("https://www.abc.net.au/news", "abc.net.au"),
+        ("https://iview.abc.net.au/show", "abc.net.au"),
+        ("https://www.sbs.com.au/ondemand", "sbs.com.au"),
+        ("https://foo.co.uk/a.mp4", "foo.co.uk"),
+        ("https://www.spiegel.de/video", "spiegel.de"),
+    ],
+)
+def test_site_of_multi_label_suffixes(url, site):
+    assert site_of(url) == site
+
+
+def test_unrelated_sites_under_one_suffix_stay_apart():
+    assert site_of("https://foo.co.uk/") != site_of("https://bar.co.uk/")
+    assert site_of("https://www.abc.net.au/") != site_of("https://www.sbs.net.au/")
+
+
+def test_unknown_short_country_suffix_keeps_the_hostname(monkeypatch):
+    import hosts
+
+    monkeypatch.setattr(hosts, "_extract", None)  # The built-in fallback
+    assert site_of("https://video.xyz.au/clip") == "video.xyz.au"
+    assert site_of("https://other.xyz.au/clip") == "other.xyz.au"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    import hosts
+    import retry
+
+    now = [1000.0]
+    monkeypatch.setattr(hosts.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(retry.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_concurrency_limit_per_site(clock):
+    limiter = HostLimiter(HostBackoff(), max_per_site=2, start_spacing=0)
+    a, b, c = (FakeTask(f"https://youtu.be/{n}") for n in "abc")
+    other = FakeTask("https://vimeo.com/1")
+    assert limiter.acquire(a) == 0
+    assert limiter.acquire(b) == 0
+    assert limiter.acquire(c) == math.inf
+    assert limiter.acquire(other) == 0  # Other sites keep flowing
+
+    limiter.release(a)
+    limiter.release(a)  # Releasing twice frees only one slot
+    assert limiter.acquire(c) == 0
+    assert limiter.acquire(FakeTask("https://youtu.be/d")) == math.inf
+
+
+def test_no_limit_by_default(clock):
+    limiter = HostLimiter(HostBackoff(), start_spacing=0)
+    tasks = [FakeTask(f"https://youtu.be/{n}") for n in range(10)]
+    assert [limiter.acquire(task) for task in tasks] == [0] * 10
+
+
+def test_site_limit_overrides_default(clock):
+    limiter = HostLimiter(
+        HostBackoff(), max_per_site=None, start_spacing=0, limits={"vimeo.com": 1}
+    )
+    assert limiter.acquire(FakeTask("https://vimeo.com/1")) == 0
+    assert limiter.acquire(FakeTask("https://vimeo.com/2")) == math.inf
+    assert limiter.acquire(FakeTask("https://youtu.be/1")) == 0
+
+
+def test_start_spacing(clock):
+    limiter = HostLimiter(HostBackoff(), start_spacing=1.0)
+    first, second = FakeTask("https://youtu.be/a"), FakeTask("https://youtu.be/b")
+    assert limiter.acquire(first) == 0
+    assert limiter.acquire(second) == pytest.approx(1.0)
+    assert limiter.acquire(FakeTask("https://vimeo.com/1")) == 0
+    clock[0] += 0.4
+    assert limiter.acquire(second) == pytest.approx(0.6)
+    clock[0] += 0.6
+    assert limiter.acquire(second) == 0
+
+
+def test_cooldown_holds_site_back(clock):
+    backoff = HostBackoff(base=10.0)
+    limiter = HostLimiter(backoff, start_spacing=0)
+    delay = backoff.penalize("youtube.com")
+    assert limiter.acquire(FakeTask("https://www.youtube.com/watch?v=a")) == (
+        pytest.approx(delay)
+    )
+    assert limiter.acquire(FakeTask("https://vimeo.com/1")) == 0
+    clock[0] += delay
+    assert limiter.acquire(FakeTask("https://www.youtube.com/watch?v=a")) == 0
+
+
+def test_acquire_is_idempotent_for_a_holder(clock):
+    limiter = HostLimiter(HostBackoff(), max_per_site=1, start_spacing=0)
+    task = FakeTask("https://youtu.be/a")
+    assert limiter.acquire(task) == 0
+    assert limiter.acquire(task) == 0
+    limiter.release(task)
+    assert limiter.acquire(FakeTask("https://youtu.be/b")) == 0
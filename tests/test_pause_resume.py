@@ -0,0 +1,53 @@
+import os
+import threading
+
+import pytest
+
+from benchmark import VARIANT_HEIGHTS, MediaServer
+from engine import DownloadEngine, DownloadTask, MiB
+from isolation import ProcessRunner
+
+SEGMENTS = 6
+
+
+@pytest.fixture
+def server():
+    server = MediaServer(bandwidth=2 * MiB, segments=SEGMENTS).start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize("isolated", [False, True])
+@pytest.mark.parametrize("fragments", [1, 4])
+def test_hls_pause_and_resume_completes(server, tmp_path, isolated, fragments):
+    engine = DownloadEngine(max_workers=1, cache_db=False, quiet=True)
+    engine.host_limiter.start_spacing = 0
+    # A buffer as big as a segment: the first progress call comes once a
+    # fragment is fully written, the worst moment for the pause to abort
+    engine.transfer = {"fragments": fragments, "buffer_size": MiB}
+    if isolated:
+        engine.process_runner = ProcessRunner(engine)
+    task = DownloadTask(server.url_for("hls", "clip"), "best", str(tmp_path))
+    ended = threading.Event()
+    result = {}
+
+    def listener(task, event, data):
+        if event == "progress" and not result:
+            result["paused_at"] = data.get("downloaded")
+            engine.toggle_pause(task)
+        elif event == "paused":
+            engine.toggle_pause(task)
+        elif event in ("completed", "failed", "cancelled"):
+            result["event"] = event
+            result["filename"] = data.get("filename")
+            ended.set()
+
+    engine.add_listener(listener)
+    engine.submit(task)
+    try:
+        assert ended.wait(60), "the resumed download never finished"
+    finally:
+        engine.cancel(task)
+    assert result["event"] == "completed"
+    size = os.path.getsize(result["filename"])
+    assert size == SEGMENTS * server.segment_bytes(VARIANT_HEIGHTS[-1])
@@ -0,0 +1,136 @@
+import socket
+
+import pytest
+from yt_dlp.networking.exceptions import HTTPError, IncompleteRead, TransportError
+from yt_dlp.utils import DownloadError, ExtractorError
+
+from retry import (
+    PERMANENT,
+    THROTTLED,
+    TRANSIENT,
+    HostBackoff,
+    RetryPolicy,
+    classify_error,
+    jittered,
+)
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "reason"
+        self.headers = {}
+        self.url = "https://example.com/video"
+
+    def read(self, *args):
+        return b""
+
+    def close(self):
+        pass
+
+
+def http_error(status):
+    return HTTPError(FakeResponse(status))
+
+
+def wrapped(error):
+    """The DownloadError yt-dlp raises around the original exception"""
+    return DownloadError(f"ERROR: {error}", (type(error), error, None))
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (http_error(404), PERMANENT),
+        (wrapped(http_error(404)), PERMANENT),
+        (http_error(410), PERMANENT),
+        (
+            "ERROR: [youtube] x: Private video. Sign in if you've been granted access",
+            PERMANENT,
+        ),
+        (
+            "ERROR: [youtube] x: Video unavailable. This video has been removed",
+            PERMANENT,
+        ),
+        (ExtractorError("This video is DRM protected", expected=True), PERMANENT),
+        (http_error(429), THROTTLED),
+        (wrapped(http_error(429)), THROTTLED),
+        (http_error(403), THROTTLED),
+        ("ERROR: unable to download video data: HTTP Error 403: Forbidden", THROTTLED),
+        ("Sign in to confirm you're not a bot", THROTTLED),
+        (ConnectionResetError(104, "Connection reset by peer"), TRANSIENT),
+        (wrapped(TransportError("Connection reset by peer")), TRANSIENT),
+        (socket.timeout("The read operation timed out"), TRANSIENT),
+        (TimeoutError(), TRANSIENT),
+        (IncompleteRead(100, 200), TRANSIENT),
+        (http_error(503), TRANSIENT),
+        ("something nobody anticipated", TRANSIENT),
+    ],
+)
+def test_classify_error(error, expected):
+    assert classify_error(error) == expected
+
+
+@pytest.mark.parametrize("attempt", range(12))
+def test_jitter_bounds(attempt):
+    base, cap = 2.0, 60.0
+    full = min(cap, base * 2**attempt)
+    for _ in range(50):
+        assert full / 2 <= jittered(base, attempt, cap) <= full
+
+
+def test_attempt_cap():
+    policy = RetryPolicy(attempts={TRANSIENT: 3, THROTTLED: 1, PERMANENT: 0})
+    assert [policy.delay(TRANSIENT, n) is not None for n in range(5)] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert policy.delay(THROTTLED, 0) is not None
+    assert policy.delay(THROTTLED, 1) is None
+    assert policy.delay(PERMANENT, 0) is None
+
+
+def test_policy_delays_grow_and_stay_capped():
+    policy = RetryPolicy(attempts={TRANSIENT: 20}, base={TRANSIENT: 2.0}, cap=30.0)
+    assert 1.0 <= policy.delay(TRANSIENT, 0) <= 2.0
+    assert 8.0 <= policy.delay(TRANSIENT, 3) <= 16.0
+    assert all(15.0 <= policy.delay(TRANSIENT, n) <= 30.0 for n in range(5, 20))
+
+
+def test_host_backoff_escalates():
+    backoff = HostBackoff(base=10.0, cap=600.0)
+    first = backoff.penalize("example.com")
+    assert 5.0 <= first <= 10.0
+    second = backoff.penalize("example.com")
+    assert 10.0 <= second <= 20.0
+    assert backoff.remaining("example.com") > 0
+    assert backoff.remaining("other.com") == 0
+
+
+def test_success_keeps_a_running_cooldown():
+    backoff = HostBackoff(base=10.0)
+    backoff.penalize("example.com")
+    backoff.succeeded("example.com")  # Another task finishing meanwhile
+    assert backoff.remaining("example.com") > 4.0
+
+
+def test_cooldown_expires_and_strikes_step_down(monkeypatch):
+    import retry
+
+    now = [1000.0]
+    monkeypatch.setattr(retry.time, "monotonic", lambda: now[0])
+    backoff = HostBackoff(base=10.0, cap=600.0)
+    backoff.penalize("example.com")
+    backoff.penalize("example.com")
+    now[0] += 1000
+    assert backoff.remaining("example.com") == 0
+
+    backoff.succeeded("example.com")  # Two strikes -> one
+    assert 10.0 <= backoff.penalize("example.com") <= 20.0
+    now[0] += 1000
+    backoff.succeeded("example.com")
+    backoff.succeeded("example.com")
+    assert 5.0 <= backoff.penalize("example.com") <= 10.0
@@ -0,0 +1,35 @@
+import threading
+import time
+from queue import PriorityQueue
+
+from engine import DownloadScheduler, DownloadTask
+from hosts import HostLimiter
+from retry import HostBackoff
+
+
+def test_task_resubmitted_mid_run_keeps_its_site_slot():
+    limiter = HostLimiter(HostBackoff(), max_per_site=1, start_spacing=0)
+    task = DownloadTask("https://www.youtube.com/watch?v=x", "720", ".")
+    runs = []
+    done = threading.Event()
+
+    def runner(task):
+        runs.append(time.monotonic())
+        if len(runs) == 1:
+            # Resumed while this run is still winding down
+            scheduler.submit(task)
+            time.sleep(0.3)
+            runs.append(time.monotonic())
+            return
+        # The second run must still hold its slot after the first one's cleanup
+        time.sleep(0.5)
+        assert limiter._running.get("youtube.com") == 1
+        done.set()
+
+    scheduler = DownloadScheduler(
+        PriorityQueue(), runner, max_workers=2, limiter=limiter
+    )
+    scheduler.submit(task)
+    assert done.wait(5)
+    first_start, first_end, second_start = runs
+    assert second_start >= first_end
@@ -0,0 +1,37 @@
+from engine import DownloadTask
+from telemetry import TelemetryStore
+
+
+def run(store, task, *events):
+    store.record(task, "started", {})
+    for event, data in events:
+        store.record(task, event, data)
+    return store.get(task)
+
+
+def test_postprocess_time_only_for_completed_tasks():
+    store = TelemetryStore()
+    completed = run(
+        store, DownloadTask("u1", "720", "."), ("processing", {}), ("completed", {})
+    )
+    assert completed["postprocess_s"] is not None
+    assert completed["postprocess_s"] >= 0
+
+    failed = run(
+        store,
+        DownloadTask("u2", "720", "."),
+        ("processing", {}),
+        ("failed", {"error": "boom"}),
+    )
+    assert failed["postprocess_s"] is None
+
+
+def test_retries_after_cancel_are_not_counted():
+    store = TelemetryStore()
+    task = DownloadTask("u", "720", ".")
+    store.record(task, "started", {})
+    store.record(task, "retry", {"kind": "fragment", "attempt": 1})
+    task.cancel_flag = True
+    store.record(task, "retry", {"kind": "fragment", "attempt": 2})
+    store.record(task, "cancelled", {})
+    assert store.get(task)["retries"] == 1
@@ -0,0 +1,166 @@
+"""
+Two-tier thumbnail cache for previews.
+
+Memory tier: LRU of decoded, already resized PIL images keyed by
+(url, size), so a repeat preview costs neither a download nor a decode.
+Disk tier: the raw image bytes keyed by URL hash, with the server's ETag
+alongside so stale entries are revalidated with a conditional GET instead
+of downloaded again.
+
+Prefetcher runs such lookups for whatever rows are on screen, on a bounded
+pool, dropping the ones that scroll away before they are done.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from engine import get_http_session
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir, max_memory=128, max_disk=2000, max_age=7 * 86400):
+        self.cache_dir = cache_dir
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.max_age = max_age  # Disk entries older than this are revalidated
+        self._memory = OrderedDict()  # (url, size) -> PIL.Image
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, url, size):
+        """
+        Return a PIL image of url scaled to fit size (width, height).
+        Safe to call from worker threads; raises on network/decode errors.
+        """
+        key = (url, tuple(size))
+        with self._lock:
+            img = self._memory.get(key)
+            if img is not None:
+                self._memory.move_to_end(key)
+                return img
+
+        img = Image.open(BytesIO(self._fetch_bytes(url)))
+        img.load()
+        # keep aspect, limit to the requested box
+        img.thumbnail(size, Image.LANCZOS)
+
+        with self._lock:
+            self._memory[key] = img
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+        return img
+
+    def _paths(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, digest)
+        return base + ".img", base + ".json"
+
+    def _fetch_bytes(self, url):
+        data_path, meta_path = self._paths(url)
+        meta = None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if time.time() - meta.get("fetched_at", 0) < self.max_age:
+                with open(data_path, "rb") as f:
+                    return f.read()
+        except (OSError, ValueError):
+            meta = None
+
+        headers = {}
+        if meta and meta.get("etag") and os.path.exists(data_path):
+            headers["If-None-Match"] = meta["etag"]
+        r = get_http_session().get(url, timeout=15, headers=headers)
+        if r.status_code == 304:
+            with open(data_path, "rb") as f:
+                content = f.read()
+            etag = meta["etag"]
+        else:
+            r.raise_for_status()
+            content = r.content
+            etag = r.headers.get("ETag")
+            tmp_path = data_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, data_path)
+
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "fetched_at": time.time()}, f)
+        self._prune_disk()
+        return content
+
+    def _prune_disk(self):
+        """Drop the least recently fetched entries beyond max_disk"""
+        try:
+            metas = [
+                os.path.join(self.cache_dir, name)
+                for name in os.listdir(self.cache_dir)
+                if name.endswith(".json")
+            ]
+            if len(metas) <= self.max_disk:
+                return
+            metas.sort(key=os.path.getmtime)
+            for meta_path in metas[: len(metas) - self.max_disk]:
+                for path in (meta_path, meta_path[: -len(".json")] + ".img"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+
+class Prefetcher:
+    """
+    Bounded pool for speculative background work keyed by the caller
+    (e.g. a playlist row). Requests that are no longer wanted are dropped
+    with retain(): queued ones never start, running ones have their result
+    discarded instead of delivered.
+
+    callback(key, result) runs on the pool thread; marshal UI work yourself.
+    """
+
+    def __init__(self, workers=6, name="prefetch"):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._pending = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def request(self, key, fn, callback):
+        with self._lock:
+            if self._closed or key in self._pending:
+                return
+            self._pending[key] = self._pool.submit(self._run, key, fn, callback)
+
+    def _run(self, key, fn, callback):
+        try:
+            result = fn()
+        except Exception as e:
+            print(f"Prefetch error for {key}: {e}")  # Debug
+            result = None
+        with self._lock:
+            wanted = not self._closed and self._pending.pop(key, None) is not None
+        if wanted and result is not None:
+            callback(key, result)
+
+    def retain(self, keys):
+        """Cancel every pending request whose key is not in keys"""
+        with self._lock:
+            for key in [k for k in self._pending if k not in keys]:
+                self._pending.pop(key).cancel()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+        self._pool.shutdown(wait=False)